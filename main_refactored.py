@@ -7,6 +7,7 @@
 import os
 import sys
 from src.core.tour_planner import IntelligentTourPlanner
+from src.api.cache import TravelTimeCache, PlacesSearchCache
 from src.utils.input_handler import InputHandler
 from src.utils.output_formatter import OutputFormatter
 from src.utils.config import load_env_file
@@ -27,7 +28,12 @@ def main():
     # 初始化组件
     input_handler = InputHandler()
     output_formatter = OutputFormatter()
-    tour_planner = IntelligentTourPlanner(api_key)
+    cache_path = os.getenv("TRAVEL_CACHE_PATH", ".travel_cache.sqlite")
+    tour_planner = IntelligentTourPlanner(
+        api_key,
+        travel_cache=TravelTimeCache(cache_path),
+        places_cache=PlacesSearchCache(cache_path)
+    )
     
     try:
         # 1. 获取用户输入
@@ -0,0 +1,168 @@
+"""
+簇优先选择 (Cluster-First Selection)
+大规模候选集的粗到细求解：先在簇的层面挑选候选池，再在候选池上精细选择
+"""
+
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import numpy as np
+from ..models.place import Place
+from ..models.user_preferences import UserPreferences
+from ..models.travel_matrix import TravelMatrix, TravelMatrixLike
+from .scoring import CompositeScoringSystem
+from .travel_penalty import TravelPenaltyCalculator
+from .clustering import TravelTimeClustering, PlaceCluster
+from .enhanced_knapsack import EnhancedKnapsackSolver
+
+
+class ClusterFirstSolver:
+    """
+    粗到细 (coarse-to-fine) 景点选择：
+    1. 计算综合得分，按旅行时间阈值聚类（单个景点也是一个簇）
+    2. 粗选：按 簇价值 / (起点到簇代表点的旅行时间 + 簇内访问时间) 从高到低纳入候选池，
+       直到候选池的访问时间达到 pool_time_factor × time_limit 或景点数达到 max_pool；
+       大簇只纳入 得分/访问时间 最高的成员
+    3. 细选：在候选池的子矩阵上调用内层求解器（默认增强背包）
+
+    候选景点不超过 max_pool 时直接调用内层求解器；solve() 接口与其他选择策略相同
+    """
+
+    def __init__(self,
+                 inner_solver=None,
+                 max_pool: int = 40,
+                 pool_time_factor: float = 2.0,
+                 max_travel_minutes: float = 20.0):
+        """
+        初始化簇优先求解器
+
+        Args:
+            inner_solver: 候选池上的选择求解器（默认 EnhancedKnapsackSolver）
+            max_pool: 候选池的最大景点数
+            pool_time_factor: 候选池访问时间之和达到 time_limit 的多少倍后停止纳入
+            max_travel_minutes: 聚类阈值（同簇相邻景点之间的最大旅行时间）
+        """
+        self.inner_solver = inner_solver or EnhancedKnapsackSolver()
+        self.max_pool = max_pool
+        self.pool_time_factor = pool_time_factor
+        self.clustering = TravelTimeClustering(max_travel_minutes, min_cluster_size=1)
+        self.scoring_system = CompositeScoringSystem()
+        self.penalty_calculator = TravelPenaltyCalculator()
+
+    def solve(self,
+              places: List[Place],
+              user_preferences: UserPreferences,
+              travel_matrix: TravelMatrixLike,
+              time_limit: int,
+              start_location_index: int = 0,
+              max_pool: Optional[int] = None,
+              composite_scores: Optional[Sequence[float]] = None,
+              **inner_options) -> Tuple[List[Place], float, Dict[str, Any]]:
+        """
+        簇优先求解
+
+        Args:
+            places: 候选景点列表
+            user_preferences: 用户偏好
+            travel_matrix: 旅行时间矩阵
+            time_limit: 时间限制（分钟）
+            start_location_index: 起始位置索引
+            max_pool: 候选池的最大景点数，默认使用构造时的设置
+            composite_scores: 预先计算的综合得分，提供时跳过旅行惩罚和评分计算
+            **inner_options: 传给内层求解器的参数（例如 beam_width）
+
+        Returns:
+            (选中的景点列表, 总得分, 详细信息)
+        """
+        if not places or time_limit <= 0:
+            return [], 0.0, {}
+
+        travel_matrix = TravelMatrix.coerce(travel_matrix)
+        max_pool = self.max_pool if max_pool is None else max_pool
+
+        if len(places) <= max_pool:
+            return self.inner_solver.solve(
+                places, user_preferences, travel_matrix, time_limit, start_location_index,
+                composite_scores=composite_scores, **inner_options
+            )
+
+        # 粗选：综合得分 + 聚类 + 按簇的价值密度挑选候选池
+        if composite_scores is None:
+            travel_penalties = self.penalty_calculator.calculate_travel_penalties(places, travel_matrix)
+            self.scoring_system.batch_calculate_scores(places, user_preferences, travel_penalties)
+            scores = np.array([place.composite_score for place in places], dtype=np.float64)
+        else:
+            scores = np.asarray(composite_scores, dtype=np.float64)
+
+        clusters = self.clustering.cluster(places, travel_matrix)
+        pool, clusters_used = self._select_pool(
+            places, travel_matrix, clusters, scores, time_limit, start_location_index, max_pool
+        )
+
+        # 细选：在候选池上求解，起点位于候选池第0位
+        pool_places = [places[i] for i in pool]
+        selected_places, total_score, details = self.inner_solver.solve(
+            pool_places, user_preferences, travel_matrix.submatrix(pool), time_limit,
+            start_location_index=0,
+            composite_scores=scores[pool],
+            **inner_options
+        )
+
+        details = dict(details)
+        details["algorithm"] = f"Cluster-First + {details.get('algorithm', 'inner solver')}"
+        details["total_places_considered"] = len(places)
+        details["cluster_first"] = {
+            "clusters": len(clusters),
+            "clusters_used": clusters_used,
+            "pool_size": len(pool),
+            "max_pool": max_pool,
+            "max_travel_minutes": self.clustering.max_travel_minutes,
+        }
+        return selected_places, total_score, details
+
+    def _select_pool(self,
+                     places: List[Place],
+                     travel_matrix: TravelMatrix,
+                     clusters: List[PlaceCluster],
+                     scores: np.ndarray,
+                     time_limit: int,
+                     start: int,
+                     max_pool: int) -> Tuple[List[int], int]:
+        """
+        按价值密度从高到低纳入簇，返回 (候选池索引（起点在首位）, 纳入的簇数)
+
+        簇价值为按 得分/访问时间 排序后、访问时间之和不超过 time_limit 的成员得分之和；
+        簇内成员按同样的顺序纳入，候选池访问时间达到上限时立即停止（大簇只纳入排在前面的成员）
+        """
+        visit_times = np.array([max(place.visit_time, 1) for place in places], dtype=np.float64)
+        durations = travel_matrix.durations
+
+        ranked = []
+        for cluster in clusters:
+            members = np.asarray(cluster.members, dtype=np.intp)
+            by_density = members[np.argsort(-scores[members] / visit_times[members], kind="stable")]
+            fits = np.cumsum(visit_times[by_density]) <= time_limit
+            fits[0] = True
+            value = float(np.clip(scores[by_density[fits]], 0.0, None).sum())
+
+            access = 0.0 if start in cluster.members else float(durations[start, cluster.representative])
+            cost = access + float(visit_times[by_density[fits]].sum())
+            density = value / cost if np.isfinite(cost) and cost > 0 else 0.0
+            ranked.append((density, cluster.members[0], by_density))
+
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+
+        pool = [start]
+        pool_time = 0.0
+        clusters_used = 0
+        pool_limit = self.pool_time_factor * time_limit
+        for _, _, by_density in ranked:
+            if len(pool) >= max_pool or pool_time >= pool_limit:
+                break
+            clusters_used += 1
+            for i in by_density.tolist():
+                if len(pool) >= max_pool or pool_time >= pool_limit:
+                    break
+                if i != start:
+                    pool.append(i)
+                    pool_time += visit_times[i]
+
+        return pool, clusters_used
@@ -0,0 +1,187 @@
+"""
+景点聚类 (Travel-Time Clustering)
+在"双向旅行时间都不超过阈值"的边上做并查集（连通分量），
+结果与景点顺序无关，并附带簇中心与簇内旅行时间统计
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from ..models.place import Place, Location
+from ..models.travel_matrix import TravelMatrix, TravelMatrixLike
+from .spatial_index import SpatialIndex
+
+
+@dataclass
+class PlaceCluster:
+    """一个景点簇（索引均为矩阵/景点列表中的位置）"""
+    members: List[int]                 # 升序排列的成员索引
+    centroid: Location                 # 成员坐标的平均值
+    representative: int                # 离中心最近的成员，用于簇间旅行时间估计
+    edge_count: int = 0                # 簇内阈值边的数量
+    mean_travel_minutes: float = 0.0   # 簇内阈值边的平均旅行时间（取双向较大值）
+    max_travel_minutes: float = 0.0    # 簇内阈值边的最大旅行时间
+    total_visit_time: int = 0          # 成员建议访问时间之和
+
+    @property
+    def size(self) -> int:
+        return len(self.members)
+
+
+class TravelTimeClustering:
+    """
+    基于旅行时间阈值的单链接聚类
+
+    - 两个景点双向都可达且双向旅行时间都不超过 max_travel_minutes 时连一条边，
+      簇为这些边的连通分量（并查集），因此与遍历顺序无关
+    - 成员较多且矩阵带有距离信息时，先用空间索引按 最大观测速度 × 阈值 的半径预筛选候选边，
+      否则对成员两两向量化比较
+    - 并查集以向量化的 "挂接 + 指针跳跃" 实现，迭代次数约为 O(log N)
+    """
+
+    # 成员数不超过该值时直接两两比较（向量化比逐点半径查询更快）
+    DENSE_MAX_MEMBERS = 1500
+
+    def __init__(self, max_travel_minutes: float = 30.0, min_cluster_size: int = 2):
+        """
+        初始化聚类器
+
+        Args:
+            max_travel_minutes: 同簇相邻景点之间的最大旅行时间
+            min_cluster_size: 返回的簇的最小成员数（1表示保留单点簇）
+        """
+        self.max_travel_minutes = max_travel_minutes
+        self.min_cluster_size = min_cluster_size
+
+    def cluster(self,
+                places: List[Place],
+                travel_matrix: TravelMatrixLike,
+                members: Optional[Sequence[int]] = None,
+                spatial_index: Optional[SpatialIndex] = None) -> List[PlaceCluster]:
+        """
+        对景点聚类
+
+        Args:
+            places: 景点列表（与矩阵顺序一致）
+            travel_matrix: 旅行时间矩阵
+            members: 只对这些索引聚类（默认全部景点）
+            spatial_index: 预先构建的景点空间索引（可选，默认根据places构建）
+
+        Returns:
+            按最小成员索引排序的簇列表
+        """
+        travel_matrix = TravelMatrix.coerce(travel_matrix)
+        n = len(places)
+        if members is None:
+            members = np.arange(n)
+        members = np.unique(np.asarray(members, dtype=np.intp))
+        if members.size == 0:
+            return []
+
+        sources, targets, weights = self._threshold_edges(places, travel_matrix, members, spatial_index)
+        labels = self._connected_components(n, sources, targets)
+
+        coordinates = np.array([[place.location.lat, place.location.lng] for place in places])
+        edge_labels = labels[sources]
+        member_labels = labels[members]
+
+        clusters = []
+        for label in np.unique(member_labels):
+            cluster_members = members[member_labels == label]
+            if cluster_members.size < self.min_cluster_size:
+                continue
+
+            cluster_weights = weights[edge_labels == label]
+            center = coordinates[cluster_members].mean(axis=0)
+            offsets = coordinates[cluster_members] - center
+            representative = cluster_members[int(np.argmin(np.einsum("ij,ij->i", offsets, offsets)))]
+
+            clusters.append(PlaceCluster(
+                members=cluster_members.tolist(),
+                centroid=Location(lat=float(center[0]), lng=float(center[1])),
+                representative=int(representative),
+                edge_count=int(cluster_weights.size),
+                mean_travel_minutes=float(cluster_weights.mean()) if cluster_weights.size else 0.0,
+                max_travel_minutes=float(cluster_weights.max()) if cluster_weights.size else 0.0,
+                total_visit_time=int(sum(places[i].visit_time for i in cluster_members)),
+            ))
+
+        clusters.sort(key=lambda cluster: cluster.members[0])
+        return clusters
+
+    def _threshold_edges(self,
+                         places: List[Place],
+                         travel_matrix: TravelMatrix,
+                         members: np.ndarray,
+                         spatial_index: Optional[SpatialIndex]):
+        """
+        成员之间的阈值边 (sources, targets, 双向较大旅行时间)，每条边只出现一次（source < target）
+        """
+        ok = travel_matrix.ok_mask
+        durations = travel_matrix.durations
+        radius = np.inf
+        if members.size > self.DENSE_MAX_MEMBERS:
+            radius = self.max_travel_minutes * max_observed_speed(travel_matrix)
+
+        if np.isfinite(radius):
+            if spatial_index is None:
+                spatial_index = SpatialIndex.from_places(places)
+            in_members = np.zeros(len(places), dtype=bool)
+            in_members[members] = True
+
+            sources, targets = [], []
+            for i in members.tolist():
+                nearby = spatial_index.query_radius(i, radius)
+                nearby = nearby[(nearby > i) & in_members[nearby]]
+                sources.append(np.full(nearby.size, i, dtype=np.intp))
+                targets.append(nearby)
+            sources = np.concatenate(sources)
+            targets = np.concatenate(targets)
+        else:
+            upper = np.triu(np.ones((members.size, members.size), dtype=bool), k=1)
+            rows, cols = np.nonzero(upper)
+            sources, targets = members[rows], members[cols]
+
+        weights = np.maximum(durations[sources, targets], durations[targets, sources]).astype(np.float64)
+        keep = ok[sources, targets] & ok[targets, sources] & (weights <= self.max_travel_minutes)
+        return sources[keep], targets[keep], weights[keep]
+
+    def _connected_components(self, n: int, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """
+        并查集：每个点的标签为其连通分量中的最小索引
+
+        每轮把每条边两端所在的根挂到较小的根上，再用指针跳跃压缩路径，直到所有边两端标签一致
+        """
+        labels = np.arange(n)
+        while sources.size:
+            source_roots, target_roots = labels[sources], labels[targets]
+            if np.array_equal(source_roots, target_roots):
+                break
+            np.minimum.at(labels, source_roots, target_roots)
+            np.minimum.at(labels, target_roots, source_roots)
+            while True:
+                jumped = labels[labels]
+                if np.array_equal(jumped, labels):
+                    break
+                labels = jumped
+        return labels
+
+
+def max_observed_speed(travel_matrix: TravelMatrix) -> float:
+    """
+    矩阵中观测到的最大速度（米/分钟）
+    路程不短于直线距离，所以 速度 × 时间 是直线距离的上界；
+    矩阵缺少路程信息（距离或时间为0）时返回 inf，表示无法用空间索引预筛选
+    """
+    ok = travel_matrix.ok_mask.copy()
+    np.fill_diagonal(ok, False)
+    if not ok.any():
+        return np.inf
+
+    durations = travel_matrix.durations[ok].astype(np.float64)
+    distances = travel_matrix.distances[ok].astype(np.float64)
+    if (durations <= 0).any() or (distances <= 0).any():
+        return np.inf
+    return float((distances / durations).max())
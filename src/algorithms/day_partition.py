@@ -0,0 +1,121 @@
+"""
+多日行程的景点分配 (Day Partitioning)
+先聚类、再按方位扫描 (sweep) 把候选景点切分到各天，各天之间没有重复景点
+"""
+
+from typing import List
+import numpy as np
+from ..models.place import Place
+from ..models.user_preferences import UserPreferences
+from ..models.travel_matrix import TravelMatrix, TravelMatrixLike
+from .scoring import CompositeScoringSystem
+from .travel_penalty import TravelPenaltyCalculator
+from .clustering import TravelTimeClustering
+from .spatial_index import project_places
+
+
+class DayPartitioner:
+    """
+    Cluster-first, route-second 的多日分配：
+    1. 计算综合得分，按 得分/访问时间 保留访问时间之和不超过 pool_factor × 总预算 的候选
+    2. 按旅行时间阈值聚类，簇按簇中心相对起点的方位角排序（从最大的方位空隙之后开始扫描），
+       簇内景点也按方位角排序
+    3. 将扫描序列按各天预算的比例切成连续的段：同一簇的景点尽量分到同一天，
+       每天的景点在地理上相邻
+
+    各天的候选互不相交，之后每天可以独立（并行）求解
+    """
+
+    def __init__(self, pool_factor: float = 1.5, max_travel_minutes: float = 20.0):
+        """
+        初始化分配器
+
+        Args:
+            pool_factor: 每天候选的访问时间之和约为当天预算的多少倍（给每天的选择留余地）
+            max_travel_minutes: 聚类阈值（同簇相邻景点之间的最大旅行时间）
+        """
+        self.pool_factor = pool_factor
+        self.clustering = TravelTimeClustering(max_travel_minutes, min_cluster_size=1)
+        self.scoring_system = CompositeScoringSystem()
+        self.penalty_calculator = TravelPenaltyCalculator()
+
+    def partition(self,
+                  places: List[Place],
+                  user_preferences: UserPreferences,
+                  travel_matrix: TravelMatrixLike,
+                  day_budgets: List[int],
+                  start_index: int = 0) -> List[List[int]]:
+        """
+        将候选景点分配到各天
+
+        Args:
+            places: 候选景点列表（含起点）
+            user_preferences: 用户偏好
+            travel_matrix: 旅行时间矩阵
+            day_budgets: 每天的时间预算（分钟）
+            start_index: 起点（酒店）索引，不分配给任何一天
+
+        Returns:
+            每天的候选景点索引（不含起点）
+        """
+        if not day_budgets:
+            return []
+
+        travel_matrix = TravelMatrix.coerce(travel_matrix)
+        travel_penalties = self.penalty_calculator.calculate_travel_penalties(places, travel_matrix)
+        self.scoring_system.batch_calculate_scores(places, user_preferences, travel_penalties)
+
+        # Step 1: 按价值密度保留候选，起点不可达的景点不参与分配
+        reachable = travel_matrix.ok_mask[start_index] & travel_matrix.ok_mask[:, start_index]
+        candidates = np.array([i for i in range(len(places)) if i != start_index and reachable[i]],
+                              dtype=np.intp)
+        if candidates.size == 0:
+            return [[] for _ in day_budgets]
+
+        scores = np.array([places[i].composite_score for i in candidates], dtype=np.float64)
+        visit_times = np.array([max(places[i].visit_time, 1) for i in candidates], dtype=np.float64)
+        by_density = np.argsort(-scores / visit_times, kind="stable")
+        capacity = self.pool_factor * float(sum(day_budgets))
+        keep = by_density[np.cumsum(visit_times[by_density]) - visit_times[by_density] < capacity]
+        candidates = np.sort(candidates[keep])
+
+        # Step 2: 聚类 + 方位扫描
+        sequence = self._sweep_order(places, travel_matrix, candidates, start_index)
+
+        # Step 3: 按预算比例切段（以每个景点访问时间的中点决定所属的天）
+        times = np.array([max(places[i].visit_time, 1) for i in sequence], dtype=np.float64)
+        midpoints = np.cumsum(times) - times / 2
+        boundaries = np.cumsum(day_budgets, dtype=np.float64) / float(sum(day_budgets)) * times.sum()
+        days = np.minimum(np.searchsorted(boundaries, midpoints), len(day_budgets) - 1)
+
+        return [[int(i) for i in sequence[days == day]] for day in range(len(day_budgets))]
+
+    def _sweep_order(self,
+                     places: List[Place],
+                     travel_matrix: TravelMatrix,
+                     candidates: np.ndarray,
+                     start_index: int) -> np.ndarray:
+        """簇按方位角排序、簇内景点也按方位角排序后的扫描序列"""
+        coordinates = project_places(places)
+        offsets = coordinates - coordinates[start_index]
+        angles = np.arctan2(offsets[:, 1], offsets[:, 0])
+
+        clusters = self.clustering.cluster(places, travel_matrix, candidates)
+        cluster_angles = np.array([
+            np.arctan2(offsets[cluster.members, 1].mean(), offsets[cluster.members, 0].mean())
+            for cluster in clusters
+        ])
+
+        # 从最大的方位空隙之后开始扫描，避免在 ±π 处把相邻的簇分到首尾两天
+        order = np.argsort(cluster_angles, kind="stable")
+        sorted_angles = cluster_angles[order]
+        gaps = np.diff(np.append(sorted_angles, sorted_angles[0] + 2 * np.pi))
+        first = (int(np.argmax(gaps)) + 1) % len(order)
+        order = np.roll(order, -first)
+
+        sequence = []
+        for position in order:
+            members = np.asarray(clusters[position].members, dtype=np.intp)
+            relative = (angles[members] - sorted_angles[first]) % (2 * np.pi)
+            sequence.extend(members[np.argsort(relative, kind="stable")].tolist())
+        return np.asarray(sequence, dtype=np.intp)
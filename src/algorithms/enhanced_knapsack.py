@@ -4,11 +4,14 @@
 和"Position-aware greedy decisions"
 """
 
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import numpy as np
 from ..models.place import Place
 from ..models.user_preferences import UserPreferences
+from ..models.travel_matrix import TravelMatrix, TravelMatrixLike
 from .scoring import CompositeScoringSystem
 from .travel_penalty import TravelPenaltyCalculator
+from .exact_knapsack import ExactKnapsackSolver
 
 
 class EnhancedKnapsackSolver:
@@ -21,13 +24,17 @@ class EnhancedKnapsackSolver:
     def __init__(self):
         self.scoring_system = CompositeScoringSystem()
         self.penalty_calculator = TravelPenaltyCalculator()
+        self.exact_solver = ExactKnapsackSolver()
     
     def solve(self, 
               places: List[Place], 
               user_preferences: UserPreferences,
-              travel_matrix: List[List[Dict[str, Any]]],
+              travel_matrix: TravelMatrixLike,
               time_limit: int,
-              start_location_index: int = 0) -> Tuple[List[Place], float, Dict[str, Any]]:
+              start_location_index: int = 0,
+              beam_width: int = 1,
+              lookahead_depth: int = 0,
+              composite_scores: Optional[Sequence[float]] = None) -> Tuple[List[Place], float, Dict[str, Any]]:
         """
         解决增强背包问题
         
@@ -37,27 +44,47 @@ class EnhancedKnapsackSolver:
             travel_matrix: 旅行时间矩阵
             time_limit: 时间限制（分钟）
             start_location_index: 起始位置索引
+            beam_width: 束搜索宽度，每步保留的部分行程数（1表示原始贪心）
+            lookahead_depth: 束搜索中对每个候选做几步贪心前瞻来排序（0表示按累计得分）
+            composite_scores: 预先计算的综合得分（例如批量规划的得分矩阵的一行），
+                              提供时跳过旅行惩罚和评分计算
             
         Returns:
             (选中的景点列表, 总得分, 详细信息)
         """
+        if beam_width < 1 or lookahead_depth < 0:
+            raise ValueError("beam_width must be >= 1 and lookahead_depth must be >= 0")
+        
         if not places or time_limit <= 0:
             return [], 0.0, {}
         
-        # Step 1: 计算旅行惩罚
-        travel_penalties = self.penalty_calculator.calculate_travel_penalties(places, travel_matrix)
+        travel_matrix = TravelMatrix.coerce(travel_matrix)
         
-        # Step 2: 计算综合得分
-        self.scoring_system.batch_calculate_scores(places, user_preferences, travel_penalties)
+        if composite_scores is not None:
+            self.scoring_system.apply_scores(places, composite_scores)
+        else:
+            # Step 1: 计算旅行惩罚
+            travel_penalties = self.penalty_calculator.calculate_travel_penalties(places, travel_matrix)
+            
+            # Step 2: 计算综合得分
+            self.scoring_system.batch_calculate_scores(places, user_preferences, travel_penalties)
         
-        # Step 3: 迭代贪心选择（位置感知）
-        selected_places, total_score, selection_details = self._iterative_position_aware_selection(
-            places, travel_matrix, time_limit, start_location_index
-        )
+        # Step 3: 迭代贪心选择（位置感知），或束搜索
+        if beam_width > 1:
+            selected_places, total_score, selection_details = self._beam_search_selection(
+                places, travel_matrix, time_limit, start_location_index, beam_width, lookahead_depth
+            )
+            algorithm = (f"Enhanced Knapsack with Beam Search "
+                         f"(width={beam_width}, lookahead={lookahead_depth})")
+        else:
+            selected_places, total_score, selection_details = self._iterative_position_aware_selection(
+                places, travel_matrix, time_limit, start_location_index
+            )
+            algorithm = "Enhanced Knapsack with Travel Time Estimation"
         
         # Step 4: 准备详细信息
         details = {
-            "algorithm": "Enhanced Knapsack with Travel Time Estimation",
+            "algorithm": algorithm,
             "total_places_considered": len(places),
             "places_selected": len(selected_places),
             "total_composite_score": total_score,
@@ -69,17 +96,76 @@ class EnhancedKnapsackSolver:
         
         return selected_places, total_score, details
     
+    def compare_with_traditional_knapsack(self, 
+                                          places: List[Place], 
+                                          user_preferences: UserPreferences,
+                                          travel_matrix: TravelMatrixLike,
+                                          time_limit: int,
+                                          start_location_index: int = 0) -> Dict[str, Any]:
+        """
+        与传统（时间索引精确）背包比较
+        精确背包使用最近邻旅行时间估计，其最优值是得分上界，用于评估贪心结果
+        
+        Args:
+            places: 候选景点列表
+            user_preferences: 用户偏好
+            travel_matrix: 旅行时间矩阵
+            time_limit: 时间限制（分钟）
+            start_location_index: 起始位置索引
+            
+        Returns:
+            比较结果
+        """
+        travel_matrix = TravelMatrix.coerce(travel_matrix)
+        
+        enhanced_places, enhanced_score, enhanced_details = self.solve(
+            places, user_preferences, travel_matrix, time_limit, start_location_index
+        )
+        exact_places, upper_bound, exact_details = self.exact_solver.solve(
+            places, user_preferences, travel_matrix, time_limit, start_location_index
+        )
+        grade = self.exact_solver.grade_solution(enhanced_score, upper_bound)
+        
+        return {
+            "enhanced_knapsack": {
+                "places_count": len(enhanced_places),
+                "total_score": enhanced_score,
+                "time_used": enhanced_details.get("time_used", 0),
+                "places": [place.name for place in enhanced_places]
+            },
+            "traditional_knapsack": {
+                "places_count": len(exact_places),
+                "total_score": upper_bound,
+                "time_used": exact_details.get("estimated_time_used", 0),
+                "places": [place.name for place in exact_places],
+                "is_upper_bound": True
+            },
+            "improvement": {
+                "score_improvement_percent": (enhanced_score - upper_bound) / max(upper_bound, 1e-9) * 100,
+                "optimality_ratio": grade["optimality_ratio"],
+                "max_gap_percent": grade["max_gap_percent"]
+            }
+        }
+    
     def _iterative_position_aware_selection(self, 
                                            places: List[Place], 
-                                           travel_matrix: List[List[Dict[str, Any]]],
+                                           travel_matrix: TravelMatrix,
                                            time_limit: int,
                                            start_index: int) -> Tuple[List[Place], float, Dict[str, Any]]:
         """
         迭代的位置感知选择算法
         队友设计的核心算法
+        
+        可用景点用布尔掩码表示，每一步对所有候选景点向量化计算
+        efficiency = composite_score / (travel_row + visit_time)，
+        结果与逐个比较的贪心完全一致（并列时取索引最小者）
         """
+        n = len(places)
+        scores = np.array([place.composite_score for place in places], dtype=np.float64)
+        visit_times = np.array([place.visit_time for place in places], dtype=np.float64)
+        available = np.ones(n, dtype=bool)
+        
         selected_places = []
-        available_places = places.copy()
         current_location_index = start_index
         remaining_time = time_limit
         total_score = 0.0
@@ -87,58 +173,46 @@ class EnhancedKnapsackSolver:
         selection_log = []  # 记录选择过程
         
         iteration = 0
-        while available_places and remaining_time > 0:
+        while available.any() and remaining_time > 0:
             iteration += 1
             
-            # 计算每个可用景点的效率得分
-            best_efficiency = -1
-            best_place = None
-            best_place_index = -1
-            best_total_time = 0
-            
-            for i, place in enumerate(available_places):
-                # 找到该景点在原列表中的索引
-                original_index = places.index(place)
-                
-                # 计算从当前位置到该景点的旅行时间
-                travel_time = self._get_travel_time(current_location_index, original_index, travel_matrix)
-                
-                # 计算总时间需求（旅行时间 + 访问时间）
-                total_time_needed = travel_time + place.visit_time
-                
-                # 检查时间约束
-                if total_time_needed <= remaining_time:
-                    # 计算效率得分（队友设计的核心公式）
-                    efficiency_score = place.composite_score / total_time_needed
-                    
-                    if efficiency_score > best_efficiency:
-                        best_efficiency = efficiency_score
-                        best_place = place
-                        best_place_index = original_index
-                        best_total_time = total_time_needed
-            
-            # 如果找到了最佳选择
-            if best_place is not None:
-                selected_places.append(best_place)
-                available_places.remove(best_place)
-                total_score += best_place.composite_score
-                remaining_time -= best_total_time
-                
-                # 更新当前位置
-                current_location_index = best_place_index
-                
-                # 记录选择过程
-                selection_log.append({
-                    "iteration": iteration,
-                    "selected_place": best_place.name,
-                    "composite_score": best_place.composite_score,
-                    "efficiency_score": best_efficiency,
-                    "time_needed": best_total_time,
-                    "remaining_time": remaining_time
-                })
-            else:
+            # 计算总时间需求（从当前位置的旅行时间 + 访问时间）并检查时间约束
+            travel_row = travel_matrix.duration_row(current_location_index, n)
+            total_time_needed = travel_row + visit_times
+            feasible = available & (total_time_needed <= remaining_time)
+            
+            if not feasible.any():
                 # 没有找到符合时间约束的景点，结束选择
                 break
+            
+            # 计算效率得分（队友设计的核心公式）
+            with np.errstate(divide="ignore", invalid="ignore"):
+                efficiency = scores / total_time_needed
+            efficiency[np.isnan(efficiency)] = 0.0
+            efficiency[~feasible] = -np.inf
+            
+            best_place_index = int(np.argmax(efficiency))
+            best_place = places[best_place_index]
+            best_efficiency = float(efficiency[best_place_index])
+            best_total_time = float(total_time_needed[best_place_index])
+            
+            selected_places.append(best_place)
+            available[best_place_index] = False
+            total_score += best_place.composite_score
+            remaining_time -= best_total_time
+            
+            # 更新当前位置
+            current_location_index = best_place_index
+            
+            # 记录选择过程
+            selection_log.append({
+                "iteration": iteration,
+                "selected_place": best_place.name,
+                "composite_score": best_place.composite_score,
+                "efficiency_score": best_efficiency,
+                "time_needed": best_total_time,
+                "remaining_time": remaining_time
+            })
         
         selection_details = {
             "iterations": iteration,
@@ -150,10 +224,170 @@ class EnhancedKnapsackSolver:
         
         return selected_places, total_score, selection_details
     
+    def _beam_search_selection(self, 
+                              places: List[Place], 
+                              travel_matrix: TravelMatrix,
+                              time_limit: int,
+                              start_index: int,
+                              beam_width: int,
+                              lookahead_depth: int) -> Tuple[List[Place], float, Dict[str, Any]]:
+        """
+        束搜索版本的位置感知选择
+        
+        每步对所有部分行程向量化计算效率得分，每个行程扩展效率最高的 beam_width 个景点；
+        访问集合相同的部分行程得分相同，只保留剩余时间最多的一个；
+        再按 累计得分 + lookahead_depth 步贪心前瞻得分 + 剩余时间潜在价值 保留前 beam_width 个。
+        最终返回所有部分行程中得分最高者（不低于原始贪心的结果）。
+        """
+        n = len(places)
+        scores = np.array([place.composite_score for place in places], dtype=np.float64)
+        visit_times = np.array([place.visit_time for place in places], dtype=np.float64)
+        
+        # 参考效率：原始贪心的 得分/时间，用于估计剩余时间的潜在价值
+        greedy_places, greedy_score, greedy_details = self._iterative_position_aware_selection(
+            places, travel_matrix, time_limit, start_index
+        )
+        reference_efficiency = greedy_score / max(1.0, greedy_details["time_used"])
+        
+        # 每个部分行程: (已选索引, 当前位置, 剩余时间, 累计得分, 选择日志)
+        beams = [([], start_index, float(time_limit), 0.0, [])]
+        best = beams[0]
+        iteration = 0
+        
+        while beams:
+            iteration += 1
+            available = np.ones((len(beams), n), dtype=bool)
+            for b, (path, _, _, _, _) in enumerate(beams):
+                available[b, path] = False
+            remaining = np.array([beam[2] for beam in beams])
+            
+            # 向量化计算所有行程对所有景点的效率得分
+            total_time_needed = np.stack([
+                travel_matrix.duration_row(beam[1], n) for beam in beams
+            ]) + visit_times
+            feasible = available & (total_time_needed <= remaining[:, None])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                efficiency = scores / total_time_needed
+            efficiency[np.isnan(efficiency)] = 0.0
+            efficiency[~feasible] = -np.inf
+            
+            # 每个行程扩展效率最高的 beam_width 个可行景点，按访问集合去重
+            expansions = np.argsort(-efficiency, axis=1, kind="stable")[:, :beam_width]
+            children = {}
+            for b, (path, _, beam_remaining, beam_score, log) in enumerate(beams):
+                for j in expansions[b]:
+                    if not feasible[b, j]:
+                        break
+                    j = int(j)
+                    child_remaining = beam_remaining - float(total_time_needed[b, j])
+                    key = frozenset(path) | {j}
+                    if key in children and children[key][2] >= child_remaining:
+                        continue
+                    
+                    child_score = beam_score + places[j].composite_score
+                    child_log = log + [{
+                        "iteration": iteration,
+                        "selected_place": places[j].name,
+                        "composite_score": places[j].composite_score,
+                        "efficiency_score": float(efficiency[b, j]),
+                        "time_needed": float(total_time_needed[b, j]),
+                        "remaining_time": child_remaining
+                    }]
+                    children[key] = (path + [j], j, child_remaining, child_score, child_log)
+            
+            if not children:
+                break
+            
+            candidates = list(children.values())
+            rank = self._rank_partial_itineraries(candidates, scores, visit_times, travel_matrix,
+                                                  lookahead_depth, reference_efficiency)
+            
+            # 排序：前瞻得分高者优先，其次剩余时间多者优先
+            order = sorted(range(len(candidates)),
+                           key=lambda c: (-rank[c], -candidates[c][2]))
+            beams = [candidates[c] for c in order[:beam_width]]
+            
+            for beam in beams:
+                if (beam[3], beam[2]) > (best[3], best[2]):
+                    best = beam
+            final_beams = beams
+        
+        beam_selection_logs = [beam[4] for beam in final_beams] if iteration > 1 else []
+        
+        # 束搜索的排序是启发式的，保证结果不差于原始贪心
+        if greedy_score > best[3]:
+            greedy_details.update({
+                "beam_width": beam_width,
+                "lookahead_depth": lookahead_depth,
+                "beam_selection_logs": beam_selection_logs,
+                "greedy_fallback": True
+            })
+            return greedy_places, greedy_score, greedy_details
+        
+        path, final_location, remaining_time, total_score, selection_log = best
+        selection_details = {
+            "iterations": iteration,
+            "time_used": time_limit - remaining_time,
+            "remaining_time": remaining_time,
+            "selection_log": selection_log,
+            "final_location_index": final_location,
+            "beam_width": beam_width,
+            "lookahead_depth": lookahead_depth,
+            "beam_selection_logs": beam_selection_logs,
+            "greedy_fallback": False
+        }
+        
+        return [places[i] for i in path], total_score, selection_details
+    
+    def _rank_partial_itineraries(self, 
+                                  candidates: List[Tuple],
+                                  scores: np.ndarray,
+                                  visit_times: np.ndarray,
+                                  travel_matrix: TravelMatrix,
+                                  depth: int,
+                                  reference_efficiency: float) -> np.ndarray:
+        """
+        对所有候选部分行程同时做 depth 步贪心前瞻（向量化），估计最终得分：
+        累计得分 + 前瞻得分 + 前瞻后剩余时间 × 参考效率
+        
+        Returns:
+            每个候选的排序值
+        """
+        count, n = len(candidates), scores.size
+        available = np.ones((count, n), dtype=bool)
+        for c, candidate in enumerate(candidates):
+            available[c, candidate[0]] = False
+        current = [candidate[1] for candidate in candidates]
+        remaining = np.array([candidate[2] for candidate in candidates])
+        gained = np.array([candidate[3] for candidate in candidates])
+        rows = np.arange(count)
+        
+        for _ in range(depth):
+            total_time_needed = np.stack([
+                travel_matrix.duration_row(location, n) for location in current
+            ]) + visit_times
+            feasible = available & (total_time_needed <= remaining[:, None])
+            if not feasible.any():
+                break
+            
+            with np.errstate(divide="ignore", invalid="ignore"):
+                efficiency = scores / total_time_needed
+            efficiency[np.isnan(efficiency)] = 0.0
+            efficiency[~feasible] = -np.inf
+            
+            picks = np.argmax(efficiency, axis=1)
+            active = feasible[rows, picks]
+            gained += np.where(active, scores[picks], 0.0)
+            remaining -= np.where(active, total_time_needed[rows, picks], 0.0)
+            available[rows[active], picks[active]] = False
+            current = [int(p) if a else loc for p, a, loc in zip(picks, active, current)]
+        
+        return gained + remaining * reference_efficiency
+    
     def _get_travel_time(self, 
                         from_index: int, 
                         to_index: int, 
-                        travel_matrix: List[List[Dict[str, Any]]]) -> float:
+                        travel_matrix: TravelMatrix) -> float:
         """
         从旅行矩阵中获取旅行时间
         
@@ -165,14 +399,4 @@ class EnhancedKnapsackSolver:
         Returns:
             旅行时间（分钟）
         """
-        if (from_index >= len(travel_matrix) or 
-            to_index >= len(travel_matrix[from_index])):
-            return float('inf')
-        
-        element = travel_matrix[from_index][to_index]
-        
-        if element.get('status') == 'OK':
-            return element.get('duration_minutes', float('inf'))
-        else:
-            return float('inf')
-    
\ No newline at end of file
+        return travel_matrix.duration(from_index, to_index)
@@ -0,0 +1,159 @@
+"""
+精确背包算法 (Exact Time-Indexed Knapsack)
+时间索引的0/1背包动态规划，为位置感知贪心提供得分上界
+"""
+
+from typing import List, Dict, Any, Tuple
+import numpy as np
+from ..models.place import Place
+from ..models.user_preferences import UserPreferences
+from ..models.travel_matrix import TravelMatrix, TravelMatrixLike
+from .scoring import CompositeScoringSystem
+from .travel_penalty import TravelPenaltyCalculator
+
+
+class ExactKnapsackSolver:
+    """
+    时间索引的精确0/1背包：
+    - 价值：旅行惩罚调整后的 composite_score
+    - 重量：visit_time + 最近邻旅行时间估计（到达该景点的最短可能旅行时间）
+
+    每个景点在任意行程中至少要花费"最短到达时间 + 访问时间"，重量向下取整到分钟，
+    因此该背包是原问题的松弛，其最优值是任何可行行程得分的上界。
+
+    DP使用一维滚动 NumPy 数组（O(T)），每个景点的取舍用位集记录（O(N·T/8) 字节）用于回溯。
+    """
+
+    def __init__(self):
+        self.scoring_system = CompositeScoringSystem()
+        self.penalty_calculator = TravelPenaltyCalculator()
+
+    def solve(self,
+              places: List[Place],
+              user_preferences: UserPreferences,
+              travel_matrix: TravelMatrixLike,
+              time_limit: int,
+              start_location_index: int = 0) -> Tuple[List[Place], float, Dict[str, Any]]:
+        """
+        求解时间索引背包
+
+        Args:
+            places: 候选景点列表
+            user_preferences: 用户偏好
+            travel_matrix: 旅行时间矩阵
+            time_limit: 时间限制（分钟）
+            start_location_index: 起始位置索引
+
+        Returns:
+            (选中的景点列表, 上界得分, 详细信息)
+        """
+        if not places or time_limit <= 0:
+            return [], 0.0, {}
+
+        travel_matrix = TravelMatrix.coerce(travel_matrix)
+
+        # 计算旅行惩罚和综合得分（与增强背包相同）
+        travel_penalties = self.penalty_calculator.calculate_travel_penalties(places, travel_matrix)
+        self.scoring_system.batch_calculate_scores(places, user_preferences, travel_penalties)
+
+        values = np.array([place.composite_score for place in places], dtype=np.float64)
+        travel_estimates = self._nearest_travel_estimates(len(places), travel_matrix, start_location_index)
+        visit_times = np.array([place.visit_time for place in places], dtype=np.float64)
+        weights = np.floor(visit_times + travel_estimates)
+
+        selected_indices, upper_bound, memory_bytes = self._solve_01_knapsack(
+            values, weights, int(time_limit)
+        )
+        selected_places = [places[i] for i in selected_indices]
+
+        details = {
+            "algorithm": "Exact Time-Indexed Knapsack (upper bound)",
+            "total_places_considered": len(places),
+            "places_selected": len(selected_places),
+            "total_composite_score": upper_bound,
+            "upper_bound": upper_bound,
+            "time_limit": time_limit,
+            "estimated_time_used": float(weights[selected_indices].sum()) if selected_indices else 0.0,
+            "memory_bytes": memory_bytes
+        }
+
+        return selected_places, upper_bound, details
+
+    def _nearest_travel_estimates(self,
+                                  n: int,
+                                  travel_matrix: TravelMatrix,
+                                  start_index: int) -> np.ndarray:
+        """
+        每个景点的最近邻旅行时间估计：从起点或任意其他景点到达它的最短时间
+        起点本身为0
+        """
+        durations = np.full((n, n), np.inf)
+        m = min(n, travel_matrix.size)
+        durations[:m, :m] = np.where(travel_matrix.ok_mask[:m, :m], travel_matrix.durations[:m, :m], np.inf)
+        np.fill_diagonal(durations, np.inf)
+
+        estimates = durations.min(axis=0)
+        if start_index < n:
+            estimates = np.minimum(estimates, durations[start_index])
+            estimates[start_index] = 0.0
+        return estimates
+
+    def _solve_01_knapsack(self,
+                           values: np.ndarray,
+                           weights: np.ndarray,
+                           capacity: int) -> Tuple[List[int], float, int]:
+        """
+        一维滚动数组的0/1背包 + 位集回溯
+
+        Returns:
+            (选中的索引, 最优值, DP占用的字节数)
+        """
+        best = np.zeros(capacity + 1)
+        items = [i for i in range(values.size)
+                 if values[i] > 0 and np.isfinite(weights[i]) and weights[i] <= capacity]
+        keep = np.zeros((len(items), (capacity + 1 + 7) // 8), dtype=np.uint8)
+        take = np.zeros(capacity + 1, dtype=bool)
+
+        for row, i in enumerate(items):
+            weight, value = int(weights[i]), values[i]
+            take[:] = False
+            if weight == 0:
+                take[:] = True
+                best += value
+            else:
+                candidate = best[:capacity + 1 - weight] + value
+                take[weight:] = candidate > best[weight:]
+                best[weight:] = np.where(take[weight:], candidate, best[weight:])
+            keep[row] = np.packbits(take)
+
+        # 回溯
+        selected = []
+        remaining = capacity
+        for row in range(len(items) - 1, -1, -1):
+            if (keep[row, remaining >> 3] >> (7 - (remaining & 7))) & 1:
+                i = items[row]
+                selected.append(i)
+                remaining -= int(weights[i])
+
+        selected.reverse()
+        return selected, float(best[capacity]), best.nbytes + keep.nbytes
+
+    def grade_solution(self, solution_score: float, upper_bound: float) -> Dict[str, float]:
+        """
+        用上界评估启发式解的质量
+
+        Args:
+            solution_score: 启发式解的得分
+            upper_bound: 精确背包得到的上界
+
+        Returns:
+            最优性比率与最大可能差距
+        """
+        if upper_bound <= 0:
+            return {"optimality_ratio": 1.0, "max_gap_percent": 0.0}
+
+        ratio = min(1.0, solution_score / upper_bound)
+        return {
+            "optimality_ratio": ratio,
+            "max_gap_percent": (1.0 - ratio) * 100
+        }
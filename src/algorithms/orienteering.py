@@ -0,0 +1,342 @@
+"""
+定向问题求解器 (Orienteering Solver)
+选择与路径一次完成：在 visit + travel ≤ time_limit 的约束下最大化总综合得分
+"""
+
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import time
+import numpy as np
+from ..models.place import Place
+from ..models.user_preferences import UserPreferences
+from ..models.travel_matrix import TravelMatrix, TravelMatrixLike
+from .scoring import CompositeScoringSystem
+from .travel_penalty import TravelPenaltyCalculator
+from .route_optimizer import RouteOptimizer
+
+# 不可达边的代价（保持数值运算有限）
+_UNREACHABLE_COST = 1e7
+
+# 浮点比较容差
+_EPSILON = 1e-9
+
+
+class _OrienteeringInstance:
+    """求解过程中共享的数组数据"""
+
+    def __init__(self,
+                 travel_matrix: TravelMatrix,
+                 scores: np.ndarray,
+                 visit_times: np.ndarray,
+                 start: int,
+                 time_limit: float):
+        cost = travel_matrix.durations.astype(np.float64)
+        cost[~np.isfinite(cost)] = _UNREACHABLE_COST
+        np.fill_diagonal(cost, 0.0)
+
+        self.travel_matrix = travel_matrix
+        self.cost = cost
+        self.scores = scores
+        self.visit_times = visit_times
+        self.start = start
+        self.time_limit = time_limit
+
+    def route_time(self, route: List[int]) -> float:
+        """路径总耗时：从起点出发的旅行时间 + 访问时间"""
+        if not route:
+            return 0.0
+        path = np.asarray([self.start] + route, dtype=np.intp)
+        travel = self.cost[path[:-1], path[1:]].sum()
+        return float(travel + self.visit_times[path[1:]].sum())
+
+    def route_score(self, route: List[int]) -> float:
+        return float(self.scores[route].sum()) if route else 0.0
+
+
+class OrienteeringSolver:
+    """
+    定向问题 (Orienteering Problem) 的迭代局部搜索求解器
+
+    与"先背包选择、再路径优化"不同，路径优化节省下来的时间会立即用于插入更多景点：
+    1. 贪心插入构造初始解（得分 / 增加时间 比率最高者优先）
+    2. 局部搜索：路径内 2-opt / Or-opt 压缩旅行时间 → 插入 → 替换 (swap)
+    3. 扰动：移除一段连续景点后随机化贪心重建，保留最优解
+
+    solve() 与 EnhancedKnapsackSolver.solve() 接口相同，可作为规划器的可选策略；
+    求解在 time_budget_ms 内随时可返回当前最优解 (anytime)
+    """
+
+    def __init__(self,
+                 time_budget_ms: float = 200.0,
+                 max_stall_iterations: int = 200,
+                 seed: Optional[int] = 0):
+        """
+        初始化定向问题求解器
+
+        Args:
+            time_budget_ms: 默认的求解时间预算（毫秒）
+            max_stall_iterations: 连续无改进的扰动次数上限，达到后提前结束
+            seed: 随机种子（None表示不固定）
+        """
+        self.time_budget_ms = time_budget_ms
+        self.max_stall_iterations = max_stall_iterations
+        self.seed = seed
+        self.scoring_system = CompositeScoringSystem()
+        self.penalty_calculator = TravelPenaltyCalculator()
+        self.route_optimizer = RouteOptimizer()
+
+    def solve(self,
+              places: List[Place],
+              user_preferences: UserPreferences,
+              travel_matrix: TravelMatrixLike,
+              time_limit: int,
+              start_location_index: int = 0,
+              time_budget_ms: Optional[float] = None,
+              composite_scores: Optional[Sequence[float]] = None,
+              initial_route: Optional[Sequence[int]] = None) -> Tuple[List[Place], float, Dict[str, Any]]:
+        """
+        求解定向问题
+
+        Args:
+            places: 候选景点列表
+            user_preferences: 用户偏好
+            travel_matrix: 旅行时间矩阵
+            time_limit: 时间限制（分钟）
+            start_location_index: 起始位置索引
+            time_budget_ms: 求解时间预算（毫秒），默认使用构造时的设置
+            composite_scores: 预先计算的综合得分，提供时跳过旅行惩罚和评分计算
+            initial_route: 热启动的路径（景点索引，例如上一次的行程）；超出时间限制时
+                           先逐个移除性价比最低的景点，再贪心插入
+
+        Returns:
+            (按访问顺序排列的选中景点, 总得分, 详细信息)
+        """
+        if not places or time_limit <= 0:
+            return [], 0.0, {}
+
+        travel_matrix = TravelMatrix.coerce(travel_matrix)
+        budget_ms = self.time_budget_ms if time_budget_ms is None else time_budget_ms
+        deadline = time.perf_counter() + budget_ms / 1000.0
+        solve_start = time.perf_counter()
+
+        # Step 1: 计算旅行惩罚和综合得分（与增强背包相同）
+        if composite_scores is not None:
+            self.scoring_system.apply_scores(places, composite_scores)
+        else:
+            travel_penalties = self.penalty_calculator.calculate_travel_penalties(places, travel_matrix)
+            self.scoring_system.batch_calculate_scores(places, user_preferences, travel_penalties)
+
+        instance = _OrienteeringInstance(
+            travel_matrix,
+            scores=np.array([place.composite_score for place in places], dtype=np.float64),
+            visit_times=np.array([place.visit_time for place in places], dtype=np.float64),
+            start=start_location_index,
+            time_limit=float(time_limit)
+        )
+        rng = np.random.default_rng(self.seed)
+
+        # Step 2: 贪心插入构造初始解（或从给定路径热启动） + 局部搜索
+        warm_start = initial_route is not None
+        initial_route = self._fill(instance, self._repair(instance, initial_route) if warm_start else [])
+        initial_score = instance.route_score(initial_route)
+        current = self._local_search(instance, initial_route, deadline)
+        best = current
+        best_score = current_score = instance.route_score(current)
+
+        # Step 3: 迭代局部搜索（扰动 + 重建 + 局部搜索），直到时间预算用完或长期无改进
+        iterations = improvements = stall = 0
+        while (time.perf_counter() < deadline and
+               stall < self.max_stall_iterations and
+               len(current) > 0):
+            iterations += 1
+
+            candidate = self._perturb(current, rng)
+            candidate = self._fill(instance, candidate, rng=rng, noise=0.3)
+            candidate = self._local_search(instance, candidate, deadline)
+            candidate_score = instance.route_score(candidate)
+
+            if candidate_score > best_score + _EPSILON:
+                best, best_score = candidate, candidate_score
+                improvements += 1
+                stall = 0
+            else:
+                stall += 1
+
+            # 接受不比当前解差太多的解，否则回到最优解
+            if candidate_score >= current_score * 0.98:
+                current, current_score = candidate, candidate_score
+            else:
+                current, current_score = best, best_score
+
+        selected_places = [places[i] for i in best]
+        time_used = instance.route_time(best)
+        elapsed_ms = (time.perf_counter() - solve_start) * 1000
+
+        details = {
+            "algorithm": "Orienteering (Iterated Local Search)",
+            "total_places_considered": len(places),
+            "places_selected": len(selected_places),
+            "total_composite_score": best_score,
+            "time_limit": time_limit,
+            "time_used": time_used,
+            "selection_efficiency": best_score / max(1, time_used),
+            "selection_details": {
+                "initial_score": initial_score,
+                "warm_start": warm_start,
+                "iterations": iterations,
+                "improvements": improvements,
+                "elapsed_ms": elapsed_ms,
+                "time_budget_ms": budget_ms,
+                "remaining_time": time_limit - time_used,
+                "route_names": [place.name for place in selected_places]
+            }
+        }
+
+        return selected_places, best_score, details
+
+    def _insertion_costs(self,
+                         instance: _OrienteeringInstance,
+                         route: List[int],
+                         candidates: np.ndarray) -> np.ndarray:
+        """
+        向量化计算每个候选景点在每个插入位置的新增耗时
+
+        Returns:
+            (候选数, len(route)+1) 数组；位置p表示插入到 route[p] 之前
+        """
+        cost = instance.cost
+        path = np.asarray([instance.start] + route, dtype=np.intp)
+
+        from_prev = cost[np.ix_(path, candidates)]          # (m+1, c)
+        added = np.empty((candidates.size, path.size))
+        added[:, -1] = from_prev[-1]                        # 追加到末尾
+        if route:
+            to_next = cost[np.ix_(candidates, path[1:])]    # (c, m)
+            base = cost[path[:-1], path[1:]]                # (m,)
+            added[:, :-1] = from_prev[:-1].T + to_next - base
+
+        # 起点景点只能放在第一位，且其他景点不能插到它前面
+        if route and route[0] == instance.start:
+            added[:, 0] = np.inf
+        else:
+            added[candidates == instance.start, 1:] = np.inf
+
+        return added + instance.visit_times[candidates][:, None]
+
+    def _fill(self,
+              instance: _OrienteeringInstance,
+              route: List[int],
+              rng: Optional[np.random.Generator] = None,
+              noise: float = 0.0) -> List[int]:
+        """
+        贪心插入：反复插入 得分/新增时间 比率最高的可行景点
+        noise > 0 时对比率加入随机扰动（用于扰动后的重建）
+        """
+        route = list(route)
+        in_route = np.zeros(instance.scores.size, dtype=bool)
+        in_route[route] = True
+        slack = instance.time_limit - instance.route_time(route)
+
+        while True:
+            candidates = np.flatnonzero(~in_route & (instance.scores > 0))
+            if candidates.size == 0:
+                break
+
+            added = self._insertion_costs(instance, route, candidates)
+            positions = np.argmin(added, axis=1)
+            best_added = added[np.arange(candidates.size), positions]
+            feasible = best_added <= slack + _EPSILON
+            if not feasible.any():
+                break
+
+            ratio = instance.scores[candidates] / np.maximum(best_added, _EPSILON)
+            if noise and rng is not None:
+                ratio *= rng.uniform(1 - noise, 1 + noise, size=ratio.size)
+            ratio[~feasible] = -np.inf
+
+            pick = int(np.argmax(ratio))
+            route.insert(int(positions[pick]), int(candidates[pick]))
+            in_route[candidates[pick]] = True
+            slack -= best_added[pick]
+
+        return route
+
+    def _repair(self, instance: _OrienteeringInstance, route: Sequence[int]) -> List[int]:
+        """
+        热启动路径的修复：去掉无效/重复索引，超出时间限制时反复移除 得分/节省时间 最低的景点
+        """
+        route = [int(i) for i in dict.fromkeys(route) if 0 <= i < instance.scores.size]
+        if instance.start in route:
+            route.remove(instance.start)
+            route.insert(0, instance.start)
+
+        while route and instance.route_time(route) > instance.time_limit + _EPSILON:
+            total = instance.route_time(route)
+            saved = np.array([total - instance.route_time(route[:p] + route[p + 1:]) for p in range(len(route))])
+            ratio = instance.scores[route] / np.maximum(saved, _EPSILON)
+            route.pop(int(np.argmin(ratio)))
+
+        return route
+
+    def _swap(self, instance: _OrienteeringInstance, route: List[int]) -> Tuple[List[int], bool]:
+        """
+        替换：用得分更高的未选景点替换一个已选景点（如果时间允许）
+
+        Returns:
+            (新路径, 是否有改进)
+        """
+        in_route = np.zeros(instance.scores.size, dtype=bool)
+        in_route[route] = True
+        outside = np.flatnonzero(~in_route & (instance.scores > 0))
+        if outside.size == 0:
+            return route, False
+
+        for position, removed in enumerate(route):
+            better = outside[instance.scores[outside] > instance.scores[removed] + _EPSILON]
+            if better.size == 0:
+                continue
+
+            reduced = route[:position] + route[position + 1:]
+            slack = instance.time_limit - instance.route_time(reduced)
+            added = self._insertion_costs(instance, reduced, better)
+            positions = np.argmin(added, axis=1)
+            best_added = added[np.arange(better.size), positions]
+            feasible = best_added <= slack + _EPSILON
+            if not feasible.any():
+                continue
+
+            gain = np.where(feasible, instance.scores[better], -np.inf)
+            pick = int(np.argmax(gain))
+            reduced.insert(int(positions[pick]), int(better[pick]))
+            return reduced, True
+
+        return route, False
+
+    def _polish(self, instance: _OrienteeringInstance, route: List[int]) -> List[int]:
+        """用路径优化器的局部搜索压缩旅行时间（起点固定）"""
+        if len(route) < 2:
+            return route
+
+        pinned = route[0] == instance.start
+        path = route if pinned else [instance.start] + route
+        improved, _ = self.route_optimizer.improve_route(path, instance.travel_matrix)
+        return improved if pinned else improved[1:]
+
+    def _local_search(self,
+                      instance: _OrienteeringInstance,
+                      route: List[int],
+                      deadline: float) -> List[int]:
+        """路径压缩 → 插入 → 替换，直到没有改进或时间用完"""
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            score_before = instance.route_score(route)
+            route = self._polish(instance, route)
+            route = self._fill(instance, route)
+            route, swapped = self._swap(instance, route)
+            improved = swapped or instance.route_score(route) > score_before + _EPSILON
+        return route
+
+    def _perturb(self, route: List[int], rng: np.random.Generator) -> List[int]:
+        """扰动：随机移除一段连续的景点"""
+        length = int(rng.integers(1, max(1, len(route) // 3) + 1))
+        start = int(rng.integers(0, len(route) - length + 1))
+        return route[:start] + route[start + length:]
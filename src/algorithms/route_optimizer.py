@@ -4,8 +4,144 @@
 """
 
 from typing import List, Dict, Any, Tuple, Optional
+from collections import deque
 import random
-from ..models.place import Place
+import numpy as np
+from ..models.place import Place, PlaceIndex
+from ..models.travel_matrix import TravelMatrix, TravelMatrixLike
+from .spatial_index import SpatialIndex
+
+
+# 局部搜索中不可达边的代价（避免 inf - inf 产生 nan）
+_UNREACHABLE_COST = 1e7
+
+# 判定改进的最小收益，防止浮点误差导致死循环
+_MIN_GAIN = 1e-9
+
+# 可选的局部搜索移动及其显示名称
+MOVE_LABELS = {
+    "2opt": "2-Opt",
+    "or_opt": "Or-Opt",
+    "relocate": "Relocate",
+    "exchange": "Exchange",
+}
+
+# 默认移动集合：2-opt + 不反转段的Or-opt（适用于非对称矩阵）
+DEFAULT_MOVES = ("2opt", "or_opt")
+
+# Held-Karp精确求解的硬上限（内存为 O(2^k · k)）
+MAX_EXACT_PLACES = 20
+
+
+class _RouteState:
+    """
+    局部搜索的路径状态（开放路径，起点固定在位置0）
+
+    维护正向/反向前缀和，使任意2-opt移动的收益计算为O(1)：
+    反转段的新代价 = 反向前缀和之差，无需重新累加整条路径，
+    因此对非对称矩阵同样精确。
+    """
+
+    def __init__(self, cost: List[List[float]], order: List[int]):
+        self.cost = cost
+        self.order = order
+        self.pos = [0] * len(order)
+        self.fwd = [0.0] * len(order)
+        self.bwd = [0.0] * len(order)
+        self.refresh()
+
+    def refresh(self):
+        """路径变化后重建位置表和前缀和 (O(k))"""
+        cost, order = self.cost, self.order
+        fwd_total = bwd_total = 0.0
+        for p, node in enumerate(order):
+            self.pos[node] = p
+            if p > 0:
+                prev = order[p - 1]
+                fwd_total += cost[prev][node]
+                bwd_total += cost[node][prev]
+            self.fwd[p] = fwd_total
+            self.bwd[p] = bwd_total
+
+    def total_cost(self) -> float:
+        return self.fwd[-1]
+
+    def two_opt_gain(self, i: int, j: int) -> float:
+        """
+        反转 order[i:j] 的收益（正数表示改进）
+
+        断开 (order[i-1], order[i]) 与 (order[j-1], order[j])，
+        连接 (order[i-1], order[j-1]) 与 (order[i], order[j])；j == len 时为尾段反转
+        """
+        cost, order = self.cost, self.order
+        a, b, c = order[i - 1], order[i], order[j - 1]
+        old = cost[a][b] + self.fwd[j - 1] - self.fwd[i]
+        new = cost[a][c] + self.bwd[j - 1] - self.bwd[i]
+        if j < len(order):
+            e = order[j]
+            old += cost[c][e]
+            new += cost[b][e]
+        return old - new
+
+    def apply_two_opt(self, i: int, j: int):
+        self.order[i:j] = self.order[i:j][::-1]
+        self.refresh()
+
+    def relocate_gain(self, s: int, length: int, t: int) -> float:
+        """
+        将段 order[s:s+length] 原样（不反转）移到 order[t] 之后的收益
+
+        t 必须在段之外且不等于 s-1；段内部代价不变，因此非对称矩阵下同样精确
+        """
+        cost, order = self.cost, self.order
+        n = len(order)
+        e = s + length
+        prev, first, last = order[s - 1], order[s], order[e - 1]
+        nxt = order[e] if e < n else None
+
+        gain = cost[prev][first]
+        if nxt is not None:
+            gain += cost[last][nxt] - cost[prev][nxt]
+
+        u = order[t]
+        v = order[t + 1] if t + 1 < n else None
+        gain -= cost[u][first]
+        if v is not None:
+            gain -= cost[last][v] - cost[u][v]
+        return gain
+
+    def apply_relocate(self, s: int, length: int, t: int):
+        segment = self.order[s:s + length]
+        anchor = self.order[t]
+        del self.order[s:s + length]
+        insert_at = self.order.index(anchor) + 1
+        self.order[insert_at:insert_at] = segment
+        self.refresh()
+
+    def exchange_gain(self, x: int, y: int) -> float:
+        """交换 order[x] 与 order[y] (1 <= x < y) 的收益"""
+        cost, order = self.cost, self.order
+        n = len(order)
+        a, b = order[x], order[y]
+        pa = order[x - 1]
+        nb = order[y + 1] if y + 1 < n else None
+
+        if y == x + 1:
+            old = cost[pa][a] + cost[a][b]
+            new = cost[pa][b] + cost[b][a]
+        else:
+            na, pb = order[x + 1], order[y - 1]
+            old = cost[pa][a] + cost[a][na] + cost[pb][b]
+            new = cost[pa][b] + cost[b][na] + cost[pb][a]
+
+        if nb is not None:
+            old += cost[b][nb]
+            new += cost[a][nb]
+        return old - new
+
+    def apply_exchange(self, x: int, y: int):
+        self.order[x], self.order[y] = self.order[y], self.order[x]
+        self.refresh()
 
 
 class RouteOptimizer:
@@ -13,16 +149,37 @@ class RouteOptimizer:
     实现队友设计的两阶段启发式路径优化：
     1. Nearest Neighbor Initialization
     2. 2-Opt Local Search Improvement
+    
+    景点数不超过 exact_threshold 时，Phase 2 改用 Held-Karp 位掩码动态规划求精确最优
     """
     
-    def __init__(self):
-        pass
+    def __init__(self, 
+                 neighbor_count: int = 8, 
+                 or_opt_max_segment: int = 3,
+                 exact_threshold: int = 15):
+        """
+        初始化路径优化器
+        
+        Args:
+            neighbor_count: 局部搜索候选邻居列表的长度（k近邻）
+            or_opt_max_segment: Or-opt移动的最大段长度
+            exact_threshold: 使用精确求解的最大景点数（0表示禁用，上限 MAX_EXACT_PLACES）
+        """
+        if exact_threshold > MAX_EXACT_PLACES:
+            raise ValueError(f"exact_threshold must not exceed {MAX_EXACT_PLACES}")
+        
+        self.neighbor_count = neighbor_count
+        self.or_opt_max_segment = or_opt_max_segment
+        self.exact_threshold = exact_threshold
     
     def optimize_route(self, 
                       selected_places: List[Place],
-                      travel_matrix: List[List[Dict[str, Any]]],
+                      travel_matrix: TravelMatrixLike,
                       all_places: List[Place],
-                      start_index: int = 0) -> Tuple[List[Place], Dict[str, Any]]:
+                      start_index: int = 0,
+                      place_index: Optional[PlaceIndex] = None,
+                      moves: Optional[List[str]] = None,
+                      spatial_index: Optional[SpatialIndex] = None) -> Tuple[List[Place], Dict[str, Any]]:
         """
         两阶段路径优化
         
@@ -31,195 +188,496 @@ class RouteOptimizer:
             travel_matrix: 旅行时间矩阵
             all_places: 全部景点列表（用于索引映射）
             start_index: 起始位置索引
+            place_index: 预先构建的景点索引映射（可选，默认根据all_places构建）
+            moves: 局部搜索移动集合，可选 "2opt", "or_opt", "relocate", "exchange"
+                   （默认 DEFAULT_MOVES）。显式指定时始终使用局部搜索，
+                   不再对小规模路径走 Held-Karp 精确求解
+            spatial_index: all_places 的空间索引（可选），提供时局部搜索的候选列表
+                           额外并入地理上的k近邻
+            
+        起点 start_index 在选中景点中时固定为路径首位，否则起点任意
+        （精确求解与局部搜索相同）
             
         Returns:
             (优化后的路径, 优化详情)
         """
+        explicit_moves = moves is not None
+        moves = list(moves) if explicit_moves else list(DEFAULT_MOVES)
+        unknown_moves = [move for move in moves if move not in MOVE_LABELS]
+        if unknown_moves:
+            raise ValueError(f"Unknown route moves: {unknown_moves}")
+        
         if len(selected_places) <= 1:
             return selected_places, {"algorithm": "No optimization needed"}
         
+        travel_matrix = TravelMatrix.coerce(travel_matrix)
+        if place_index is None:
+            place_index = PlaceIndex(all_places)
+        
+        # 路径在内部以整数索引数组表示
+        nodes = place_index.indices(selected_places)
+        
         # Phase 1: Nearest Neighbor Initialization
-        initial_route = self._nearest_neighbor_initialization(
-            selected_places, travel_matrix, all_places, start_index
-        )
-        initial_distance = self._calculate_total_travel_time(initial_route, travel_matrix, all_places)
+        initial_route = self._nearest_neighbor_initialization(nodes, travel_matrix, start_index)
+        initial_distance = self._calculate_total_travel_time(initial_route, travel_matrix)
         
-        # Phase 2: 2-Opt Local Search Improvement
-        optimized_route = self._two_opt_improvement(initial_route, travel_matrix, all_places)
-        final_distance = self._calculate_total_travel_time(optimized_route, travel_matrix, all_places)
+        # Phase 2: 小规模精确求解，否则局部搜索改进 (2-Opt / Or-Opt / ...)
+        fixed_start = start_index in nodes
+        exact = not explicit_moves and len(nodes) <= self.exact_threshold
+        if exact:
+            optimized_route = self._held_karp_route(initial_route, travel_matrix, fixed_start)
+            move_stats = {}
+            algorithm = "Two-Phase Exact (Nearest Neighbor + Held-Karp DP)"
+            phase2 = "Held-Karp Bitmask Dynamic Programming (exact)"
+        else:
+            optimized_route, move_stats = self._local_search_improvement(
+                initial_route, travel_matrix, moves, spatial_index, fixed_start
+            )
+            move_names = " + ".join(MOVE_LABELS[move] for move in moves)
+            algorithm = f"Two-Phase Heuristic (Nearest Neighbor + {move_names})"
+            phase2 = f"{move_names} Local Search (neighbor lists + don't-look bits)"
+        
+        final_distance = self._calculate_total_travel_time(optimized_route, travel_matrix)
         
         # 计算改进情况
         improvement = ((initial_distance - final_distance) / max(1, initial_distance)) * 100
         
         optimization_details = {
-            "algorithm": "Two-Phase Heuristic (Nearest Neighbor + 2-Opt)",
+            "algorithm": algorithm,
             "initial_travel_time": initial_distance,
             "optimized_travel_time": final_distance,
             "improvement_percent": improvement,
             "places_count": len(optimized_route),
+            "optimal": exact,
+            "exact_threshold": self.exact_threshold,
+            "moves": [] if exact else moves,
+            "move_stats": move_stats,
             "phases": {
                 "phase1": "Nearest Neighbor Initialization",
-                "phase2": "2-Opt Local Search"
+                "phase2": phase2
             }
         }
         
-        return optimized_route, optimization_details
+        return place_index.places_at(optimized_route), optimization_details
+    
+    def improve_route(self,
+                      route: List[int],
+                      travel_matrix: TravelMatrixLike,
+                      moves: Optional[List[str]] = None,
+                      spatial_index: Optional[SpatialIndex] = None,
+                      fixed_start: bool = True) -> Tuple[List[int], Dict[str, int]]:
+        """
+        对以矩阵索引表示的已有路径做局部搜索改进（不做最近邻初始化和精确求解）
+        
+        Args:
+            route: 以矩阵索引表示的路径
+            travel_matrix: 旅行时间矩阵
+            moves: 局部搜索移动集合（默认 DEFAULT_MOVES）
+            spatial_index: 矩阵全部节点的空间索引（可选）
+            fixed_start: 是否固定 route[0] 为起点
+            
+        Returns:
+            (改进后的路径, 每种移动的应用次数)
+        """
+        moves = list(moves) if moves is not None else list(DEFAULT_MOVES)
+        unknown_moves = [move for move in moves if move not in MOVE_LABELS]
+        if unknown_moves:
+            raise ValueError(f"Unknown route moves: {unknown_moves}")
+        
+        return self._local_search_improvement(
+            list(route), TravelMatrix.coerce(travel_matrix), moves, spatial_index, fixed_start
+        )
     
     def _nearest_neighbor_initialization(self, 
-                                        places: List[Place],
-                                        travel_matrix: List[List[Dict[str, Any]]],
-                                        all_places: List[Place],
-                                        start_index: int) -> List[Place]:
+                                        nodes: List[int],
+                                        travel_matrix: TravelMatrix,
+                                        start_index: int) -> List[int]:
         """
         最近邻算法初始化路径
         队友设计的Phase 1
+        
+        Args:
+            nodes: 选中景点的矩阵索引
+            travel_matrix: 旅行时间矩阵
+            start_index: 起始位置索引
+            
+        Returns:
+            以矩阵索引表示的路径
         """
-        if not places:
+        if not nodes:
             return []
         
-        # 找到起始点（如果在selected_places中）
-        route = []
-        unvisited = places.copy()
-        
-        # 尝试从指定起始点开始
-        current_place = None
-        if start_index < len(all_places):
-            start_place = all_places[start_index]
-            if start_place in unvisited:
-                current_place = start_place
-                unvisited.remove(start_place)
+        unvisited = list(nodes)
         
-        # 如果起始点不在选中景点中，从第一个景点开始
-        if current_place is None:
-            current_place = unvisited.pop(0)
+        # 尝试从指定起始点开始，如果起始点不在选中景点中，从第一个景点开始
+        if start_index in unvisited:
+            unvisited.remove(start_index)
+            current = start_index
+        else:
+            current = unvisited.pop(0)
         
-        route.append(current_place)
+        route = [current]
+        durations = travel_matrix.durations
         
         # 贪心选择最近的下一个景点
         while unvisited:
-            nearest_place = None
-            min_distance = float('inf')
-            
-            current_index = all_places.index(current_place)
+            distances = durations[current, unvisited]
+            nearest = int(np.argmin(distances))
             
-            for candidate in unvisited:
-                candidate_index = all_places.index(candidate)
-                distance = self._get_travel_time(current_index, candidate_index, travel_matrix)
-                
-                if distance < min_distance:
-                    min_distance = distance
-                    nearest_place = candidate
-            
-            if nearest_place:
-                route.append(nearest_place)
-                unvisited.remove(nearest_place)
-                current_place = nearest_place
-            else:
+            if not np.isfinite(distances[nearest]):
                 # 如果无法到达任何景点，添加剩余景点
                 route.extend(unvisited)
                 break
+            
+            current = unvisited.pop(nearest)
+            route.append(current)
         
         return route
     
     def _two_opt_improvement(self, 
-                           route: List[Place],
-                           travel_matrix: List[List[Dict[str, Any]]],
-                           all_places: List[Place],
-                           max_iterations: int = 100) -> List[Place]:
+                           route: List[int],
+                           travel_matrix: TravelMatrix) -> List[int]:
         """
         2-opt局部搜索改进
         队友设计的Phase 2
         """
-        if len(route) < 4:  # 2-opt需要至少4个点
+        return self._local_search_improvement(route, travel_matrix, ["2opt"])[0]
+    
+    def _local_search_improvement(self, 
+                                route: List[int],
+                                travel_matrix: TravelMatrix,
+                                moves: List[str],
+                                spatial_index: Optional[SpatialIndex] = None,
+                                fixed_start: bool = True) -> Tuple[List[int], Dict[str, int]]:
+        """
+        多邻域局部搜索（Variable Neighborhood Descent）
+        
+        依次执行各移动直到局部最优；只要任一移动有改进就重新开始一轮。
+        2-opt的收益通过前缀和O(1)计算；所有移动只评估k近邻候选，
+        2-opt还使用don't-look bits跳过最近没有改进机会的节点；
+        提供空间索引时，候选列表为矩阵k近邻与地理k近邻的并集
+        （矩阵中不可达或估算偏差较大的边仍能被考虑）
+        
+        fixed_start 为 False 时在首位加入一个到所有节点代价为0的虚拟起点，
+        路径的真实首位也参与移动（与 Held-Karp 的任意起点一致）
+        
+        Returns:
+            (优化后的路径, 每种移动的应用次数)
+        """
+        move_stats = {move: 0 for move in moves}
+        offset = 0 if fixed_start else 1
+        if len(route) + offset < 3 or not moves:  # 起点固定，至少需要3个点
+            return route, move_stats
+        
+        cost = self._local_cost_matrix(route, travel_matrix)
+        if not fixed_start:
+            cost = np.pad(cost, ((1, 0), (1, 0)))
+        neighbors = self._build_neighbor_lists(cost)
+        if spatial_index is not None:
+            neighbors = self._merge_spatial_neighbors(neighbors, route, spatial_index, offset)
+        state = _RouteState(cost.tolist(), list(range(len(route) + offset)))
+        
+        runners = {
+            "2opt": lambda: self._run_two_opt(state, neighbors),
+            "or_opt": lambda: self._run_or_opt(state, neighbors, self.or_opt_max_segment),
+            "relocate": lambda: self._run_or_opt(state, neighbors, 1),
+            "exchange": lambda: self._run_exchange(state, neighbors),
+        }
+        
+        improved = True
+        while improved:
+            improved = False
+            for move in moves:
+                applied = runners[move]()
+                move_stats[move] += applied
+                improved = improved or (applied > 0 and len(moves) > 1)
+        
+        return [route[node - offset] for node in state.order[offset:]], move_stats
+    
+    def _held_karp_route(self, 
+                         route: List[int],
+                         travel_matrix: TravelMatrix,
+                         fixed_start: bool = True) -> List[int]:
+        """
+        Held-Karp 位掩码动态规划求开放路径TSP的精确最优解
+        
+        dp[mask, v] = 访问mask中所有节点且停在v的最短路径。
+        按mask中节点数逐层推进，每层对每个终点v做一次向量化的 (M, k) 取最小值，
+        k=15 约几十毫秒
+        
+        Args:
+            route: 以矩阵索引表示的路径（fixed_start时 route[0] 为起点）
+            travel_matrix: 旅行时间矩阵
+            fixed_start: 是否固定从 route[0] 出发；否则起点任意
+        """
+        k = len(route)
+        if k <= 2:
             return route
         
-        best_route = route.copy()
-        best_distance = self._calculate_total_travel_time(best_route, travel_matrix, all_places)
+        cost = self._local_cost_matrix(route, travel_matrix)
+        full = 1 << k
+        masks = np.arange(full, dtype=np.int64)
         
+        dp = np.full((full, k), np.inf)
+        parent = np.full((full, k), -1, dtype=np.int8)
+        if fixed_start:
+            dp[1, 0] = 0.0
+        else:
+            dp[1 << np.arange(k), np.arange(k)] = 0.0
+        
+        popcount = np.zeros(full, dtype=np.int8)
+        for bit in range(k):
+            popcount += ((masks >> bit) & 1).astype(np.int8)
+        
+        for size in range(1, k):
+            layer = masks[popcount == size]
+            for v in range(k):
+                bit = 1 << v
+                subsets = layer[(layer & bit) == 0]
+                if subsets.size == 0:
+                    continue
+                
+                candidates = dp[subsets] + cost[:, v]
+                best_prev = np.argmin(candidates, axis=1)
+                
+                targets = subsets | bit  # 每个 (target, v) 只会被写入一次
+                dp[targets, v] = candidates[np.arange(subsets.size), best_prev]
+                parent[targets, v] = best_prev
+        
+        # 回溯最优路径
+        mask = full - 1
+        v = int(np.argmin(dp[mask]))
+        order = []
+        while v >= 0:
+            order.append(v)
+            prev = int(parent[mask, v])
+            mask ^= 1 << v
+            v = prev
+        
+        return [route[node] for node in reversed(order)]
+    
+    def _local_cost_matrix(self, route: List[int], travel_matrix: TravelMatrix) -> np.ndarray:
+        """抽取路径节点之间的k×k代价矩阵（float64，不可达边使用大的有限值）"""
+        nodes = np.asarray(route, dtype=np.intp)
+        cost = travel_matrix.durations[np.ix_(nodes, nodes)].astype(np.float64)
+        cost[~np.isfinite(cost)] = _UNREACHABLE_COST
+        return cost
+    
+    def _build_neighbor_lists(self, cost: np.ndarray) -> List[List[int]]:
+        """
+        为每个节点构建k近邻候选列表
+        使用双向代价之和，使非对称矩阵下两个方向的边都能被考虑
+        """
+        n = cost.shape[0]
+        k = min(self.neighbor_count, n - 1)
+        symmetric = cost + cost.T
+        np.fill_diagonal(symmetric, np.inf)
+        
+        if k >= n - 1:
+            nearest = np.argsort(symmetric, axis=1)[:, :k]
+        else:
+            nearest = np.argpartition(symmetric, k, axis=1)[:, :k]
+            row_order = np.argsort(np.take_along_axis(symmetric, nearest, axis=1), axis=1)
+            nearest = np.take_along_axis(nearest, row_order, axis=1)
+        
+        return nearest.tolist()
+    
+    def _merge_spatial_neighbors(self,
+                                 neighbors: List[List[int]],
+                                 route: List[int],
+                                 spatial_index: SpatialIndex,
+                                 offset: int = 0) -> List[List[int]]:
+        """
+        将路径节点之间的地理k近邻追加到矩阵k近邻候选列表之后（去重）
+        offset 为候选列表中路径节点之前的虚拟节点数
+        """
+        geographic = spatial_index.subset(route).knn_all(self.neighbor_count) + offset
+        merged = neighbors[:offset]
+        for matrix_nearest, spatial_nearest in zip(neighbors[offset:], geographic.tolist()):
+            seen = set(matrix_nearest)
+            merged.append(matrix_nearest + [node for node in spatial_nearest if node not in seen])
+        return merged
+    
+    def _run_two_opt(self, state: _RouteState, neighbors: List[List[int]]) -> int:
+        """
+        基于候选列表和don't-look bits的2-opt，直到局部最优
+        
+        Returns:
+            应用的移动次数
+        """
+        n = len(state.order)
+        queue = deque(state.order)
+        active = [True] * n
+        moves_applied = 0
+        
+        while queue:
+            a = queue.popleft()
+            active[a] = False
+            
+            best_gain = _MIN_GAIN
+            best_move = None
+            p = state.pos[a]
+            
+            for c in neighbors[a]:
+                q = state.pos[c]
+                
+                # 新边 (a, c)：a 在反转段之前，c 是反转段的末尾（或反之）
+                if q >= p + 2:
+                    i, j = p + 1, q + 1
+                elif p >= q + 2:
+                    i, j = q + 1, p + 1
+                else:
+                    i = j = 0
+                if i:
+                    gain = state.two_opt_gain(i, j)
+                    if gain > best_gain:
+                        best_gain, best_move = gain, (i, j)
+                
+                # 新边 (a, c)：a 是反转段的开头，c 紧随反转段之后（或反之）
+                if p >= 1 and q >= p + 2:
+                    i, j = p, q
+                elif q >= 1 and p >= q + 2:
+                    i, j = q, p
+                else:
+                    continue
+                gain = state.two_opt_gain(i, j)
+                if gain > best_gain:
+                    best_gain, best_move = gain, (i, j)
+            
+            if best_move is None:
+                continue  # 保持don't-look bit
+            
+            i, j = best_move
+            endpoints = [state.order[i - 1], state.order[i], state.order[j - 1]]
+            if j < n:
+                endpoints.append(state.order[j])
+            
+            state.apply_two_opt(i, j)
+            moves_applied += 1
+            
+            # 重新激活受影响的端点
+            for node in endpoints:
+                if not active[node]:
+                    active[node] = True
+                    queue.append(node)
+        
+        return moves_applied
+    
+    def _run_or_opt(self, state: _RouteState, neighbors: List[List[int]], max_segment: int) -> int:
+        """
+        Or-opt：将长度1..max_segment的连续段原样移动到其他位置
+        插入位置只考虑段首节点的近邻之后、段尾节点的近邻之前
+        
+        Returns:
+            应用的移动次数
+        """
+        n = len(state.order)
+        moves_applied = 0
         improved = True
-        iteration = 0
         
-        while improved and iteration < max_iterations:
+        while improved:
             improved = False
-            iteration += 1
-            
-            # 尝试所有可能的2-opt交换
-            for i in range(1, len(route) - 2):
-                for j in range(i + 1, len(route)):
-                    if j - i == 1:  # 跳过相邻的边
-                        continue
+            for length in range(1, min(max_segment, n - 2) + 1):
+                for s in range(1, n - length + 1):
+                    first, last = state.order[s], state.order[s + length - 1]
                     
-                    # 创建新路径：反转i到j之间的段
-                    new_route = route.copy()
-                    new_route[i:j] = reversed(new_route[i:j])
+                    candidates = {state.pos[u] for u in neighbors[first]}
+                    candidates.update(state.pos[v] - 1 for v in neighbors[last])
                     
-                    # 计算新路径的距离
-                    new_distance = self._calculate_total_travel_time(new_route, travel_matrix, all_places)
+                    best_gain = _MIN_GAIN
+                    best_t = None
+                    for t in candidates:
+                        if t < 0 or t == s - 1 or s <= t < s + length:
+                            continue
+                        gain = state.relocate_gain(s, length, t)
+                        if gain > best_gain:
+                            best_gain, best_t = gain, t
                     
-                    # 如果找到更好的路径
-                    if new_distance < best_distance:
-                        best_route = new_route
-                        best_distance = new_distance
+                    if best_t is not None:
+                        state.apply_relocate(s, length, best_t)
+                        moves_applied += 1
                         improved = True
-                        break
+        
+        return moves_applied
+    
+    def _run_exchange(self, state: _RouteState, neighbors: List[List[int]]) -> int:
+        """
+        Exchange：交换两个节点的位置，使节点移到其近邻的前后
+        
+        Returns:
+            应用的移动次数
+        """
+        n = len(state.order)
+        moves_applied = 0
+        improved = True
+        
+        while improved:
+            improved = False
+            for x in range(1, n):
+                a = state.order[x]
                 
-                if improved:
-                    break
-            
-            route = best_route.copy()
+                best_gain = _MIN_GAIN
+                best_pair = None
+                for c in neighbors[a]:
+                    q = state.pos[c]
+                    for y in (q - 1, q + 1):
+                        if y < 1 or y >= n or y == x:
+                            continue
+                        pair = (min(x, y), max(x, y))
+                        gain = state.exchange_gain(*pair)
+                        if gain > best_gain:
+                            best_gain, best_pair = gain, pair
+                
+                if best_pair is not None:
+                    state.apply_exchange(*best_pair)
+                    moves_applied += 1
+                    improved = True
         
-        return best_route
+        return moves_applied
     
     def _calculate_total_travel_time(self, 
-                                   route: List[Place],
-                                   travel_matrix: List[List[Dict[str, Any]]],
-                                   all_places: List[Place]) -> float:
+                                   route: List[int],
+                                   travel_matrix: TravelMatrix) -> float:
         """
-        計算路径的总旅行时间
+        计算路径的总旅行时间 (O(k))
+        
+        Args:
+            route: 以矩阵索引表示的路径
+            travel_matrix: 旅行时间矩阵
         """
         if len(route) <= 1:
             return 0.0
         
-        total_time = 0.0
-        
-        for i in range(len(route) - 1):
-            from_index = all_places.index(route[i])
-            to_index = all_places.index(route[i + 1])
-            travel_time = self._get_travel_time(from_index, to_index, travel_matrix)
-            total_time += travel_time
-        
-        return total_time
+        route_array = np.asarray(route, dtype=np.intp)
+        legs = travel_matrix.durations[route_array[:-1], route_array[1:]]
+        return float(legs.sum(dtype=np.float64))
     
     def _get_travel_time(self, 
                         from_index: int, 
                         to_index: int, 
-                        travel_matrix: List[List[Dict[str, Any]]]) -> float:
+                        travel_matrix: TravelMatrix) -> float:
         """
         获取两点间的旅行时间
         """
-        if (from_index >= len(travel_matrix) or 
-            to_index >= len(travel_matrix[from_index])):
-            return float('inf')
-        
-        element = travel_matrix[from_index][to_index]
-        
-        if element.get('status') == 'OK':
-            return element.get('duration_minutes', float('inf'))
-        else:
-            return float('inf')
+        return travel_matrix.duration(from_index, to_index)
     
     def calculate_route_statistics(self, 
                                  route: List[Place],
-                                 travel_matrix: List[List[Dict[str, Any]]],
-                                 all_places: List[Place]) -> Dict[str, Any]:
+                                 travel_matrix: TravelMatrixLike,
+                                 all_places: List[Place],
+                                 place_index: Optional[PlaceIndex] = None) -> Dict[str, Any]:
         """
         计算路径统计信息
         """
         if not route:
             return {"error": "Empty route"}
         
+        travel_matrix = TravelMatrix.coerce(travel_matrix)
+        if place_index is None:
+            place_index = PlaceIndex(all_places)
+        
         total_visit_time = sum(place.visit_time for place in route)
-        total_travel_time = self._calculate_total_travel_time(route, travel_matrix, all_places)
+        total_travel_time = self._calculate_total_travel_time(place_index.indices(route), travel_matrix)
         total_time = total_visit_time + total_travel_time
         
         # 计算平均旅行时间
@@ -242,13 +700,16 @@ class RouteOptimizer:
     
     def generate_multiple_routes(self, 
                                selected_places: List[Place],
-                               travel_matrix: List[List[Dict[str, Any]]],
+                               travel_matrix: TravelMatrixLike,
                                all_places: List[Place],
-                               num_routes: int = 3) -> List[Tuple[List[Place], Dict[str, Any]]]:
+                               num_routes: int = 3,
+                               moves: Optional[List[str]] = None) -> List[Tuple[List[Place], Dict[str, Any]]]:
         """
         生成多个候选路径并选择最佳的
         """
         routes_with_stats = []
+        travel_matrix = TravelMatrix.coerce(travel_matrix)
+        place_index = PlaceIndex(all_places)
         
         for i in range(num_routes):
             # 随机起始点
@@ -256,11 +717,11 @@ class RouteOptimizer:
             
             # 优化路径
             optimized_route, details = self.optimize_route(
-                selected_places, travel_matrix, all_places, start_index
+                selected_places, travel_matrix, all_places, start_index, place_index, moves
             )
             
             # 计算统计信息
-            stats = self.calculate_route_statistics(optimized_route, travel_matrix, all_places)
+            stats = self.calculate_route_statistics(optimized_route, travel_matrix, all_places, place_index)
             combined_details = {**details, **stats}
             
             routes_with_stats.append((optimized_route, combined_details))
@@ -3,11 +3,66 @@
 实现队友设计文档中的核心评分算法
 """
 
-from typing import List
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+import numpy as np
 from ..models.place import Place
 from ..models.user_preferences import UserPreferences, PreferenceCategory
 
 
+# 特征矩阵的类别列顺序
+CATEGORIES = list(PreferenceCategory)
+CATEGORY_COLUMNS = {category: j for j, category in enumerate(CATEGORIES)}
+
+# 类别特定的质量调整
+CATEGORY_ADJUSTMENTS = {
+    PreferenceCategory.ART: 1.0,
+    PreferenceCategory.FOOD: 1.1,      # 美食评价通常更直观
+    PreferenceCategory.NATURE: 0.9,    # 自然景观评价相对主观
+    PreferenceCategory.CULTURE: 1.0,
+    PreferenceCategory.SHOPPING: 0.8,  # 购物场所评价差异较大
+    PreferenceCategory.ENTERTAINMENT: 1.2,  # 娱乐场所评价通常更明确
+}
+
+
+@dataclass
+class PlaceFeatures:
+    """
+    景点的评分特征（与用户无关，每个候选集只编码一次）
+    - rating: (N,) 0-5 星评分
+    - popularity: (N,) 评价数量因子 (0-1)
+    - categories: (N, K) 多热类别矩阵，列顺序为 CATEGORIES
+    - quality: (N, K) 每个景点在各类别中的质量乘数（不属于该类别时为0）
+    """
+    rating: np.ndarray
+    popularity: np.ndarray
+    categories: np.ndarray
+    quality: np.ndarray
+
+    @property
+    def size(self) -> int:
+        return len(self.rating)
+
+    @property
+    def review(self) -> np.ndarray:
+        """0-10 的评价得分"""
+        return self.rating * 2
+
+
+@dataclass
+class ScoreComponents:
+    """
+    各景点与顶层权重 (weight_rating / weight_preference / weight_travel) 无关的得分分量
+    偏好匹配只依赖类别权重，记录计算它时使用的类别权重，变化时才重算
+    """
+    features: PlaceFeatures
+    review: np.ndarray                                  # (N,) 0-10 评价得分
+    travel_penalty: np.ndarray                          # (N,) 旅行惩罚
+    preference_match: Optional[np.ndarray] = None       # (N,) 偏好匹配得分
+    category_preferences: Optional[Dict[PreferenceCategory, float]] = None
+
+
 class CompositeScoringSystem:
     """
     实现队友设计的综合评分公式：
@@ -111,23 +166,12 @@ class CompositeScoringSystem:
         rating_factor = place.rating / 5.0  # 0-1
         
         # 评价数量因子（更多评价意味着更可靠）
-        import math
         if place.user_ratings_total > 0:
             popularity_factor = min(1.0, math.log10(place.user_ratings_total) / 3.0)
         else:
             popularity_factor = 0.5
         
-        # 类别特定的调整
-        category_adjustments = {
-            PreferenceCategory.ART: 1.0,
-            PreferenceCategory.FOOD: 1.1,      # 美食评价通常更直观
-            PreferenceCategory.NATURE: 0.9,    # 自然景观评价相对主观
-            PreferenceCategory.CULTURE: 1.0,
-            PreferenceCategory.SHOPPING: 0.8,  # 购物场所评价差异较大
-            PreferenceCategory.ENTERTAINMENT: 1.2,  # 娱乐场所评价通常更明确
-        }
-        
-        category_adj = category_adjustments.get(category, 1.0)
+        category_adj = CATEGORY_ADJUSTMENTS.get(category, 1.0)
         
         # 综合质量乘数
         quality_multiplier = (rating_factor * 0.7 + popularity_factor * 0.3) * category_adj
@@ -149,13 +193,124 @@ class CompositeScoringSystem:
         Returns:
             更新得分后的景点列表
         """
-        if travel_penalties is None:
-            travel_penalties = [0.0] * len(places)
+        penalties = np.zeros(len(places), dtype=np.float64)
+        if travel_penalties is not None:
+            count = min(len(places), len(travel_penalties))
+            penalties[:count] = np.asarray(travel_penalties[:count], dtype=np.float64)
+        
+        scores = self.score_matrix(self.encode_places(places), [user_preferences], penalties)[0]
+        for place, score, penalty in zip(places, scores.tolist(), penalties.tolist()):
+            place.composite_score = score
+            place.travel_penalty = penalty
         
+        return places
+    
+    def encode_places(self, places: List[Place]) -> PlaceFeatures:
+        """
+        将景点编码为评分特征：评分向量、评价数量因子向量、多热类别矩阵，
+        质量乘数与 _get_category_quality_multiplier 的公式相同（一次向量运算）
+        """
+        rating = np.array([place.rating for place in places], dtype=np.float64)
+        ratings_total = np.array([place.user_ratings_total for place in places], dtype=np.float64)
+        rows, columns = [], []
         for i, place in enumerate(places):
-            penalty = travel_penalties[i] if i < len(travel_penalties) else 0.0
-            self.calculate_composite_score(place, user_preferences, penalty)
+            for category in place.categories:
+                rows.append(i)
+                columns.append(CATEGORY_COLUMNS[category])
+        categories = np.zeros((len(places), len(CATEGORIES)), dtype=bool)
+        categories[rows, columns] = True
+        
+        with np.errstate(divide="ignore"):
+            popularity = np.where(ratings_total > 0, np.minimum(1.0, np.log10(ratings_total) / 3.0), 0.5)
+        
+        adjustments = np.array([CATEGORY_ADJUSTMENTS.get(category, 1.0) for category in CATEGORIES])
+        quality = np.clip((rating / 5.0 * 0.7 + popularity * 0.3)[:, None] * adjustments[None, :], 0.5, 1.5)
         
+        return PlaceFeatures(
+            rating=rating,
+            popularity=popularity,
+            categories=categories,
+            quality=np.where(categories, quality, 0.0),
+        )
+    
+    def score_matrix(self, 
+                     features: PlaceFeatures,
+                     preferences_list: Sequence[UserPreferences],
+                     travel_penalties: Optional[Sequence[float]] = None) -> np.ndarray:
+        """
+        多个用户对同一批景点的综合得分 (用户数 × 景点数)，与逐个调用
+        calculate_composite_score 的结果一致（只有浮点求和顺序不同）
+        
+        Args:
+            features: encode_places 的结果
+            preferences_list: 用户偏好列表
+            travel_penalties: 旅行惩罚（与用户无关，可选）
+        """
+        penalties = (np.zeros(features.size) if travel_penalties is None
+                     else np.asarray(travel_penalties, dtype=np.float64))
+        match = self.preference_match_matrix(features, preferences_list)
+        
+        rating_weights = np.array([prefs.weight_rating for prefs in preferences_list])[:, None]
+        preference_weights = np.array([prefs.weight_preference for prefs in preferences_list])[:, None]
+        travel_weights = np.array([prefs.weight_travel for prefs in preferences_list])[:, None]
+        
+        scores = (features.review[None, :] * rating_weights +
+                  match * preference_weights -
+                  penalties[None, :] * travel_weights)
+        return np.maximum(scores, 0.0)
+    
+    def preference_match_matrix(self,
+                                features: PlaceFeatures,
+                                preferences_list: Sequence[UserPreferences]) -> np.ndarray:
+        """
+        偏好匹配得分 (用户数 × 景点数)，与 _calculate_preference_match 一致
+        
+        偏好匹配 = Σ_c w_c² · 10 · quality_c / Σ_c w_c（c 为景点所属的类别），
+        对所有用户是一次矩阵乘法；没有正权重类别的景点为 5.0
+        """
+        weights = np.array([[prefs.get_category_weight(c) for c in CATEGORIES] for prefs in preferences_list],
+                           dtype=np.float64).reshape(-1, len(CATEGORIES))
+        
+        total_match = (features.quality * 10.0) @ np.square(weights).T
+        total_weight = features.categories.astype(np.float64) @ weights.T
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(total_weight > 0, np.minimum(10.0, total_match / total_weight), 5.0).T
+    
+    def compute_components(self, 
+                           places: List[Place],
+                           travel_penalties: Optional[Sequence[float]] = None) -> ScoreComponents:
+        """
+        缓存与顶层权重无关的得分分量（评价得分、旅行惩罚；偏好匹配在第一次 rescore 时计算）
+        """
+        features = self.encode_places(places)
+        penalties = np.zeros(features.size, dtype=np.float64)
+        if travel_penalties is not None:
+            penalties[:] = np.asarray(travel_penalties, dtype=np.float64)
+        return ScoreComponents(features=features, review=features.review, travel_penalty=penalties)
+    
+    def rescore(self, components: ScoreComponents, user_preferences: UserPreferences) -> np.ndarray:
+        """
+        用缓存的得分分量重新计算综合得分
+        只改顶层权重时只重算加权和；类别权重变化时重算偏好匹配并更新缓存
+        
+        Returns:
+            (N,) 综合得分，与 batch_calculate_scores 的结果一致
+        """
+        if (components.preference_match is None or
+                components.category_preferences != user_preferences.category_preferences):
+            components.preference_match = self.preference_match_matrix(components.features, [user_preferences])[0]
+            components.category_preferences = dict(user_preferences.category_preferences)
+        
+        scores = (components.review * user_preferences.weight_rating +
+                  components.preference_match * user_preferences.weight_preference -
+                  components.travel_penalty * user_preferences.weight_travel)
+        return np.maximum(scores, 0.0)
+    
+    def apply_scores(self, places: List[Place], scores: Sequence[float]) -> List[Place]:
+        """写入预先计算的综合得分（例如 score_matrix 的一行）"""
+        for place, score in zip(places, scores):
+            place.composite_score = float(score)
         return places
     
     def get_top_scored_places(self, 
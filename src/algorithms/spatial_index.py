@@ -0,0 +1,232 @@
+"""
+空间索引 (Spatial Index)
+候选景点坐标上的均匀网格，支持半径查询和k近邻查询，
+用于路径优化候选列表、聚类和矩阵预筛选，无需扫描整个 N×N 矩阵
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+from ..models.place import Place
+
+# 地球平均半径（米）
+EARTH_RADIUS_METERS = 6371008.8
+
+
+class SpatialIndex:
+    """
+    投影坐标上的均匀网格索引
+
+    - 经纬度按候选集中心纬度做等距圆柱投影（城市范围内误差可忽略）
+    - 点按网格单元排序后以 CSR 形式存储：cell_start[c] : cell_start[c+1] 为单元格 c 的点
+    - 构建 O(N log N)，半径/近邻查询只访问附近的单元格，可扩展到上万个景点
+    """
+
+    # knn_all 每次计算距离块的最大行数
+    BLOCK_SIZE = 256
+
+    def __init__(self, coordinates: np.ndarray, cell_size: Optional[float] = None):
+        """
+        从投影坐标构建索引
+
+        Args:
+            coordinates: (N, 2) 的平面坐标（米）
+            cell_size: 网格边长（米），默认使每个单元格平均约2个点
+        """
+        self.coordinates = np.ascontiguousarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        n = len(self.coordinates)
+
+        if n:
+            self.origin = self.coordinates.min(axis=0)
+            extent = self.coordinates.max(axis=0) - self.origin
+        else:
+            self.origin = np.zeros(2)
+            extent = np.zeros(2)
+
+        if cell_size is None:
+            area = max(float(extent[0]) * float(extent[1]), 1.0)
+            cell_size = max(np.sqrt(2.0 * area / max(n, 1)), 1.0)
+        self.cell_size = float(cell_size)
+        self.grid_shape = (np.floor(extent / self.cell_size).astype(np.int64) + 1)
+
+        cells = self._cell_coords(self.coordinates)
+        cell_ids = cells[:, 0] * self.grid_shape[1] + cells[:, 1]
+        self.order = np.argsort(cell_ids, kind="stable")
+        self.cell_start = np.searchsorted(
+            cell_ids[self.order], np.arange(int(np.prod(self.grid_shape)) + 1)
+        )
+        self._cells = cells
+
+    @classmethod
+    def from_places(cls, places: Sequence[Place], cell_size: Optional[float] = None) -> "SpatialIndex":
+        """从景点坐标构建索引"""
+        return cls(project_places(places), cell_size)
+
+    def __len__(self) -> int:
+        return len(self.coordinates)
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def query_radius(self, index: int, radius: float) -> np.ndarray:
+        """
+        距第 index 个点不超过 radius（米）的所有点（含自身），按索引升序
+        """
+        return self.query_point(self.coordinates[index], radius)
+
+    def query_point(self, point: np.ndarray, radius: float) -> np.ndarray:
+        """距平面坐标 point 不超过 radius（米）的所有点，按索引升序"""
+        point = np.asarray(point, dtype=np.float64)
+        low = self._cell_coords(point - radius)
+        high = self._cell_coords(point + radius)
+        candidates = self._points_in_cells(low, high)
+        if candidates.size == 0:
+            return candidates
+
+        offsets = self.coordinates[candidates] - point
+        inside = np.einsum("ij,ij->i", offsets, offsets) <= radius * radius
+        return np.sort(candidates[inside])
+
+    def within_minutes(self,
+                       index: int,
+                       minutes: float,
+                       speed_kmh: float = 4.8,
+                       detour_factor: float = 1.0) -> np.ndarray:
+        """
+        按直线距离估计 minutes 分钟内可到达的点（含自身）
+
+        Args:
+            index: 出发点
+            minutes: 时间（分钟）
+            speed_kmh: 速度上限
+            detour_factor: 绕行系数（>=1，越大半径越小）
+        """
+        return self.query_radius(index, minutes * speed_kmh * 1000 / 60 / detour_factor)
+
+    def knn(self, index: int, k: int) -> np.ndarray:
+        """
+        第 index 个点的k个最近邻（不含自身），按距离升序
+
+        以所在单元格为中心逐圈扩大搜索范围，直到第k近的距离不超过已搜索范围的内切半径
+        """
+        n = len(self.coordinates)
+        k = min(k, n - 1)
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+
+        center = self._cells[index]
+        max_ring = int(self.grid_shape.max())
+        ring = 1
+        while True:
+            candidates = self._points_in_cells(center - ring, center + ring)
+            candidates = candidates[candidates != index]
+            if candidates.size >= k:
+                distances = self._distances(self.coordinates[index], candidates)
+                nearest = np.argpartition(distances, k - 1)[:k]
+                if distances[nearest].max() <= ring * self.cell_size or ring >= max_ring:
+                    return candidates[nearest[np.argsort(distances[nearest], kind="stable")]]
+            elif ring >= max_ring:
+                distances = self._distances(self.coordinates[index], candidates)
+                return candidates[np.argsort(distances, kind="stable")]
+            ring *= 2
+
+    def knn_all(self, k: int) -> np.ndarray:
+        """
+        所有点的k个最近邻 (N, k)，按距离升序
+
+        按网格单元批量计算：换用平均每格约k个点的粗网格，单元格内的点与周围3×3单元格中的点
+        一次性求距离（循环次数约 N/k）；第k近距离超过一个粗单元格边长的点
+        （周围点太少）再单独用 knn() 查询
+        """
+        n = len(self.coordinates)
+        k = min(k, n - 1)
+        result = np.empty((n, max(k, 0)), dtype=np.intp)
+        if k <= 0:
+            return result
+
+        points_per_cell = n / float(np.prod(self.grid_shape))
+        if points_per_cell < k:
+            batch = SpatialIndex(self.coordinates, self.cell_size * np.sqrt(k / points_per_cell))
+        else:
+            batch = self
+        reach = batch.cell_size
+
+        fallback = []
+        cols = batch.grid_shape[1]
+        for cell_id in np.flatnonzero(np.diff(batch.cell_start)):
+            cell_members = batch.order[batch.cell_start[cell_id]:batch.cell_start[cell_id + 1]]
+            center = np.array([cell_id // cols, cell_id % cols])
+            candidates = batch._points_in_cells(center - 1, center + 1)
+            if candidates.size <= k:
+                fallback.extend(cell_members.tolist())
+                continue
+
+            # 点很密集的单元格分块计算，限制距离块的内存
+            for start in range(0, len(cell_members), self.BLOCK_SIZE):
+                members = cell_members[start:start + self.BLOCK_SIZE]
+                offsets = self.coordinates[members][:, None, :] - self.coordinates[candidates][None, :, :]
+                distances = np.einsum("ijk,ijk->ij", offsets, offsets)
+                distances[members[:, None] == candidates[None, :]] = np.inf
+
+                nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+                nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+                row_order = np.argsort(nearest_distances, axis=1, kind="stable")
+                nearest = np.take_along_axis(nearest, row_order, axis=1)
+                nearest_distances = np.take_along_axis(nearest_distances, row_order, axis=1)
+
+                valid = nearest_distances[:, -1] <= reach * reach
+                result[members[valid]] = candidates[nearest[valid]]
+                fallback.extend(members[~valid].tolist())
+
+        for index in fallback:
+            result[index] = self.knn(index, k)
+        return result
+
+    def subset(self, indices: Sequence[int]) -> "SpatialIndex":
+        """只包含指定点的新索引（新索引中的第i个点对应 indices[i]）"""
+        return SpatialIndex(self.coordinates[np.asarray(indices, dtype=np.intp)])
+
+    # ------------------------------------------------------------------
+    # 内部方法
+    # ------------------------------------------------------------------
+
+    def _cell_coords(self, points: np.ndarray) -> np.ndarray:
+        cells = np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+        return np.clip(cells, 0, self.grid_shape - 1)
+
+    def _points_in_cells(self, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+        """矩形单元格范围 [low, high]（含边界）内的所有点"""
+        low = np.clip(low, 0, self.grid_shape - 1)
+        high = np.clip(high, 0, self.grid_shape - 1)
+        cols = self.grid_shape[1]
+
+        chunks = []
+        for row in range(int(low[0]), int(high[0]) + 1):
+            first = self.cell_start[row * cols + low[1]]
+            last = self.cell_start[row * cols + high[1] + 1]
+            if last > first:
+                chunks.append(self.order[first:last])
+        if not chunks:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(chunks)
+
+    def _distances(self, point: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        offsets = self.coordinates[candidates] - point
+        return np.sqrt(np.einsum("ij,ij->i", offsets, offsets))
+
+
+def project_places(places: Sequence[Place]) -> np.ndarray:
+    """
+    将景点经纬度投影为平面坐标（米）
+    以候选集平均纬度为基准的等距圆柱投影
+    """
+    if not places:
+        return np.empty((0, 2))
+
+    lat = np.radians([place.location.lat for place in places])
+    lng = np.radians([place.location.lng for place in places])
+    x = EARTH_RADIUS_METERS * lng * np.cos(lat.mean())
+    y = EARTH_RADIUS_METERS * lat
+    return np.column_stack([x, y])
@@ -3,9 +3,88 @@
 实现队友设计文档中的Top-N Travel Penalty
 """
 
-from typing import List, Dict, Any
-import statistics
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import numpy as np
 from ..models.place import Place
+from ..models.travel_matrix import TravelMatrix, TravelMatrixLike, CellStatus
+from .clustering import TravelTimeClustering, PlaceCluster
+from .spatial_index import SpatialIndex
+
+
+@dataclass
+class _PenaltyEntry:
+    """
+    缓存的旅行惩罚（只依赖指纹覆盖的子矩阵），以及最近一次使用的矩阵上的连通簇；
+    矩阵只保存弱引用，缓存不会让完整矩阵常驻内存
+    """
+    penalties: np.ndarray
+    top_n_indices: List[int]
+    matrix_ref: Optional[weakref.ref] = None
+    clusters: Dict[Tuple[float, float], List[PlaceCluster]] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+@dataclass
+class ConnectivityAnalysis:
+    """
+    一组景点在一个矩阵上的连通性分析
+    旅行惩罚、连通簇和统计信息都从这里读取，不修改 Place 对象；
+    惩罚在子矩阵相同的矩阵之间共用，簇只在同一个矩阵对象上共用
+    """
+    fingerprint: str                 # 旅行惩罚输入（矩阵维度、前N个景点及其子矩阵）的指纹
+    penalties: np.ndarray            # (N,) 0-10 旅行惩罚（只读）
+    top_n_indices: List[int]         # 前N个高评分景点
+    places: List[Place] = field(repr=False)
+    travel_matrix: TravelMatrix = field(repr=False)
+    _clusters: Dict[Tuple[float, float], List[PlaceCluster]] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def well_connected_indices(self, penalty_threshold: float = 5.0) -> List[int]:
+        """惩罚值不超过阈值（连通性好）的景点索引"""
+        return np.flatnonzero(self.penalties <= penalty_threshold).tolist()
+
+    def clusters(self,
+                 penalty_threshold: float = 5.0,
+                 max_travel_minutes: float = 30.0,
+                 spatial_index: Optional[SpatialIndex] = None) -> List[PlaceCluster]:
+        """
+        连通性好的景点组成的簇（至少两个景点），按参数缓存
+
+        Args:
+            penalty_threshold: 惩罚值阈值
+            max_travel_minutes: 同一簇内相邻景点之间的最大旅行时间
+            spatial_index: 预先构建的景点空间索引（可选）
+        """
+        key = (penalty_threshold, max_travel_minutes)
+        with self._lock:
+            if key not in self._clusters:
+                clustering = TravelTimeClustering(max_travel_minutes, min_cluster_size=2)
+                self._clusters[key] = clustering.cluster(
+                    self.places, self.travel_matrix, self.well_connected_indices(penalty_threshold), spatial_index
+                )
+            return self._clusters[key]
+
+    def statistics(self,
+                   well_connected_threshold: float = 5.0,
+                   poorly_connected_threshold: float = 7.0) -> Dict[str, Any]:
+        """连通性统计信息（簇使用默认的30分钟阈值）"""
+        penalties = self.penalties
+        clusters = self.clusters(well_connected_threshold)
+        return {
+            "total_places": int(penalties.size),
+            "average_penalty": float(penalties.mean()) if penalties.size else 0,
+            "min_penalty": float(penalties.min()) if penalties.size else 0,
+            "max_penalty": float(penalties.max()) if penalties.size else 0,
+            "well_connected_count": int((penalties <= well_connected_threshold).sum()),
+            "poorly_connected_count": int((penalties > poorly_connected_threshold).sum()),
+            "clusters_found": len(clusters),
+            "largest_cluster_size": max((cluster.size for cluster in clusters), default=0),
+        }
 
 
 class TravelPenaltyCalculator:
@@ -13,8 +92,14 @@ class TravelPenaltyCalculator:
     实现队友设计的Top-N旅行惩罚：
     "Calculate each attraction's average distance to the N highest-rated 
     attractions to encourage selection of well-connected, high-quality clusters"
+    
+    旅行惩罚按 (子矩阵指纹, 景点ID与评分) 缓存，指纹只覆盖惩罚实际读取的 N×n 子矩阵，
+    因此查找缓存不需要遍历整个矩阵；连通簇依赖整个矩阵，只在同一个矩阵对象上复用
     """
     
+    # 缓存的旅行惩罚结果数
+    CACHE_SIZE = 4
+    
     def __init__(self, n: int = 5):
         """
         初始化旅行惩罚计算器
@@ -23,10 +108,23 @@ class TravelPenaltyCalculator:
             n: 考虑前N个高评分景点
         """
         self.n = n
+        self._analyses: "OrderedDict[Tuple, _PenaltyEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __getstate__(self):
+        # 缓存和锁不随计算器序列化（求解器会被传给进程池）
+        state = self.__dict__.copy()
+        state["_analyses"] = OrderedDict()
+        del state["_lock"]
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
     
     def calculate_travel_penalties(self, 
                                   places: List[Place], 
-                                  travel_matrix: List[List[Dict[str, Any]]]) -> List[float]:
+                                  travel_matrix: TravelMatrixLike) -> List[float]:
         """
         计算所有景点的旅行惩罚值
         
@@ -37,121 +135,184 @@ class TravelPenaltyCalculator:
         Returns:
             每个景点的旅行惩罚值列表
         """
-        if len(places) <= self.n:
-            # 如果景点数少于等于N，所有景点惩罚都为0
-            return [0.0] * len(places)
+        penalties = self.analyze(places, travel_matrix).penalties.tolist()
         
-        # 1. 获取前N个高评分景点的索引
-        top_n_indices = self._get_top_n_rated_indices(places)
+        # 更新景点对象
+        for place, penalty in zip(places, penalties):
+            place.travel_penalty = penalty
         
-        # 2. 计算每个景点的旅行惩罚
-        penalties = []
-        for i, place in enumerate(places):
-            penalty = self._calculate_single_place_penalty(i, top_n_indices, travel_matrix)
-            penalties.append(penalty)
+        return penalties
+    
+    def analyze(self, 
+                places: List[Place], 
+                travel_matrix: TravelMatrixLike) -> ConnectivityAnalysis:
+        """
+        连通性分析（带缓存，不修改景点对象）
         
-        # 3. 归一化惩罚值 (0-10 scale)
-        normalized_penalties = self._normalize_penalties(penalties)
+        Args:
+            places: 景点列表
+            travel_matrix: 旅行时间矩阵
+            
+        Returns:
+            连通性分析结果
+        """
+        travel_matrix = TravelMatrix.coerce(travel_matrix)
+        
+        # 1. 获取前N个高评分景点的索引（景点数少于等于N时所有景点惩罚都为0）
+        top_n_indices = self._get_top_n_rated_indices(places) if len(places) > self.n else []
+        
+        # 2. 每个景点到前N个景点的旅行时间（N×n 子矩阵），其指纹作为缓存键
+        durations, valid = self._gather_top_n(len(places), top_n_indices, travel_matrix)
+        fingerprint = self._fingerprint(travel_matrix.size, top_n_indices, durations, valid)
+        key = (fingerprint, tuple((place.place_id, place.rating) for place in places), self.n)
+        
+        with self._lock:
+            entry = self._analyses.get(key)
+            if entry is not None:
+                self._analyses.move_to_end(key)
         
-        # 4. 更新景点对象
-        for i, place in enumerate(places):
-            place.travel_penalty = normalized_penalties[i]
+        if entry is None:
+            if top_n_indices:
+                # 3. 平均旅行时间，归一化惩罚值 (0-10 scale)
+                raw_penalties = self._masked_mean(len(places), durations, valid)
+                penalties = np.array(self._normalize_penalties(raw_penalties), dtype=np.float64)
+            else:
+                penalties = np.zeros(len(places))
+            penalties.flags.writeable = False
+            
+            entry = _PenaltyEntry(penalties=penalties, top_n_indices=top_n_indices)
+            with self._lock:
+                self._analyses[key] = entry
+                while len(self._analyses) > self.CACHE_SIZE:
+                    self._analyses.popitem(last=False)
         
-        return normalized_penalties
+        # 簇依赖整个矩阵：不是上次使用的矩阵对象时，在调用方的矩阵上重新计算
+        with entry.lock:
+            if entry.matrix_ref is None or entry.matrix_ref() is not travel_matrix:
+                entry.matrix_ref = weakref.ref(travel_matrix)
+                entry.clusters = {}
+            clusters = entry.clusters
+        
+        return ConnectivityAnalysis(
+            fingerprint=fingerprint,
+            penalties=entry.penalties,
+            top_n_indices=entry.top_n_indices,
+            places=list(places),
+            travel_matrix=travel_matrix,
+            _clusters=clusters,
+            _lock=entry.lock,
+        )
     
     def _get_top_n_rated_indices(self, places: List[Place]) -> List[int]:
         """
         获取前N个高评分景点的索引
+        评分相同时索引小的优先（与按评分稳定降序排序的结果相同）
         
         Args:
             places: 景点列表
             
         Returns:
-            前N个高评分景点的索引列表
+            前N个高评分景点的索引列表（按评分降序）
         """
-        # 创建 (评分, 索引) 对并排序
-        rated_places = [(place.rating, i) for i, place in enumerate(places)]
-        rated_places.sort(reverse=True, key=lambda x: x[0])
+        ratings = np.array([place.rating for place in places], dtype=np.float64)
+        if self.n <= 0 or ratings.size == 0:
+            return []
+        if self.n >= ratings.size:
+            return np.argsort(-ratings, kind="stable").tolist()
         
-        # 返回前N个的索引
-        return [idx for _, idx in rated_places[:self.n]]
+        # 部分选择：第N高的评分为阈值，高于阈值的全部入选，等于阈值的按索引补足
+        threshold = -np.partition(-ratings, self.n - 1)[self.n - 1]
+        above = np.flatnonzero(ratings > threshold)
+        tied = np.flatnonzero(ratings == threshold)[:self.n - above.size]
+        top = np.concatenate([above, tied])
+        return top[np.argsort(-ratings[top], kind="stable")].tolist()
     
-    def _calculate_single_place_penalty(self, 
-                                       place_index: int, 
-                                       top_n_indices: List[int], 
-                                       travel_matrix: List[List[Dict[str, Any]]]) -> float:
+    def _gather_top_n(self, 
+                      count: int, 
+                      top_n_indices: List[int], 
+                      travel_matrix: TravelMatrix) -> Tuple[np.ndarray, np.ndarray]:
         """
-        计算单个景点的旅行惩罚值
+        每个景点到前N个高评分景点的旅行时间子矩阵
         
         Args:
-            place_index: 当前景点索引
+            count: 景点数量
             top_n_indices: 前N个高评分景点索引
             travel_matrix: 旅行时间矩阵
             
         Returns:
-            该景点的旅行惩罚值
+            (旅行时间, 有效掩码)，形状为 (min(count, 矩阵维度), n)；
+            有效 = 状态为OK、时间有限且不是自身
         """
-        if place_index >= len(travel_matrix):
-            return float('inf')
+        rows = min(count, travel_matrix.size)
+        top = np.asarray(top_n_indices, dtype=np.intp)
+        top = top[top < travel_matrix.size]
         
-        travel_times = []
-        
-        for top_index in top_n_indices:
-            if (place_index < len(travel_matrix) and 
-                top_index < len(travel_matrix[place_index]) and
-                travel_matrix[place_index][top_index]['status'] == 'OK'):
-                
-                travel_time = travel_matrix[place_index][top_index]['duration_minutes']
-                
-                # 排除自己到自己的距离
-                if place_index != top_index and travel_time < float('inf'):
-                    travel_times.append(travel_time)
-        
-        if not travel_times:
-            return float('inf')  # 无法到达任何高评分景点
-        
-        # 返回平均旅行时间作为惩罚值
-        return statistics.mean(travel_times)
+        sources = np.arange(rows)
+        durations = travel_matrix.durations[np.ix_(sources, top)].astype(np.float64)
+        valid = ((travel_matrix.status[np.ix_(sources, top)] & CellStatus.OK).astype(bool) &
+                 (durations < np.inf) &
+                 (sources[:, None] != top[None, :]))
+        return durations, valid
+    
+    def _masked_mean(self, count: int, durations: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        """
+        有效单元格的平均旅行时间（原始惩罚值）
+        超出矩阵范围或无法到达任何高评分景点时为 inf
+        """
+        penalties = np.full(count, np.inf)
+        reachable = valid.sum(axis=1)
+        totals = np.where(valid, durations, 0.0).sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            penalties[:durations.shape[0]] = np.where(reachable > 0, totals / reachable, np.inf)
+        return penalties
+    
+    def _fingerprint(self, 
+                     size: int, 
+                     top_n_indices: List[int], 
+                     durations: np.ndarray, 
+                     valid: np.ndarray) -> str:
+        """旅行惩罚全部输入（矩阵维度、前N个景点、子矩阵）的指纹"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.array([size, *top_n_indices], dtype=np.int64).tobytes())
+        digest.update(np.where(valid, durations, np.inf).tobytes())
+        return digest.hexdigest()
     
-    def _normalize_penalties(self, penalties: List[float]) -> List[float]:
+    def _normalize_penalties(self, penalties: Sequence[float]) -> List[float]:
         """
         归一化惩罚值到0-10范围
+        最小值映射到0，最大值映射到10；无法到达(inf)为10；
+        所有有限值相同时全部为5；没有有限值时全部为0
         
         Args:
-            penalties: 原始惩罚值列表
+            penalties: 原始惩罚值
             
         Returns:
             归一化后的惩罚值列表
         """
-        # 过滤掉无限值
-        finite_penalties = [p for p in penalties if p != float('inf')]
+        penalties = np.asarray(penalties, dtype=np.float64)
+        finite = penalties != np.inf
         
-        if not finite_penalties:
-            return [0.0] * len(penalties)
+        if not finite.any():
+            return [0.0] * penalties.size
         
-        min_penalty = min(finite_penalties)
-        max_penalty = max(finite_penalties)
+        min_penalty = penalties[finite].min()
+        max_penalty = penalties[finite].max()
         
         if max_penalty == min_penalty:
             # 所有惩罚值相同，返回中等惩罚
-            return [5.0] * len(penalties)
+            return [5.0] * penalties.size
         
-        # 线性归一化到0-10范围
-        normalized = []
-        for penalty in penalties:
-            if penalty == float('inf'):
-                normalized.append(10.0)  # 最大惩罚
-            else:
-                # 归一化公式：将最小值映射到0，最大值映射到10
-                norm_value = ((penalty - min_penalty) / (max_penalty - min_penalty)) * 10
-                normalized.append(norm_value)
-        
-        return normalized
+        # 线性归一化到0-10范围，无限值为最大惩罚
+        with np.errstate(invalid="ignore"):
+            normalized = (penalties - min_penalty) / (max_penalty - min_penalty) * 10
+        return np.where(finite, normalized, 10.0).tolist()
     
     def get_well_connected_clusters(self, 
                                    places: List[Place], 
-                                   travel_matrix: List[List[Dict[str, Any]]],
-                                   penalty_threshold: float = 5.0) -> List[List[int]]:
+                                   travel_matrix: TravelMatrixLike,
+                                   penalty_threshold: float = 5.0,
+                                   max_travel_minutes: float = 30.0,
+                                   spatial_index: Optional[SpatialIndex] = None) -> List[List[int]]:
         """
         识别连通性好的景点簇
         队友设计中提到的 "well-connected, high-quality clusters"
@@ -160,54 +321,20 @@ class TravelPenaltyCalculator:
             places: 景点列表
             travel_matrix: 旅行时间矩阵
             penalty_threshold: 惩罚值阈值
+            max_travel_minutes: 同一簇内相邻景点之间的最大旅行时间
+            spatial_index: 预先构建的景点空间索引（可选，默认根据places构建）
             
         Returns:
             景点簇列表，每个簇包含景点索引
         """
-        penalties = self.calculate_travel_penalties(places, travel_matrix)
-        
-        # 找出低惩罚值的景点（连通性好）
-        well_connected_indices = [
-            i for i, penalty in enumerate(penalties) 
-            if penalty <= penalty_threshold
-        ]
-        
-        if not well_connected_indices:
-            return []
-        
-        # 简单的聚类：基于旅行时间的邻近性
-        clusters = []
-        used_indices = set()
-        
-        for idx in well_connected_indices:
-            if idx in used_indices:
-                continue
-            
-            cluster = [idx]
-            used_indices.add(idx)
-            
-            # 找出与当前景点旅行时间较短的其他景点
-            for other_idx in well_connected_indices:
-                if (other_idx not in used_indices and
-                    idx < len(travel_matrix) and
-                    other_idx < len(travel_matrix[idx]) and
-                    travel_matrix[idx][other_idx]['status'] == 'OK'):
-                    
-                    travel_time = travel_matrix[idx][other_idx]['duration_minutes']
-                    
-                    # 如果旅行时间小于30分钟，认为是同一簇
-                    if travel_time <= 30:
-                        cluster.append(other_idx)
-                        used_indices.add(other_idx)
-            
-            if len(cluster) > 1:  # 只保留包含多个景点的簇
-                clusters.append(cluster)
-        
-        return clusters
+        clusters = self.analyze(places, travel_matrix).clusters(
+            penalty_threshold, max_travel_minutes, spatial_index
+        )
+        return [cluster.members for cluster in clusters]
     
     def analyze_connectivity(self, 
                            places: List[Place], 
-                           travel_matrix: List[List[Dict[str, Any]]]) -> Dict[str, Any]:
+                           travel_matrix: TravelMatrixLike) -> Dict[str, Any]:
         """
         分析景点连通性统计信息
         
@@ -218,16 +345,4 @@ class TravelPenaltyCalculator:
         Returns:
             连通性分析结果
         """
-        penalties = self.calculate_travel_penalties(places, travel_matrix)
-        clusters = self.get_well_connected_clusters(places, travel_matrix)
-        
-        return {
-            "total_places": len(places),
-            "average_penalty": statistics.mean(penalties) if penalties else 0,
-            "min_penalty": min(penalties) if penalties else 0,
-            "max_penalty": max(penalties) if penalties else 0,
-            "well_connected_count": sum(1 for p in penalties if p <= 5.0),
-            "poorly_connected_count": sum(1 for p in penalties if p > 7.0),
-            "clusters_found": len(clusters),
-            "largest_cluster_size": max((len(c) for c in clusters), default=0),
-        }
+        return self.analyze(places, travel_matrix).statistics()
@@ -0,0 +1,338 @@
+"""
+API结果的本地缓存
+- 旅行时间按 (起点place_id, 终点place_id, 交通方式, 出发时间段) 缓存到SQLite，
+  带TTL过期和LRU淘汰，避免重复规划同一城市时重新请求整个 N² 矩阵
+- 景点搜索结果按 (查询, 景点类型, 城市) 缓存 Place 字段（JSON）及下一页令牌
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from ..models.place import Place, Location
+from ..models.user_preferences import PreferenceCategory
+from ..models.travel_matrix import TravelMatrix, CellStatus
+
+
+class TravelTimeCache:
+    """
+    旅行时间单元格缓存（SQLite）
+
+    - 默认 ":memory:"，传入文件路径则跨进程/跨运行持久化
+    - 条目超过 ttl_seconds 视为过期
+    - 条目数超过 max_entries 时按最近使用时间淘汰 (LRU)
+    """
+
+    # SQLite 单条语句的参数个数上限（旧版本为999）
+    _MAX_QUERY_IDS = 500
+
+    def __init__(self,
+                 path: str = ":memory:",
+                 ttl_seconds: float = 7 * 24 * 3600,
+                 max_entries: int = 500_000,
+                 bucket_minutes: int = 60,
+                 clock: Callable[[], float] = time.time):
+        """
+        初始化缓存
+
+        Args:
+            path: SQLite数据库路径
+            ttl_seconds: 条目有效期（秒）
+            max_entries: 最大条目数
+            bucket_minutes: 出发时间分段长度（分钟）
+            clock: 时间函数（便于测试）
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.bucket_minutes = bucket_minutes
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS travel_times (
+                origin TEXT NOT NULL,
+                destination TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                status INTEGER NOT NULL,
+                duration REAL,
+                distance REAL,
+                traffic REAL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (origin, destination, mode, bucket)
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_travel_times_last_used ON travel_times (last_used)"
+        )
+        self._conn.commit()
+
+    def time_bucket(self, departure_time: Optional[datetime]) -> int:
+        """出发时间所在的时间段编号（无出发时间为0）"""
+        if departure_time is None:
+            return 0
+        return int(departure_time.timestamp() // (self.bucket_minutes * 60))
+
+    def load_into(self,
+                  matrix: TravelMatrix,
+                  place_ids: List[str],
+                  mode: str,
+                  bucket: int) -> np.ndarray:
+        """
+        将缓存命中的单元格写入矩阵
+
+        Args:
+            matrix: 要填充的 N×N 矩阵
+            place_ids: 矩阵各行/列对应的 place_id
+            mode: 交通方式
+            bucket: 出发时间段
+
+        Returns:
+            仍需请求的单元格布尔掩码 (N×N)
+        """
+        n = len(place_ids)
+        needed = np.ones((n, n), dtype=bool)
+        positions = {}
+        for i, place_id in enumerate(place_ids):
+            positions.setdefault(place_id, []).append(i)
+
+        now = self.clock()
+        unique_ids = list(positions)
+        rows = []
+        with self._lock:
+            for k in range(0, len(unique_ids), self._MAX_QUERY_IDS):
+                chunk = unique_ids[k:k + self._MAX_QUERY_IDS]
+                marks = ",".join("?" * len(chunk))
+                rows.extend(self._conn.execute(
+                    f"SELECT rowid, origin, destination, status, duration, distance, traffic "
+                    f"FROM travel_times WHERE mode = ? AND bucket = ? AND created_at >= ? "
+                    f"AND origin IN ({marks})",
+                    [mode, bucket, now - self.ttl_seconds, *chunk]
+                ).fetchall())
+
+            used = []
+            for rowid, origin, destination, status, duration, distance, traffic in rows:
+                if destination not in positions:
+                    continue
+                used.append((now, rowid))
+                for i in positions[origin]:
+                    for j in positions[destination]:
+                        needed[i, j] = False
+                        matrix.status[i, j] = status
+                        if status & CellStatus.OK:
+                            matrix.durations[i, j] = duration
+                            matrix.distances[i, j] = distance
+                            if traffic is not None:
+                                matrix.traffic_durations[i, j] = traffic
+
+            # LRU：更新命中条目的最近使用时间
+            self._conn.executemany("UPDATE travel_times SET last_used = ? WHERE rowid = ?", used)
+            self._conn.commit()
+
+        hit_count = int(n * n - needed.sum())
+        self.hits += hit_count
+        self.misses += int(needed.sum())
+        return needed
+
+    def store(self,
+              matrix: TravelMatrix,
+              place_ids: List[str],
+              cells: np.ndarray,
+              mode: str,
+              bucket: int):
+        """
+        将矩阵中已获取的单元格写入缓存
+
+        Args:
+            matrix: 旅行时间矩阵
+            place_ids: 矩阵各行/列对应的 place_id
+            cells: 要写入的单元格布尔掩码（未填充的单元格会被跳过）
+            mode: 交通方式
+            bucket: 出发时间段
+        """
+        now = self.clock()
+        rows = []
+        for i, j in zip(*np.nonzero(cells & (matrix.status != 0))):
+            status = int(matrix.status[i, j])
+            ok = bool(status & CellStatus.OK)
+            traffic = float(matrix.traffic_durations[i, j])
+            rows.append((
+                place_ids[i], place_ids[j], mode, bucket, status,
+                float(matrix.durations[i, j]) if ok else None,
+                float(matrix.distances[i, j]) if ok else None,
+                traffic if ok and not np.isnan(traffic) else None,
+                now, now
+            ))
+
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO travel_times VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """删除过期条目，并按LRU淘汰超出容量的条目"""
+        self._conn.execute("DELETE FROM travel_times WHERE created_at < ?",
+                           (now - self.ttl_seconds,))
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM travel_times WHERE rowid IN "
+                "(SELECT rowid FROM travel_times ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM travel_times")
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM travel_times").fetchone()[0]
+
+
+def _place_to_dict(place: Place) -> dict:
+    """Place -> 可JSON序列化的字典"""
+    return {
+        "name": place.name,
+        "address": place.address,
+        "place_id": place.place_id,
+        "lat": place.location.lat,
+        "lng": place.location.lng,
+        "rating": place.rating,
+        "user_ratings_total": place.user_ratings_total,
+        "place_types": list(place.place_types),
+        "visit_time": place.visit_time,
+        "categories": sorted(category.value for category in place.categories),
+        "interest_score": place.interest_score,
+    }
+
+
+def _place_from_dict(data: dict) -> Place:
+    """_place_to_dict 的逆操作"""
+    place = Place(
+        name=data["name"],
+        address=data["address"],
+        place_id=data["place_id"],
+        location=Location(lat=data["lat"], lng=data["lng"]),
+        rating=data["rating"],
+        user_ratings_total=data["user_ratings_total"],
+        place_types=data["place_types"],
+        visit_time=data["visit_time"],
+        categories={PreferenceCategory(value) for value in data["categories"]},
+    )
+    place.interest_score = data["interest_score"]
+    return place
+
+
+class PlacesSearchCache:
+    """
+    景点文本搜索结果缓存（SQLite）
+
+    保存 Place 的字段（JSON，不反序列化任意对象）和 next_page_token，
+    读取时构造新的 Place 对象，无需重新解析API响应；结果不足时可从保存的令牌继续翻页。
+    Google 的翻页令牌只在几分钟内有效，因此令牌使用单独的较短有效期
+    """
+
+    def __init__(self,
+                 path: str = ":memory:",
+                 ttl_seconds: float = 24 * 3600,
+                 page_token_ttl_seconds: float = 120,
+                 clock: Callable[[], float] = time.time):
+        """
+        初始化缓存
+
+        Args:
+            path: SQLite数据库路径（可与 TravelTimeCache 共用同一文件）
+            ttl_seconds: 条目有效期（秒）
+            page_token_ttl_seconds: 下一页令牌的有效期（秒），过期后需要重新搜索才能获取更多结果
+            clock: 时间函数（便于测试）
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.page_token_ttl_seconds = page_token_ttl_seconds
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS places_search_json (
+                query TEXT NOT NULL,
+                place_type TEXT NOT NULL,
+                city TEXT NOT NULL,
+                places TEXT NOT NULL,
+                next_page_token TEXT,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (query, place_type, city)
+            )
+        """)
+        self._conn.commit()
+
+    def get(self,
+            query: str,
+            place_type: str,
+            city: str) -> Optional[Tuple[List[Place], Optional[str], bool]]:
+        """
+        读取缓存的搜索结果
+
+        Returns:
+            (景点列表, 下一页令牌, 是否还有更多结果)，未命中或已过期时为None；
+            令牌过期但还有更多结果时为 (景点列表, None, True)
+        """
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT places, next_page_token, created_at FROM places_search_json "
+                "WHERE query = ? AND place_type = ? AND city = ? AND created_at >= ?",
+                (query, place_type, city, now - self.ttl_seconds)
+            ).fetchone()
+
+        if row is None:
+            return None
+        blob, next_page_token, created_at = row
+        has_more = next_page_token is not None
+        if created_at < now - self.page_token_ttl_seconds:
+            next_page_token = None
+        return [_place_from_dict(data) for data in json.loads(blob)], next_page_token, has_more
+
+    def put(self,
+            query: str,
+            place_type: str,
+            city: str,
+            places: List[Place],
+            next_page_token: Optional[str]):
+        """保存搜索结果（覆盖旧条目）"""
+        blob = json.dumps([_place_to_dict(place) for place in places], ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO places_search_json VALUES (?, ?, ?, ?, ?, ?)",
+                (query, place_type, city, blob, next_page_token, self.clock())
+            )
+            self._conn.commit()
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM places_search_json")
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
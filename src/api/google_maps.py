@@ -3,32 +3,73 @@ Google Maps Distance Matrix API 封装
 实现队友设计中的实时数据集成和预测建模
 """
 
+import asyncio
 import requests
 import os
-from typing import List, Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
+import numpy as np
 from ..models.place import Place
+from ..models.travel_matrix import TravelMatrix
+from .cache import TravelTimeCache
+from .transport import HttpTransport, AsyncHttpTransport
+from .single_flight import SingleFlight
+from .matrix_provider import TravelMatrixProvider
 
 
-class GoogleMapsAPI:
+class GoogleMapsAPI(TravelMatrixProvider):
     """Google Maps Distance Matrix API 封装类"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    # Distance Matrix API 单次请求的限制
+    MAX_DIMENSION = 25    # 起点或终点最多25个
+    MAX_ELEMENTS = 100    # 起点数 × 终点数 最多100
+    
+    # 稀疏单元格打包时，块内需要的单元格占比下限（其余为顺带请求的元素）
+    MIN_BLOCK_FILL = 0.4
+    
+    def __init__(self, 
+                 api_key: Optional[str] = None, 
+                 max_concurrency: int = 4,
+                 cache: Optional[TravelTimeCache] = None,
+                 transport: Optional[HttpTransport] = None,
+                 async_transport: Optional[AsyncHttpTransport] = None,
+                 single_flight: Optional[SingleFlight] = None):
+        """
+        初始化 Distance Matrix API 客户端
+        
+        Args:
+            api_key: Google Maps API密钥
+            max_concurrency: 分块请求的最大并发数
+            cache: 旅行时间缓存（None表示不缓存）
+            transport: 共享的HTTP传输层（默认新建一个）
+            async_transport: 异步方法使用的传输层（默认新建一个，需要httpx）
+            single_flight: 请求合并器，相同的并发矩阵请求只执行一次（None表示不合并）
+        """
         self.api_key = api_key or os.getenv("GOOGLE_MAPS_API_KEY")
         if not self.api_key:
             raise ValueError("Google Maps API key is required")
         
+        self.transport = transport or HttpTransport()
+        self.async_transport = async_transport or AsyncHttpTransport()
         self.base_url = "https://maps.googleapis.com/maps/api/distancematrix/json"
+        self.max_concurrency = max(1, max_concurrency)
+        self.cache = cache
+        self.single_flight = single_flight
     
     def get_travel_time_matrix(self, 
                               places: List[Place], 
                               mode: str = "walking",
                               departure_time: Optional[datetime] = None,
-                              traffic_model: str = "best_guess") -> List[List[Dict[str, Any]]]:
+                              traffic_model: str = "best_guess") -> TravelMatrix:
         """
         获取景点间的旅行时间矩阵
         实现队友设计中的实时数据集成
         
+        N×N 矩阵按API限制（25个起点/终点、100个元素）切分为多个块，
+        在 max_concurrency 限制下并发请求后拼接为一个矩阵；
+        配置了缓存时只请求缓存未命中的单元格
+        
         Args:
             places: 景点列表
             mode: 交通方式 (walking, driving, bicycling, transit)
@@ -36,19 +77,301 @@ class GoogleMapsAPI:
             traffic_model: 交通模型 (best_guess, pessimistic, optimistic)
             
         Returns:
-            旅行时间矩阵
+            旅行时间矩阵（获取失败时为空矩阵）
         """
+        if self.single_flight is None:
+            return self._get_travel_time_matrix(places, mode, departure_time, traffic_model)
+        
+        matrix, _ = self.single_flight.do(
+            self._flight_key(places, mode, departure_time, traffic_model),
+            lambda: self._get_travel_time_matrix(places, mode, departure_time, traffic_model)
+        )
+        return matrix.copy()
+    
+    def _get_travel_time_matrix(self, 
+                                places: List[Place], 
+                                mode: str,
+                                departure_time: Optional[datetime],
+                                traffic_model: str) -> TravelMatrix:
+        """get_travel_time_matrix 的实际实现（不合并请求）"""
         if not places:
+            return TravelMatrix.empty()
+        
+        matrix, needed, cache_key = self._prepare_matrix(places, mode, departure_time, traffic_model)
+        if self._fetch_cells(places, matrix, needed, cache_key, mode, departure_time, traffic_model) is None:
+            return TravelMatrix.empty()
+        
+        return matrix
+    
+    def get_travel_time_cells(self, 
+                              places: List[Place],
+                              cells: np.ndarray,
+                              mode: str = "walking",
+                              departure_time: Optional[datetime] = None,
+                              traffic_model: str = "best_guess") -> Tuple[TravelMatrix, int]:
+        """
+        只获取指定的单元格（例如候选景点间的近邻对）
+        稀疏单元格被打包成共享的请求块，块内顺带请求的单元格同样写入矩阵
+        
+        Args:
+            places: 景点列表
+            cells: N×N 布尔掩码，True 表示需要该单元格
+            mode: 交通方式
+            departure_time: 出发时间
+            traffic_model: 交通模型
+            
+        Returns:
+            (矩阵, 实际请求（计费）的元素数)；未请求且未命中缓存的单元格为未填充状态 (status=0)，
+            获取失败时为 (空矩阵, 0)
+        """
+        if not places:
+            return TravelMatrix.empty(), 0
+        
+        matrix, needed, cache_key = self._prepare_matrix(places, mode, departure_time, traffic_model)
+        needed &= cells
+        elements = self._fetch_cells(places, matrix, needed, cache_key, mode, departure_time, traffic_model)
+        if elements is None:
+            return TravelMatrix.empty(), 0
+        
+        return matrix, elements
+    
+    def _fetch_cells(self, 
+                     places: List[Place],
+                     matrix: TravelMatrix,
+                     needed: np.ndarray,
+                     cache_key: Optional[Tuple[str, int]],
+                     mode: str,
+                     departure_time: Optional[datetime],
+                     traffic_model: str) -> Optional[int]:
+        """
+        分块并发请求 needed 中的单元格，写入矩阵和缓存
+        
+        Returns:
+            请求的元素数（含块内顺带请求的单元格），任一块失败时为None
+        """
+        blocks = self._plan_missing_blocks(needed)
+        if not blocks:
+            return 0
+        
+        block_params = self._block_params(places, blocks, mode, departure_time, traffic_model)
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(blocks))) as executor:
+            responses = list(executor.map(self._request_block, block_params))
+        if not self._merge_blocks(places, blocks, responses, matrix):
+            return None
+        
+        self._store_fetched(places, matrix, self._blocks_mask(matrix.size, blocks), cache_key)
+        return sum(len(origins) * len(destinations) for origins, destinations in blocks)
+    
+    async def get_travel_time_matrix_async(self, 
+                                           places: List[Place], 
+                                           mode: str = "walking",
+                                           departure_time: Optional[datetime] = None,
+                                           traffic_model: str = "best_guess") -> TravelMatrix:
+        """
+        get_travel_time_matrix 的异步版本
+        各块在 max_concurrency 限制下通过 async_transport 并发请求，不占用线程
+        """
+        if self.single_flight is None:
+            return await self._get_travel_time_matrix_async(places, mode, departure_time, traffic_model)
+        
+        matrix, _ = await self.single_flight.do_async(
+            self._flight_key(places, mode, departure_time, traffic_model),
+            lambda: self._get_travel_time_matrix_async(places, mode, departure_time, traffic_model)
+        )
+        return matrix.copy()
+    
+    async def _get_travel_time_matrix_async(self, 
+                                            places: List[Place], 
+                                            mode: str,
+                                            departure_time: Optional[datetime],
+                                            traffic_model: str) -> TravelMatrix:
+        """get_travel_time_matrix_async 的实际实现（不合并请求）"""
+        if not places:
+            return TravelMatrix.empty()
+        
+        matrix, needed, cache_key = self._prepare_matrix(places, mode, departure_time, traffic_model)
+        blocks = self._plan_missing_blocks(needed)
+        block_params = self._block_params(places, blocks, mode, departure_time, traffic_model)
+        
+        if blocks:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            
+            async def fetch(params):
+                async with semaphore:
+                    return await self._request_block_async(params)
+            
+            responses = await asyncio.gather(*(fetch(params) for params in block_params))
+            if not self._merge_blocks(places, blocks, responses, matrix):
+                return TravelMatrix.empty()
+            self._store_fetched(places, matrix, self._blocks_mask(matrix.size, blocks), cache_key)
+        
+        return matrix
+    
+    def _flight_key(self, 
+                    places: List[Place],
+                    mode: str,
+                    departure_time: Optional[datetime],
+                    traffic_model: str) -> tuple:
+        """
+        请求合并的键：相同景点序列、交通方式和出发时间（精确到分钟，仅 driving 模式使用）
+        """
+        departure = None
+        if mode == "driving" and departure_time:
+            departure = (int(departure_time.timestamp() // 60), traffic_model)
+        return ("travel_time_matrix", tuple(place.place_id for place in places), mode, departure)
+    
+    def _prepare_matrix(self, 
+                        places: List[Place],
+                        mode: str,
+                        departure_time: Optional[datetime],
+                        traffic_model: str) -> Tuple[TravelMatrix, np.ndarray, Optional[Tuple[str, int]]]:
+        """
+        分配矩阵并填入缓存命中的单元格
+        
+        Returns:
+            (矩阵, 需要请求的单元格掩码, 缓存键)
+        """
+        n = len(places)
+        matrix = TravelMatrix.allocate(n)
+        
+        if self.cache is None:
+            return matrix, np.ones((n, n), dtype=bool), None
+        
+        cache_key = self._cache_key(mode, departure_time, traffic_model)
+        needed = self.cache.load_into(matrix, [place.place_id for place in places], *cache_key)
+        return matrix, needed, cache_key
+    
+    def _store_fetched(self, 
+                       places: List[Place],
+                       matrix: TravelMatrix,
+                       fetched: np.ndarray,
+                       cache_key: Optional[Tuple[str, int]]):
+        """将新请求到的单元格写入缓存"""
+        if self.cache is not None:
+            self.cache.store(matrix, [place.place_id for place in places], fetched, *cache_key)
+    
+    def _cache_key(self, 
+                   mode: str, 
+                   departure_time: Optional[datetime],
+                   traffic_model: str) -> Tuple[str, int]:
+        """
+        缓存键中的 (交通方式, 出发时间段)
+        只有 driving 模式会发送出发时间，其他模式的结果与时间段无关
+        """
+        if mode == "driving" and departure_time:
+            return f"{mode}:{traffic_model}", self.cache.time_bucket(departure_time)
+        return mode, 0
+    
+    def _plan_missing_blocks(self, needed: np.ndarray) -> List[Tuple[List[int], List[int]]]:
+        """
+        只为需要请求的单元格分块：
+        1. 缺失终点集合相同的起点归为一组，能填满整块的组按API限制直接切分
+           （完整矩阵、新增景点的整行等）
+        2. 其余稀疏单元格（例如近邻对）由 _pack_sparse_cells 打包成共享的 起点 × 终点 块，
+           打包不能减少请求数时仍按组切分（不多请求元素）
+        """
+        groups: Dict[Tuple[int, ...], List[int]] = {}
+        for i in np.flatnonzero(needed.any(axis=1)):
+            destinations = tuple(int(j) for j in np.flatnonzero(needed[i]))
+            groups.setdefault(destinations, []).append(int(i))
+        
+        blocks, sparse_blocks = [], []
+        sparse = np.zeros(needed.shape, dtype=bool)
+        for destinations, origins in groups.items():
+            if len(origins) * len(destinations) >= self.MAX_ELEMENTS:
+                blocks.extend(self._plan_blocks(origins, list(destinations)))
+            else:
+                sparse_blocks.extend(self._plan_blocks(origins, list(destinations)))
+                sparse[np.ix_(origins, destinations)] = True
+        
+        packed = self._pack_sparse_cells(sparse)
+        blocks.extend(packed if len(packed) < len(sparse_blocks) else sparse_blocks)
+        return blocks
+    
+    def _pack_sparse_cells(self, needed: np.ndarray) -> List[Tuple[List[int], List[int]]]:
+        """
+        将稀疏单元格贪心打包为满足API限制的 起点 × 终点 块
+        
+        每块从剩余单元格最多的起点出发，反复加入新增终点最少（重叠最多）的起点，
+        块的终点为这些起点所需终点的并集；块内不需要的单元格被顺带请求（按元素计费，
+        但请求数大幅减少），加入起点后需要的单元格占比低于 MIN_BLOCK_FILL 时停止
+        """
+        rows = np.flatnonzero(needed.any(axis=1))
+        cols = np.flatnonzero(needed.any(axis=0))
+        remaining = needed[np.ix_(rows, cols)]
+        
+        blocks = []
+        while remaining.any():
+            counts = remaining.sum(axis=1)
+            seed = int(np.argmax(counts))
+            in_origins = np.zeros(len(rows), dtype=bool)
+            in_origins[seed] = True
+            in_destinations = np.zeros(len(cols), dtype=bool)
+            in_destinations[np.flatnonzero(remaining[seed])[:min(self.MAX_DIMENSION, self.MAX_ELEMENTS)]] = True
+            n_origins, useful = 1, int(in_destinations.sum())
+            
+            while n_origins < self.MAX_DIMENSION:
+                n_destinations = int(in_destinations.sum())
+                added = (remaining & ~in_destinations).sum(axis=1)
+                union = n_destinations + added
+                size = (n_origins + 1) * union
+                fits = (~in_origins & (counts > 0) & (union <= self.MAX_DIMENSION) &
+                        (size <= self.MAX_ELEMENTS) & (useful + counts >= self.MIN_BLOCK_FILL * size))
+                if not fits.any():
+                    break
+                
+                overlap = (remaining & in_destinations).sum(axis=1)
+                r = int(np.argmin(np.where(fits, added * (self.MAX_DIMENSION + 1) - overlap, np.iinfo(np.int64).max)))
+                in_origins[r] = True
+                in_destinations |= remaining[r]
+                n_origins += 1
+                useful += int(counts[r])
+            
+            origin_positions = np.flatnonzero(in_origins)
+            destination_positions = np.flatnonzero(in_destinations)
+            remaining[np.ix_(origin_positions, destination_positions)] = False
+            blocks.append((rows[origin_positions].tolist(), cols[destination_positions].tolist()))
+        
+        return blocks
+    
+    def _blocks_mask(self, n: int, blocks: List[Tuple[List[int], List[int]]]) -> np.ndarray:
+        """各块覆盖的单元格掩码"""
+        mask = np.zeros((n, n), dtype=bool)
+        for origin_indices, destination_indices in blocks:
+            mask[np.ix_(origin_indices, destination_indices)] = True
+        return mask
+    
+    def _plan_blocks(self, 
+                     origin_indices: List[int], 
+                     destination_indices: List[int]) -> List[Tuple[List[int], List[int]]]:
+        """
+        将 起点 × 终点 切分为满足API限制的块
+        
+        Returns:
+            [(起点索引列表, 终点索引列表), ...]
+        """
+        if not origin_indices or not destination_indices:
             return []
         
-        # 构建位置字符串
+        destination_chunk = min(self.MAX_DIMENSION, len(destination_indices))
+        origin_chunk = max(1, min(self.MAX_DIMENSION, self.MAX_ELEMENTS // destination_chunk))
+        
+        return [
+            (origin_indices[i:i + origin_chunk], destination_indices[j:j + destination_chunk])
+            for i in range(0, len(origin_indices), origin_chunk)
+            for j in range(0, len(destination_indices), destination_chunk)
+        ]
+    
+    def _block_params(self, 
+                      places: List[Place],
+                      blocks: List[Tuple[List[int], List[int]]],
+                      mode: str,
+                      departure_time: Optional[datetime],
+                      traffic_model: str) -> List[Dict[str, Any]]:
+        """为每个块生成请求参数"""
         locations = [f"{place.location.lat},{place.location.lng}" for place in places]
-        origins = "|".join(locations)
-        destinations = origins  # 全对全矩阵
         
         params = {
-            "origins": origins,
-            "destinations": destinations,
             "mode": mode,
             "key": self.api_key,
             "units": "metric"
@@ -59,60 +382,108 @@ class GoogleMapsAPI:
             params["departure_time"] = int(departure_time.timestamp())
             params["traffic_model"] = traffic_model
         
+        return [
+            {
+                **params,
+                "origins": "|".join(locations[i] for i in origin_indices),
+                "destinations": "|".join(locations[j] for j in destination_indices),
+            }
+            for origin_indices, destination_indices in blocks
+        ]
+    
+    def _merge_blocks(self, 
+                      places: List[Place],
+                      blocks: List[Tuple[List[int], List[int]]],
+                      responses: List[Optional[dict]],
+                      matrix: TravelMatrix) -> bool:
+        """
+        将各块的响应写入矩阵
+        
+        Returns:
+            是否全部成功
+        """
+        if any(data is None for data in responses):
+            return False
+        
         try:
-            response = requests.get(self.base_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get("status") != "OK":
-                error_msg = data.get("error_message", "Unknown error")
-                print(f"Distance Matrix API Error: {data.get('status')} - {error_msg}")
-                return []
-            
-            return self._parse_matrix_response(data, places)
-            
+            for (origin_indices, destination_indices), data in zip(blocks, responses):
+                self._parse_matrix_response(data, places, matrix, origin_indices, destination_indices)
+        except Exception as e:
+            print(f"Error parsing distance matrix response: {e}")
+            return False
+        
+        return True
+    
+    def _request_block(self, params: Dict[str, Any]) -> Optional[dict]:
+        """请求一个矩阵块，失败时返回None"""
+        try:
+            return self._check_block_response(self.transport.get_json(self.base_url, params))
         except requests.RequestException as e:
             print(f"Error fetching travel times: {e}")
-            return []
-        except Exception as e:
+            return None
+        except ValueError as e:
             print(f"Error parsing distance matrix response: {e}")
-            return []
+            return None
+    
+    async def _request_block_async(self, params: Dict[str, Any]) -> Optional[dict]:
+        """异步请求一个矩阵块，失败时返回None"""
+        try:
+            return self._check_block_response(await self.async_transport.get_json(self.base_url, params))
+        except requests.RequestException as e:
+            print(f"Error fetching travel times: {e}")
+            return None
+        except ValueError as e:
+            print(f"Error parsing distance matrix response: {e}")
+            return None
+    
+    def _check_block_response(self, data: dict) -> Optional[dict]:
+        """检查响应状态，非OK时打印错误并返回None"""
+        if data.get("status") != "OK":
+            error_msg = data.get("error_message", "Unknown error")
+            print(f"Distance Matrix API Error: {data.get('status')} - {error_msg}")
+            return None
+        return data
     
-    def _parse_matrix_response(self, data: dict, places: List[Place]) -> List[List[Dict[str, Any]]]:
-        """解析距离矩阵API响应"""
-        matrix = []
+    def _parse_matrix_response(self, 
+                               data: dict, 
+                               places: List[Place],
+                               matrix: Optional[TravelMatrix] = None,
+                               origin_indices: Optional[List[int]] = None,
+                               destination_indices: Optional[List[int]] = None) -> TravelMatrix:
+        """
+        解析距离矩阵API响应，直接写入稠密数组
         
-        for i, row in enumerate(data.get("rows", [])):
-            matrix_row = []
-            
-            for j, element in enumerate(row.get("elements", [])):
-                if element["status"] == "OK":
-                    travel_info = {
-                        "duration_seconds": element["duration"]["value"],
-                        "duration_minutes": element["duration"]["value"] / 60,
-                        "distance_meters": element["distance"]["value"],
-                        "from_place": places[i].name if i < len(places) else "Unknown",
-                        "to_place": places[j].name if j < len(places) else "Unknown",
-                        "status": "OK"
-                    }
-                    
-                    # 如果有交通信息（driving mode）
-                    if "duration_in_traffic" in element:
-                        travel_info["duration_in_traffic_seconds"] = element["duration_in_traffic"]["value"]
-                        travel_info["duration_in_traffic_minutes"] = element["duration_in_traffic"]["value"] / 60
-                else:
-                    travel_info = {
-                        "duration_seconds": float('inf'),
-                        "duration_minutes": float('inf'),
-                        "distance_meters": float('inf'),
-                        "from_place": places[i].name if i < len(places) else "Unknown",
-                        "to_place": places[j].name if j < len(places) else "Unknown",
-                        "status": element["status"]
-                    }
+        Args:
+            data: API响应
+            places: 全部景点列表
+            matrix: 要写入的矩阵（默认新建 len(places) 维矩阵）
+            origin_indices: 响应中各行对应的矩阵行索引（默认 0..N-1）
+            destination_indices: 响应中各列对应的矩阵列索引（默认 0..N-1）
+        """
+        if matrix is None:
+            matrix = TravelMatrix.allocate(len(places))
+        if origin_indices is None:
+            origin_indices = list(range(matrix.size))
+        if destination_indices is None:
+            destination_indices = list(range(matrix.size))
+        
+        for i, row in zip(origin_indices, data.get("rows", [])):
+            for j, element in zip(destination_indices, row.get("elements", [])):
+                if element["status"] != "OK":
+                    matrix.set_cell(i, j, element["status"])
+                    continue
                 
-                matrix_row.append(travel_info)
-            
-            matrix.append(matrix_row)
+                # 如果有交通信息（driving mode）
+                traffic_minutes = None
+                if "duration_in_traffic" in element:
+                    traffic_minutes = element["duration_in_traffic"]["value"] / 60
+                
+                matrix.set_cell(
+                    i, j, "OK",
+                    duration_minutes=element["duration"]["value"] / 60,
+                    distance_meters=element["distance"]["value"],
+                    traffic_minutes=traffic_minutes
+                )
         
         return matrix
     
@@ -141,8 +512,8 @@ class GoogleMapsAPI:
         matrix = self.get_travel_time_matrix([place1, place2], 
                                            departure_time=departure_time)
         
-        if matrix and len(matrix) > 0 and len(matrix[0]) > 1:
-            base_time = matrix[0][1]["duration_minutes"]
+        if matrix.is_ok(0, 1):
+            base_time = matrix.duration(0, 1)
             
             # 应用安全缓冲
             predicted_time = base_time * safety_buffer
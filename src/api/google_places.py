@@ -3,21 +3,49 @@ Google Places API 封装
 从原main.py中提取并改进
 """
 
+import asyncio
+import copy
 import requests
 import os
-from typing import List, Optional
+import time
+from typing import List, Optional, Tuple
 from ..models.place import Place, Location
+from .cache import PlacesSearchCache
+from .transport import HttpTransport, AsyncHttpTransport
+from .single_flight import SingleFlight
 
 
 class GooglePlacesAPI:
     """Google Places API 封装类"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, 
+                 api_key: Optional[str] = None,
+                 cache: Optional[PlacesSearchCache] = None,
+                 page_token_delay: float = 2.0,
+                 transport: Optional[HttpTransport] = None,
+                 async_transport: Optional[AsyncHttpTransport] = None,
+                 single_flight: Optional[SingleFlight] = None):
+        """
+        初始化 Places API 客户端
+        
+        Args:
+            api_key: Google Maps API密钥
+            cache: 搜索结果缓存（None表示不缓存）
+            page_token_delay: 使用 next_page_token 前的等待时间（秒），令牌生效前请求会返回 INVALID_REQUEST
+            transport: 共享的HTTP传输层（默认新建一个）
+            async_transport: 异步方法使用的传输层（默认新建一个，需要httpx）
+            single_flight: 请求合并器，相同的并发搜索只请求一次（None表示不合并）
+        """
         self.api_key = api_key or os.getenv("GOOGLE_MAPS_API_KEY")
         if not self.api_key:
             raise ValueError("Google Maps API key is required")
         
+        self.transport = transport or HttpTransport()
+        self.async_transport = async_transport or AsyncHttpTransport()
         self.base_url = "https://maps.googleapis.com/maps/api/place"
+        self.cache = cache
+        self.page_token_delay = page_token_delay
+        self.single_flight = single_flight
     
     def search_places(self, 
                      city: str = "Vancouver", 
@@ -25,6 +53,8 @@ class GooglePlacesAPI:
                      max_results: int = 10) -> List[Place]:
         """
         搜索景点
+        结果不足 max_results 时按 next_page_token 继续翻页；
+        配置了缓存时优先使用缓存，只在缓存结果不够时继续请求后续页面
         
         Args:
             city: 城市名称
@@ -34,36 +64,194 @@ class GooglePlacesAPI:
         Returns:
             景点列表
         """
+        if self.single_flight is None:
+            return self._search_places(city, place_type, max_results)
+        
+        # 合并相同的并发搜索；共享的 Place 对象会被评分修改，每个调用方拿到独立副本
+        places, _ = self.single_flight.do(
+            ("search_places", city, place_type, max_results),
+            lambda: self._search_places(city, place_type, max_results)
+        )
+        return copy.deepcopy(places)
+    
+    def _search_places(self, city: str, place_type: str, max_results: int) -> List[Place]:
+        """search_places 的实际实现（不合并请求）"""
+        query = f"{place_type} in {city}"
+        
+        cached = self.cache.get(query, place_type, city) if self.cache is not None else None
+        if cached is not None:
+            places, next_page_token, has_more = cached
+            if len(places) >= max_results or not has_more:
+                return places[:max_results]
+            
+            # 从保存的令牌继续翻页；令牌已过期或失效时重新搜索
+            if next_page_token is not None:
+                more = self._fetch_pages(query, max_results, places, next_page_token)
+                if more is not None:
+                    return self._remember(query, place_type, city, more, max_results)
+        
+        fetched = self._fetch_pages(query, max_results, [], None)
+        if fetched is None:
+            return []
+        return self._remember(query, place_type, city, fetched, max_results)
+    
+    async def search_places_async(self, 
+                                  city: str = "Vancouver", 
+                                  place_type: str = "tourist_attraction", 
+                                  max_results: int = 10) -> List[Place]:
+        """
+        search_places 的异步版本（通过 async_transport 请求，翻页等待不阻塞事件循环）
+        """
+        if self.single_flight is None:
+            return await self._search_places_async(city, place_type, max_results)
+        
+        places, _ = await self.single_flight.do_async(
+            ("search_places", city, place_type, max_results),
+            lambda: self._search_places_async(city, place_type, max_results)
+        )
+        return copy.deepcopy(places)
+    
+    async def _search_places_async(self, city: str, place_type: str, max_results: int) -> List[Place]:
+        """search_places_async 的实际实现（不合并请求）"""
+        query = f"{place_type} in {city}"
+        
+        cached = self.cache.get(query, place_type, city) if self.cache is not None else None
+        if cached is not None:
+            places, next_page_token, has_more = cached
+            if len(places) >= max_results or not has_more:
+                return places[:max_results]
+            
+            if next_page_token is not None:
+                more = await self._fetch_pages_async(query, max_results, places, next_page_token)
+                if more is not None:
+                    return self._remember(query, place_type, city, more, max_results)
+        
+        fetched = await self._fetch_pages_async(query, max_results, [], None)
+        if fetched is None:
+            return []
+        return self._remember(query, place_type, city, fetched, max_results)
+    
+    def _remember(self, 
+                  query: str,
+                  place_type: str,
+                  city: str,
+                  fetched: Tuple[List[Place], Optional[str]],
+                  max_results: int) -> List[Place]:
+        """缓存搜索结果并返回前 max_results 个"""
+        places, next_page_token = fetched
+        if self.cache is not None and places:
+            self.cache.put(query, place_type, city, places, next_page_token)
+        return places[:max_results]
+    
+    def _fetch_pages(self, 
+                     query: str, 
+                     max_results: int,
+                     places: List[Place],
+                     next_page_token: Optional[str]) -> Optional[Tuple[List[Place], Optional[str]]]:
+        """
+        逐页请求直到结果数达到 max_results 或没有下一页
+        
+        Args:
+            query: 搜索语句
+            max_results: 需要的结果数
+            places: 已有的结果
+            next_page_token: 继续翻页的令牌（None表示从第一页开始）
+            
+        Returns:
+            (全部结果, 下一页令牌)；第一页请求失败时为None
+        """
         url = f"{self.base_url}/textsearch/json"
-        params = {
-            "query": f"{place_type} in {city}",
-            "key": self.api_key
-        }
+        places = list(places)
+        first_request = True
         
-        try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
+        while len(places) < max_results:
+            if next_page_token is not None:
+                time.sleep(self.page_token_delay)
             
-            if data.get("status") != "OK":
-                error_msg = data.get("error_message", "Unknown error")
-                print(f"API Error: {data.get('status')} - {error_msg}")
-                return []
+            data = self._request_page(url, self._page_params(query, next_page_token))
+            if data is None:
+                # 第一个请求失败视为整体失败；之后的页面失败则保留已有结果
+                return None if first_request else (places, None)
+            first_request = False
             
-            places = []
-            for result in data.get("results", [])[:max_results]:
-                place = self._parse_place_result(result)
-                if place:
-                    places.append(place)
+            next_page_token = self._consume_page(data, places)
+            if next_page_token is None:
+                break
+        
+        return places, next_page_token
+    
+    async def _fetch_pages_async(self, 
+                                 query: str, 
+                                 max_results: int,
+                                 places: List[Place],
+                                 next_page_token: Optional[str]) -> Optional[Tuple[List[Place], Optional[str]]]:
+        """_fetch_pages 的异步版本"""
+        url = f"{self.base_url}/textsearch/json"
+        places = list(places)
+        first_request = True
+        
+        while len(places) < max_results:
+            if next_page_token is not None:
+                await asyncio.sleep(self.page_token_delay)
             
-            return places
+            data = await self._request_page_async(url, self._page_params(query, next_page_token))
+            if data is None:
+                return None if first_request else (places, None)
+            first_request = False
             
+            next_page_token = self._consume_page(data, places)
+            if next_page_token is None:
+                break
+        
+        return places, next_page_token
+    
+    def _page_params(self, query: str, next_page_token: Optional[str]) -> dict:
+        """第一页用查询语句，后续页面用 next_page_token"""
+        if next_page_token is None:
+            return {"query": query, "key": self.api_key}
+        return {"pagetoken": next_page_token, "key": self.api_key}
+    
+    def _consume_page(self, data: dict, places: List[Place]) -> Optional[str]:
+        """解析一页结果追加到 places，返回下一页令牌"""
+        for result in data.get("results", []):
+            place = self._parse_place_result(result)
+            if place:
+                places.append(place)
+        return data.get("next_page_token")
+    
+    def _request_page(self, url: str, params: dict) -> Optional[dict]:
+        """请求一页搜索结果，失败时返回None"""
+        try:
+            return self._check_page_response(self.transport.get_json(url, params))
         except requests.RequestException as e:
             print(f"Error fetching places: {e}")
-            return []
+            return None
         except Exception as e:
             print(f"Error parsing API response: {e}")
-            return []
+            return None
+    
+    async def _request_page_async(self, url: str, params: dict) -> Optional[dict]:
+        """异步请求一页搜索结果，失败时返回None"""
+        try:
+            return self._check_page_response(await self.async_transport.get_json(url, params))
+        except requests.RequestException as e:
+            print(f"Error fetching places: {e}")
+            return None
+        except Exception as e:
+            print(f"Error parsing API response: {e}")
+            return None
+    
+    def _check_page_response(self, data: dict) -> Optional[dict]:
+        """检查响应状态：ZERO_RESULTS 视为空页，其他非OK状态打印错误并返回None"""
+        if data.get("status") == "ZERO_RESULTS":
+            return {"results": []}
+        
+        if data.get("status") != "OK":
+            error_msg = data.get("error_message", "Unknown error")
+            print(f"API Error: {data.get('status')} - {error_msg}")
+            return None
+        
+        return data
     
     def _parse_place_result(self, result: dict) -> Optional[Place]:
         """解析API返回的景点数据"""
@@ -0,0 +1,102 @@
+"""
+请求合并 (Single-Flight)
+相同键的并发请求只执行一次，所有等待者得到同一个结果；
+同时支持线程调用 (do) 和 asyncio 调用 (do_async)
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    """一次进行中的线程调用"""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    相同键的并发调用合并为一次
+
+    返回 (结果, 是否为共享结果)：共享结果与发起者拿到的是同一个对象，
+    调用方如需修改结果应自行复制
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+        self.executed = 0    # 实际执行的次数
+        self.coalesced = 0   # 被合并（共享结果）的次数
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        线程调用：同一键正在执行时等待其结果，否则执行 fn
+
+        Returns:
+            (结果, 是否为共享结果)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    async def do_async(self,
+                       key: Hashable,
+                       fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        asyncio调用：同一事件循环内同一键正在执行时等待其结果，否则执行 fn()
+
+        执行放在独立的任务中，发起者被取消时不影响其他等待者
+
+        Returns:
+            (结果, 是否为共享结果)
+        """
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is not None:
+                self.coalesced += 1
+                shared = True
+            else:
+                task = self._tasks[task_key] = loop.create_task(fn())
+                self.executed += 1
+                shared = False
+                task.add_done_callback(lambda _: self._forget(task_key))
+
+        return await asyncio.shield(task), shared
+
+    def _forget(self, task_key: Tuple[int, Hashable]):
+        with self._lock:
+            self._tasks.pop(task_key, None)
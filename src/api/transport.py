@@ -0,0 +1,286 @@
+"""
+Google API 共用的HTTP传输层
+- requests.Session + HTTPAdapter 连接池（keep-alive，避免每次请求重新握手）
+- 每次请求的连接/读取超时
+- OVER_QUERY_LIMIT、429 和 5xx 时指数退避重试
+- 请求级指标：延迟、字节数、重试次数
+- AsyncHttpTransport：基于 httpx 的异步版本（可选依赖）
+"""
+
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+@dataclass
+class TransportMetrics:
+    """请求统计"""
+    requests: int = 0          # 成功收到响应的请求数（含重试）
+    retries: int = 0           # 重试次数
+    failures: int = 0          # 最终失败的调用数
+    bytes_received: int = 0    # 响应体字节数
+    total_latency: float = 0.0 # 累计延迟（秒）
+    max_latency: float = 0.0   # 最大单次延迟（秒）
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "bytes_received": self.bytes_received,
+            "avg_latency_ms": self.total_latency / self.requests * 1000 if self.requests else 0.0,
+            "max_latency_ms": self.max_latency * 1000,
+        }
+
+
+class _RetryingTransport:
+    """同步与异步传输层共用的重试策略和指标记录"""
+
+    # 响应体中需要重试的API状态
+    RETRY_API_STATUSES = frozenset({"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"})
+
+    # 需要重试的HTTP状态码
+    RETRY_HTTP_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self,
+                 timeout: Union[float, Tuple[float, float]],
+                 max_retries: int,
+                 backoff_factor: float,
+                 max_backoff: float):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.metrics = TransportMetrics()
+        self._lock = threading.Lock()
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """第 attempt 次重试前的等待时间（指数退避，带抖动）"""
+        delay = min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+        with self._lock:
+            self.metrics.retries += 1
+        return delay * random.uniform(0.5, 1.0)
+
+    def _record_response(self, latency: float, size: int):
+        with self._lock:
+            self.metrics.requests += 1
+            self.metrics.bytes_received += size
+            self.metrics.total_latency += latency
+            self.metrics.max_latency = max(self.metrics.max_latency, latency)
+
+    def _record_failure(self):
+        with self._lock:
+            self.metrics.failures += 1
+
+
+class HttpTransport(_RetryingTransport):
+    """
+    共享的HTTP传输对象，注入到 GooglePlacesAPI 和 GoogleMapsAPI
+    线程安全：Session 的连接池可被并发的分块请求共用
+    """
+
+    def __init__(self,
+                 timeout: Union[float, Tuple[float, float]] = (3.05, 15.0),
+                 max_retries: int = 3,
+                 backoff_factor: float = 0.5,
+                 max_backoff: float = 8.0,
+                 pool_size: int = 16,
+                 session: Optional[requests.Session] = None,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        初始化传输层
+
+        Args:
+            timeout: 每次请求的超时（秒），或 (连接超时, 读取超时)
+            max_retries: 最大重试次数
+            backoff_factor: 退避基数，第k次重试前等待 backoff_factor × 2^k 秒（带抖动）
+            max_backoff: 单次退避的最长等待（秒）
+            pool_size: 每个主机的最大保持连接数（应不小于分块请求的并发数）
+            session: 自定义 requests.Session
+            sleep: 等待函数（便于测试）
+        """
+        super().__init__(timeout, max_retries, backoff_factor, max_backoff)
+        self.sleep = sleep
+
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get_json(self, url: str, params: Dict[str, Any]) -> dict:
+        """
+        GET请求并解析JSON，按需重试
+
+        Returns:
+            响应JSON（重试用尽后仍为 OVER_QUERY_LIMIT 等状态时原样返回，由调用方处理）
+
+        Raises:
+            requests.RequestException: 网络错误或HTTP错误在重试用尽后仍未恢复
+        """
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    self._record_failure()
+                    raise
+                self.sleep(self._backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            self._record_response(time.perf_counter() - start, len(response.content))
+
+            if response.status_code in self.RETRY_HTTP_STATUSES and attempt < self.max_retries:
+                self.sleep(self._backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            try:
+                response.raise_for_status()
+                data = response.json()
+            except (requests.RequestException, ValueError):
+                self._record_failure()
+                raise
+
+            if data.get("status") in self.RETRY_API_STATUSES and attempt < self.max_retries:
+                self.sleep(self._backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            return data
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncHttpTransport(_RetryingTransport):
+    """
+    基于 httpx.AsyncClient 的异步传输层（httpx 为可选依赖，首次请求时才导入）
+    重试策略与 HttpTransport 相同；httpx 的异常转换为对应的 requests 异常，
+    因此API客户端可以用同一套错误处理
+
+    httpx 的连接绑定在创建它的事件循环上，因此每个事件循环使用各自的 AsyncClient，
+    同一个传输层可以在多次 asyncio.run() 中复用。事件循环结束前应调用 aclose()
+    关闭当前循环的客户端（或使用 async with）；未关闭的客户端在其事件循环关闭后
+    下次请求时被丢弃
+    """
+
+    def __init__(self,
+                 timeout: Union[float, Tuple[float, float]] = (3.05, 15.0),
+                 max_retries: int = 3,
+                 backoff_factor: float = 0.5,
+                 max_backoff: float = 8.0,
+                 pool_size: int = 100,
+                 sleep: Optional[Callable[[float], Awaitable[None]]] = None):
+        """
+        初始化异步传输层
+
+        Args:
+            timeout: 每次请求的超时（秒），或 (连接超时, 读取超时)
+            max_retries: 最大重试次数
+            backoff_factor: 退避基数
+            max_backoff: 单次退避的最长等待（秒）
+            pool_size: 最大连接数（一个事件循环上所有并发规划共用）
+            sleep: 异步等待函数（默认 asyncio.sleep，便于测试）
+        """
+        super().__init__(timeout, max_retries, backoff_factor, max_backoff)
+        self.pool_size = pool_size
+        self.sleep = sleep or asyncio.sleep
+        self._clients = {}
+        self._clients_lock = threading.Lock()
+
+    def _get_client(self):
+        """当前事件循环的 AsyncClient（首次使用时创建）"""
+        loop = asyncio.get_running_loop()
+        with self._clients_lock:
+            for stale in [other for other in self._clients if other.is_closed()]:
+                del self._clients[stale]
+            client = self._clients.get(loop)
+        
+        if client is None:
+            try:
+                import httpx
+            except ImportError as e:
+                raise ImportError("Async planning requires httpx: pip install httpx") from e
+
+            if isinstance(self.timeout, tuple):
+                connect, read = self.timeout
+                timeout = httpx.Timeout(read, connect=connect)
+            else:
+                timeout = httpx.Timeout(self.timeout)
+            limits = httpx.Limits(max_connections=self.pool_size,
+                                  max_keepalive_connections=self.pool_size)
+            client = httpx.AsyncClient(timeout=timeout, limits=limits)
+            with self._clients_lock:
+                self._clients[loop] = client
+        return client
+
+    async def get_json(self, url: str, params: Dict[str, Any]) -> dict:
+        """
+        异步GET请求并解析JSON，按需重试
+
+        Raises:
+            requests.RequestException: 网络错误或HTTP错误在重试用尽后仍未恢复
+        """
+        client = self._get_client()
+        import httpx
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = await client.get(url, params=params)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    self._record_failure()
+                    if isinstance(e, httpx.TimeoutException):
+                        raise requests.Timeout(str(e)) from e
+                    raise requests.ConnectionError(str(e)) from e
+                await self.sleep(self._backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            self._record_response(time.perf_counter() - start, len(response.content))
+
+            if response.status_code in self.RETRY_HTTP_STATUSES and attempt < self.max_retries:
+                await self.sleep(self._backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            try:
+                response.raise_for_status()
+                data = response.json()
+            except httpx.HTTPStatusError as e:
+                self._record_failure()
+                raise requests.HTTPError(str(e)) from e
+            except ValueError:
+                self._record_failure()
+                raise
+
+            if data.get("status") in self.RETRY_API_STATUSES and attempt < self.max_retries:
+                await self.sleep(self._backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            return data
+
+    async def aclose(self):
+        """关闭当前事件循环的客户端（其他事件循环的客户端不受影响）"""
+        with self._clients_lock:
+            client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
@@ -0,0 +1,93 @@
+"""
+交互式规划会话 (Plan Session)
+候选景点和距离矩阵只获取一次；用户调整权重后重新规划时不访问网络
+"""
+
+from typing import List, Dict, Any, Optional
+from datetime import datetime
+from ..models.place import Place
+from ..models.user_preferences import UserPreferences
+from ..models.travel_matrix import TravelMatrix
+from .plan_solver import PlanSolver
+
+
+class PlanSession:
+    """
+    一个城市的交互式规划（例如用户拖动权重滑块）：
+    1. 旅行惩罚与评价得分在创建会话时计算一次，偏好匹配只在类别权重变化时重算，
+       权重变化时只重算加权和（CompositeScoringSystem.rescore）
+    2. 选择使用定向问题求解器，从上一次的行程热启动，只需很小的时间预算
+    """
+
+    def __init__(self,
+                 plan_solver: PlanSolver,
+                 city: str,
+                 candidate_places: List[Place],
+                 travel_matrix: TravelMatrix,
+                 place_type: str = "tourist_attraction",
+                 travel_mode: str = "walking",
+                 network_metrics: Optional[Dict[str, Any]] = None,
+                 time_budget_ms: Optional[float] = None,
+                 replan_budget_ms: float = 5.0):
+        """
+        初始化规划会话
+
+        Args:
+            plan_solver: 求解器（选择、路径优化、行程生成）
+            city: 城市名称
+            candidate_places: 候选景点（第0个为起点）
+            travel_matrix: 旅行时间矩阵
+            time_budget_ms: 第一次规划的求解时间预算（默认使用定向问题求解器的设置）
+            replan_budget_ms: 热启动重新规划的求解时间预算
+        """
+        self.plan_solver = plan_solver
+        self.city = city
+        self.candidate_places = candidate_places
+        self.travel_matrix = travel_matrix
+        self.place_type = place_type
+        self.travel_mode = travel_mode
+        self.network_metrics = network_metrics or {}
+        self.time_budget_ms = time_budget_ms
+        self.replan_budget_ms = replan_budget_ms
+
+        solver = plan_solver.orienteering_solver
+        self.scoring_system = solver.scoring_system
+        travel_penalties = solver.penalty_calculator.calculate_travel_penalties(candidate_places, travel_matrix)
+        self.components = self.scoring_system.compute_components(candidate_places, travel_penalties)
+
+        self._positions = {place.place_id: i for i, place in enumerate(candidate_places)}
+        self.route: Optional[List[int]] = None
+        self.last_result: Optional[Dict[str, Any]] = None
+
+    def plan(self, user_preferences: UserPreferences, time_limit: int) -> Dict[str, Any]:
+        """
+        规划（或根据新的偏好/时间限制重新规划）
+
+        Returns:
+            plan_tour 格式的结果，另含 "session": {"warm_start", "elapsed_ms"}
+        """
+        planning_start_time = datetime.now()
+        scores = self.scoring_system.rescore(self.components, user_preferences)
+
+        warm_start = self.route is not None
+        options: Dict[str, Any] = {}
+        if warm_start:
+            options["initial_route"] = self.route
+            options["time_budget_ms"] = self.replan_budget_ms
+        elif self.time_budget_ms is not None:
+            options["time_budget_ms"] = self.time_budget_ms
+
+        result = self.plan_solver.solve(
+            self.city, user_preferences, time_limit, self.candidate_places, self.travel_matrix,
+            self.place_type, len(self.candidate_places), self.travel_mode, "orienteering", options,
+            planning_start_time, self.network_metrics, composite_scores=scores
+        )
+
+        if result.get("success"):
+            self.route = [self._positions[place["place_id"]] for place in result["selected_places"]]
+        result["session"] = {
+            "warm_start": warm_start,
+            "elapsed_ms": (datetime.now() - planning_start_time).total_seconds() * 1000,
+        }
+        self.last_result = result
+        return result
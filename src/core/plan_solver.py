@@ -0,0 +1,243 @@
+"""
+规划求解器 (Plan Solver)
+规划流程中纯CPU的部分：景点选择、路径优化、生成行程与统计
+不持有网络客户端，可以序列化后在进程池中执行（多日规划按天并行求解）
+"""
+
+from typing import List, Dict, Any, Optional, Sequence
+from datetime import datetime
+from ..models.place import Place, PlaceIndex
+from ..models.user_preferences import UserPreferences
+from ..models.travel_matrix import TravelMatrix, SharedTravelMatrix
+from ..algorithms.enhanced_knapsack import EnhancedKnapsackSolver
+from ..algorithms.route_optimizer import RouteOptimizer
+from ..algorithms.spatial_index import SpatialIndex
+from ..algorithms.orienteering import OrienteeringSolver
+from ..algorithms.cluster_first import ClusterFirstSolver
+
+
+class PlanSolver:
+    """
+    景点选择 + 路径优化 + 行程生成
+    """
+    
+    def __init__(self):
+        self.knapsack_solver = EnhancedKnapsackSolver()
+        self.orienteering_solver = OrienteeringSolver()
+        self.cluster_first_solver = ClusterFirstSolver(self.knapsack_solver)
+        self.route_optimizer = RouteOptimizer()
+        
+        # 景点选择策略：接口均为 solve(places, prefs, matrix, time_limit, start_location_index, **options)
+        self.selection_strategies = {
+            "knapsack": self.knapsack_solver,
+            "orienteering": self.orienteering_solver,
+            "cluster_first": self.cluster_first_solver,
+        }
+    
+    def solve(self, 
+              city: str,
+              user_preferences: UserPreferences,
+              time_limit: int,
+              candidate_places: List[Place],
+              travel_matrix: TravelMatrix,
+              place_type: str,
+              max_places: int,
+              travel_mode: str,
+              strategy: str,
+              strategy_options: Optional[Dict[str, Any]],
+              planning_start_time: datetime,
+              network_metrics: Dict[str, Any],
+              include_start: bool = False,
+              composite_scores: Optional[Sequence[float]] = None) -> Dict[str, Any]:
+        """
+        规划流程的求解部分（Step 3-6），纯CPU计算
+        同步、异步、多日与批量规划共用；起点为 candidate_places 的第0个景点
+        
+        Args:
+            include_start: 起点未被选中时也放在路径首位（多日行程每天从酒店出发）
+            composite_scores: 预先计算的各候选景点综合得分（批量规划），跳过选择策略中的评分
+        """
+        selection_options = dict(strategy_options or {})
+        if composite_scores is not None:
+            selection_options["composite_scores"] = composite_scores
+        
+        # 景点 <-> 矩阵索引映射与空间索引，整个规划过程共用
+        place_index = PlaceIndex(candidate_places)
+        spatial_index = SpatialIndex.from_places(candidate_places)
+        
+        # Step 3: 队友设计的Step 1 - Enhanced Knapsack（或定向问题联合求解）
+        print(f"\n🎒 Step 3: 执行景点选择算法（{strategy}）...")
+        selected_places, total_score, knapsack_details = self.selection_strategies[strategy].solve(
+            candidate_places,
+            user_preferences, 
+            travel_matrix,
+            time_limit,
+            start_location_index=0,
+            **selection_options
+        )
+        
+        print(f"✅ 选中 {len(selected_places)} 个景点，总得分 {total_score:.2f}")
+        
+        if not selected_places:
+            return {
+                "error": "在时间限制内无法访问任何景点",
+                "time_limit": time_limit,
+                "candidates": len(candidate_places)
+            }
+        
+        if include_start and not any(place is candidate_places[0] for place in selected_places):
+            selected_places = [candidate_places[0]] + list(selected_places)
+        
+        # Step 4: 队友设计的Step 2 - Route Optimization  
+        print(f"\n🛣️ Step 4: 执行路径优化算法...")
+        optimized_route, route_details = self.route_optimizer.optimize_route(
+            selected_places,
+            travel_matrix,
+            candidate_places,
+            start_index=0,
+            place_index=place_index,
+            spatial_index=spatial_index
+        )
+        
+        print(f"✅ 路径优化完成，改进 {route_details.get('improvement_percent', 0):.1f}%")
+        
+        # Step 5: 生成详细行程
+        print(f"\n📅 Step 5: 生成详细行程...")
+        detailed_itinerary = self._generate_detailed_itinerary(
+            optimized_route, travel_matrix, place_index
+        )
+        
+        # Step 6: 计算最终统计
+        final_stats = self.route_optimizer.calculate_route_statistics(
+            optimized_route, travel_matrix, candidate_places, place_index
+        )
+        
+        planning_end_time = datetime.now()
+        planning_duration = (planning_end_time - planning_start_time).total_seconds()
+        
+        print(f"✅ 规划完成！耗时 {planning_duration:.1f} 秒")
+        
+        # 组织完整结果
+        result = {
+            "success": True,
+            "city": city,
+            "planning_time": planning_duration,
+            "user_preferences": {
+                "travel_style": user_preferences.travel_style.value,
+                "weights": {
+                    "rating": user_preferences.weight_rating,
+                    "preference": user_preferences.weight_preference,
+                    "travel": user_preferences.weight_travel
+                }
+            },
+            "algorithm_results": {
+                "step1_knapsack": knapsack_details,
+                "step2_route_optimization": route_details
+            },
+            "selected_places": [
+                {
+                    "name": place.name,
+                    "place_id": place.place_id,
+                    "address": place.address,
+                    "rating": place.rating,
+                    "visit_time": place.visit_time,
+                    "composite_score": place.composite_score,
+                    "categories": [cat.value for cat in place.categories]
+                }
+                for place in optimized_route
+            ],
+            "itinerary": detailed_itinerary,
+            "statistics": final_stats,
+            "matrix_source": travel_matrix.source,
+            "estimated_cells": travel_matrix.estimated_cells,
+            "network_metrics": network_metrics,
+            "parameters": {
+                "time_limit": time_limit,
+                "travel_mode": travel_mode,
+                "max_places": max_places,
+                "place_type": place_type,
+                "strategy": strategy
+            }
+        }
+        
+        return result
+    
+    def _generate_detailed_itinerary(self, 
+                                   route: List[Place],
+                                   travel_matrix: TravelMatrix,
+                                   place_index: PlaceIndex) -> List[Dict[str, Any]]:
+        """
+        生成详细的行程安排
+        """
+        itinerary = []
+        current_time = 0
+        route_indices = place_index.indices(route)
+        
+        for i, place in enumerate(route):
+            # 访问活动
+            visit_item = {
+                "type": "visit",
+                "place_name": place.name,
+                "address": place.address,
+                "start_time": current_time,
+                "duration": place.visit_time,
+                "end_time": current_time + place.visit_time,
+                "activity": f"参观 {place.name}",
+                "rating": place.rating,
+                "composite_score": place.composite_score
+            }
+            itinerary.append(visit_item)
+            current_time += place.visit_time
+            
+            # 旅行到下一个地点（如果不是最后一个）
+            if i < len(route) - 1:
+                next_place = route[i + 1]
+                
+                from_index = route_indices[i]
+                to_index = route_indices[i + 1]
+                
+                travel_time = self._get_travel_time(from_index, to_index, travel_matrix)
+                
+                travel_item = {
+                    "type": "travel",
+                    "from_place": place.name,
+                    "to_place": next_place.name,
+                    "start_time": current_time,
+                    "duration": travel_time,
+                    "end_time": current_time + travel_time,
+                    "activity": f"前往 {next_place.name}",
+                    "travel_mode": "步行",  # 可以根据实际情况调整
+                    "estimated": travel_matrix.is_estimated(from_index, to_index)
+                }
+                itinerary.append(travel_item)
+                current_time += travel_time
+        
+        return itinerary
+    
+    def _get_travel_time(self, from_index: int, to_index: int, travel_matrix: TravelMatrix) -> float:
+        """获取旅行时间"""
+        return travel_matrix.duration(from_index, to_index, default=30.0)  # 默认30分钟
+
+
+# 批量规划工作进程的状态：候选景点、共享内存中的矩阵和求解器，每个进程只初始化一次
+_batch_worker_state: Dict[str, Any] = {}
+
+
+def _init_batch_worker(plan_solver: PlanSolver, candidate_places: List[Place], matrix_handle) -> None:
+    """进程池 initializer：连接共享矩阵（不复制），保存候选景点与求解器"""
+    shm, travel_matrix = SharedTravelMatrix.attach(matrix_handle)
+    _batch_worker_state.update(
+        shm=shm,
+        plan_solver=plan_solver,
+        candidate_places=candidate_places,
+        travel_matrix=travel_matrix,
+    )
+
+
+def _solve_batch_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """求解批量规划中的一个用户（task 为 PlanSolver.solve 除候选景点和矩阵外的参数）"""
+    return _batch_worker_state["plan_solver"].solve(
+        candidate_places=_batch_worker_state["candidate_places"],
+        travel_matrix=_batch_worker_state["travel_matrix"],
+        **task
+    )
@@ -3,14 +3,27 @@
 整合队友设计的完整算法流程
 """
 
-from typing import List, Dict, Any, Tuple, Optional
+import asyncio
+import dataclasses
+import functools
+import os
+import numpy as np
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Dict, Any, Tuple, Optional, Sequence, Union
 from datetime import datetime
-from ..models.place import Place
+from ..models.place import Place, PlaceIndex, Location
 from ..models.user_preferences import UserPreferences
+from ..models.travel_matrix import TravelMatrix, SharedTravelMatrix
 from ..api.google_places import GooglePlacesAPI
 from ..api.google_maps import GoogleMapsAPI
-from ..algorithms.enhanced_knapsack import EnhancedKnapsackSolver
-from ..algorithms.route_optimizer import RouteOptimizer
+from ..api.cache import TravelTimeCache, PlacesSearchCache
+from ..api.transport import HttpTransport, AsyncHttpTransport
+from ..api.single_flight import SingleFlight
+from ..api.matrix_provider import TravelMatrixProvider, HaversineEstimator, FallbackMatrixProvider
+from ..algorithms.spatial_index import SpatialIndex
+from ..algorithms.day_partition import DayPartitioner
+from .plan_solver import PlanSolver, _init_batch_worker, _solve_batch_task
+from .plan_session import PlanSession
 
 
 class IntelligentTourPlanner:
@@ -19,17 +32,49 @@ class IntelligentTourPlanner:
     实现队友设计文档的完整算法流程
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, 
+                 api_key: Optional[str] = None,
+                 travel_cache: Optional[TravelTimeCache] = None,
+                 places_cache: Optional[PlacesSearchCache] = None,
+                 transport: Optional[HttpTransport] = None,
+                 async_transport: Optional[AsyncHttpTransport] = None,
+                 single_flight: Optional[SingleFlight] = None,
+                 matrix_provider: Optional[TravelMatrixProvider] = None):
         """
         初始化旅游规划器
         
         Args:
             api_key: Google Maps API密钥
+            travel_cache: 旅行时间缓存，重复规划同一城市时只请求缺失的单元格
+            places_cache: 景点搜索结果缓存
+            transport: HTTP传输层，两个API客户端共用同一个连接池（默认新建一个）
+            async_transport: plan_tour_async 使用的异步传输层（默认新建一个，需要httpx）
+            single_flight: 请求合并器，并发规划同一城市时共享搜索和矩阵请求（默认新建一个）
+            matrix_provider: 旅行时间矩阵来源（默认 Distance Matrix API，失败时改用离线估算；
+                             结果中的 matrix_source / estimated_cells 标明实际来源）
         """
-        self.places_api = GooglePlacesAPI(api_key)
-        self.maps_api = GoogleMapsAPI(api_key)
-        self.knapsack_solver = EnhancedKnapsackSolver()
-        self.route_optimizer = RouteOptimizer()
+        self.transport = transport or HttpTransport()
+        self.async_transport = async_transport or AsyncHttpTransport()
+        self.single_flight = single_flight or SingleFlight()
+        self.places_api = GooglePlacesAPI(api_key, cache=places_cache,
+                                          transport=self.transport,
+                                          async_transport=self.async_transport,
+                                          single_flight=self.single_flight)
+        self.maps_api = GoogleMapsAPI(api_key, cache=travel_cache,
+                                      transport=self.transport,
+                                      async_transport=self.async_transport,
+                                      single_flight=self.single_flight)
+        self.estimator = HaversineEstimator()
+        self.matrix_provider = matrix_provider or FallbackMatrixProvider(self.maps_api, self.estimator)
+        
+        # 求解部分（选择策略、路径优化、行程生成）
+        self.plan_solver = PlanSolver()
+        self.knapsack_solver = self.plan_solver.knapsack_solver
+        self.orienteering_solver = self.plan_solver.orienteering_solver
+        self.cluster_first_solver = self.plan_solver.cluster_first_solver
+        self.route_optimizer = self.plan_solver.route_optimizer
+        self.selection_strategies = self.plan_solver.selection_strategies
+        self.day_partitioner = DayPartitioner()
     
     def plan_tour(self, 
                   city: str,
@@ -37,7 +82,11 @@ class IntelligentTourPlanner:
                   time_limit: int,
                   place_type: str = "tourist_attraction",
                   max_places: int = 15,
-                  travel_mode: str = "walking") -> Dict[str, Any]:
+                  travel_mode: str = "walking",
+                  strategy: str = "knapsack",
+                  strategy_options: Optional[Dict[str, Any]] = None,
+                  matrix_strategy: str = "full",
+                  two_stage_options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         完整的旅游规划流程
         实现队友设计的两步算法
@@ -49,10 +98,21 @@ class IntelligentTourPlanner:
             place_type: 景点类型
             max_places: 最大候选景点数
             travel_mode: 交通方式
+            strategy: 景点选择策略，"knapsack"（增强背包）、"orienteering"（选择与路径联合求解）
+                      或 "cluster_first"（大规模候选集先按簇挑选候选池，再用增强背包精选）
+            strategy_options: 传给选择策略 solve() 的额外参数，例如 {"time_budget_ms": 200}
+            matrix_strategy: "full"（请求完整 N×N 矩阵）或 "two_stage"（先用离线估算筛选，
+                             只请求候选景点间近邻对的精确时间）
+            two_stage_options: 传给 _two_stage_matrix 的参数，例如 {"neighbors": 5, "shortlist_margin": 0.5}
             
         Returns:
             完整的旅游规划结果
         """
+        if strategy not in self.selection_strategies:
+            raise ValueError(f"Unknown selection strategy: {strategy}")
+        if matrix_strategy not in ("full", "two_stage"):
+            raise ValueError(f"Unknown matrix strategy: {matrix_strategy}")
+        
         planning_start_time = datetime.now()
         
         print(f"🌍 开始规划 {city} 的旅游行程...")
@@ -73,165 +133,530 @@ class IntelligentTourPlanner:
         
         # Step 2: 获取旅行时间矩阵
         print(f"\n🗺️ Step 2: 计算景点间距离...")
-        travel_matrix = self.maps_api.get_travel_time_matrix(
-            candidate_places, 
-            mode=travel_mode,
-            departure_time=datetime.now()
-        )
+        matrix_report = None
+        if matrix_strategy == "two_stage":
+            candidate_places, travel_matrix, matrix_report = self._two_stage_matrix(
+                candidate_places, user_preferences, time_limit, travel_mode,
+                strategy, strategy_options, **(two_stage_options or {})
+            )
+        else:
+            travel_matrix = self.matrix_provider.get_travel_time_matrix(
+                candidate_places, 
+                mode=travel_mode,
+                departure_time=datetime.now()
+            )
         
         if not travel_matrix:
             return {"error": "无法获取距离信息", "places": len(candidate_places)}
         
-        print(f"✅ 获取 {len(travel_matrix)}x{len(travel_matrix[0])} 距离矩阵")
+        print(f"✅ 获取 {travel_matrix.size}x{travel_matrix.size} 距离矩阵")
         
-        # Step 3: 队友设计的Step 1 - Enhanced Knapsack
-        print(f"\n🎒 Step 3: 执行增强背包算法（景点选择）...")
-        selected_places, total_score, knapsack_details = self.knapsack_solver.solve(
-            candidate_places,
-            user_preferences, 
-            travel_matrix,
-            time_limit,
-            start_location_index=0
+        result = self.plan_solver.solve(
+            city, user_preferences, time_limit, candidate_places, travel_matrix,
+            place_type, max_places, travel_mode, strategy, strategy_options,
+            planning_start_time, self.transport.metrics.to_dict()
         )
         
-        print(f"✅ 选中 {len(selected_places)} 个景点，总得分 {total_score:.2f}")
+        if matrix_report is not None and result.get("success"):
+            legs = [item for item in result["itinerary"] if item["type"] == "travel"]
+            matrix_report["final_score"] = result["statistics"]["total_composite_score"]
+            matrix_report["exact_leg_ratio"] = (
+                sum(not leg["estimated"] for leg in legs) / len(legs) if legs else 1.0
+            )
+            result["matrix_strategy"] = matrix_report
         
-        if not selected_places:
-            return {
-                "error": "在时间限制内无法访问任何景点",
-                "time_limit": time_limit,
-                "candidates": len(candidate_places)
-            }
+        return result
+    
+    def _two_stage_matrix(self, 
+                          candidate_places: List[Place],
+                          user_preferences: UserPreferences,
+                          time_limit: int,
+                          travel_mode: str,
+                          strategy: str,
+                          strategy_options: Optional[Dict[str, Any]],
+                          neighbors: int = 5,
+                          shortlist_margin: float = 0.5) -> Tuple[List[Place], TravelMatrix, Dict[str, Any]]:
+        """
+        两阶段矩阵：
+        0. 空间索引预筛选：估算的单程时间已超过放宽后时间限制的景点不可能入选，不参与估算
+        1. 离线估算其余景点的旅行时间，在放宽 shortlist_margin 的时间限制下做一次选择，得到候选短名单
+        2. 只为短名单内每个景点的 neighbors 个地理近邻（双向）请求精确时间
+        3. 其余单元格用估算值 × 校准系数（精确/估算 的中位数）填充（保留 ESTIMATED 标记），
+           供规划流程重新求解
         
-        # Step 4: 队友设计的Step 2 - Route Optimization  
-        print(f"\n🛣️ Step 4: 执行路径优化算法...")
-        optimized_route, route_details = self.route_optimizer.optimize_route(
-            selected_places,
-            travel_matrix,
-            candidate_places,
-            start_index=0
+        Returns:
+            (短名单景点, 混合矩阵, 报告)；起点（第0个景点）始终保留在短名单第一位
+        """
+        if travel_mode not in self.estimator.profiles:
+            raise ValueError(f"Unknown travel mode: {travel_mode}")
+        
+        n = len(candidate_places)
+        relaxed_limit = int(time_limit * (1 + shortlist_margin))
+        spatial_index = SpatialIndex.from_places(candidate_places)
+        
+        # 估算时间与直线距离成正比，起点半径外的景点单程就超过放宽后的时间限制（留5%投影误差余量）
+        profile = self.estimator.profiles[travel_mode]
+        reach = ((relaxed_limit - profile.overhead_minutes) * profile.speed_kmh * 1000 / 60
+                 / profile.detour_factor * 1.05)
+        reachable = spatial_index.query_radius(0, max(reach, 0.0)).tolist()
+        reachable_places = [candidate_places[i] for i in reachable]
+        
+        estimate = self.estimator.get_travel_time_matrix(reachable_places, mode=travel_mode)
+        solver = self.selection_strategies[strategy]
+        
+        # 仅用估算矩阵的基准得分（用于报告质量对比）
+        _, estimate_only_score, _ = solver.solve(
+            reachable_places, user_preferences, estimate, time_limit,
+            start_location_index=0, **(strategy_options or {})
+        )
+        shortlist, _, _ = solver.solve(
+            reachable_places, user_preferences, estimate, relaxed_limit,
+            start_location_index=0, **(strategy_options or {})
         )
+        survivors = sorted(set(PlaceIndex(reachable_places).indices(shortlist)) | {0})
+        survivor_places = [reachable_places[i] for i in survivors]
+        m = len(survivors)
         
-        print(f"✅ 路径优化完成，改进 {route_details.get('improvement_percent', 0):.1f}%")
+        # 短名单内的地理近邻对（双向）；估算时间与直线距离成正比，与估算近邻一致
+        hybrid = estimate.submatrix(survivors)
+        cells = np.zeros((m, m), dtype=bool)
+        k = min(neighbors, m - 1)
+        if k > 0:
+            nearest = spatial_index.subset([reachable[i] for i in survivors]).knn_all(k)
+            cells[np.arange(m)[:, None], nearest] = True
+            cells |= cells.T
         
-        # Step 5: 生成详细行程
-        print(f"\n📅 Step 5: 生成详细行程...")
-        detailed_itinerary = self._generate_detailed_itinerary(
-            optimized_route, travel_matrix, candidate_places
+        exact, fetched = self.maps_api.get_travel_time_cells(
+            survivor_places, cells, mode=travel_mode, departure_time=datetime.now()
         )
         
-        # Step 6: 计算最终统计
-        final_stats = self.route_optimizer.calculate_route_statistics(
-            optimized_route, travel_matrix, candidate_places
+        # 用精确值覆盖，其余估算值按 精确/估算 的中位数校准
+        known = exact.status != 0 if exact else np.zeros((m, m), dtype=bool)
+        np.fill_diagonal(known, False)
+        calibration = 1.0
+        if known.any():
+            comparable = known & exact.ok_mask & (hybrid.durations > 0)
+            if comparable.any():
+                calibration = float(np.median(exact.durations[comparable] / hybrid.durations[comparable]))
+            
+            estimated = ~known
+            np.fill_diagonal(estimated, False)
+            hybrid.durations[estimated] *= calibration
+            for name in ("durations", "distances", "status", "traffic_durations"):
+                getattr(hybrid, name)[known] = getattr(exact, name)[known]
+        else:
+            print("⚠️ 精确时间获取失败，使用离线估算")
+        
+        print(f"🧮 两阶段矩阵：{n} 个候选 → {len(reachable)} 个可达 → {m} 个短名单，"
+              f"请求 {fetched} / {n * n} 个元素")
+        
+        report = {
+            "strategy": "two_stage",
+            "candidates": n,
+            "reachable": len(reachable),
+            "shortlisted": m,
+            "neighbors": neighbors,
+            "elements_fetched": fetched,
+            "full_matrix_elements": n * n,
+            "elements_saved": n * n - fetched,
+            "savings_percent": (1 - fetched / (n * n)) * 100,
+            "calibration_factor": calibration,
+            "estimate_only_score": estimate_only_score,
+        }
+        return survivor_places, hybrid, report
+    
+    def plan_multi_day_tour(self, 
+                            city: str,
+                            user_preferences: UserPreferences,
+                            day_budgets: List[int],
+                            hotel: Optional[Place] = None,
+                            place_type: str = "tourist_attraction",
+                            max_places: int = 40,
+                            travel_mode: str = "walking",
+                            strategy: str = "knapsack",
+                            strategy_options: Optional[Dict[str, Any]] = None,
+                            max_workers: Optional[int] = None,
+                            executor: Optional[Executor] = None) -> Dict[str, Any]:
+        """
+        多日旅游规划
+        候选景点和距离矩阵只获取一次，按 DayPartitioner 分配到各天（先聚类、再按方位切段，
+        各天互不重复），每天从酒店出发，在进程池中并行求解
+        
+        Args:
+            city: 城市名称
+            user_preferences: 用户偏好
+            day_budgets: 每天的时间限制（分钟）
+            hotel: 酒店/出发点（默认以第一个候选景点的位置为出发点）；不计访问时间
+            max_workers: 进程池大小（默认 min(天数, CPU核数)）
+            executor: 求解每天行程的 Executor（默认新建进程池，用完关闭）
+            其余参数同 plan_tour
+            
+        Returns:
+            多日规划结果，days 中每一项为当天的 plan_tour 格式结果
+        """
+        if not day_budgets or any(budget <= 0 for budget in day_budgets):
+            raise ValueError("day_budgets must be a non-empty list of positive minutes")
+        if strategy not in self.selection_strategies:
+            raise ValueError(f"Unknown selection strategy: {strategy}")
+        
+        planning_start_time = datetime.now()
+        
+        print(f"🌍 开始规划 {city} 的 {len(day_budgets)} 日行程...")
+        print(f"📋 参数：每日时间限制 {day_budgets}分钟，交通方式：{travel_mode}")
+        
+        # Step 1: 获取候选景点，酒店放在第0位作为每天的起点
+        print(f"\n🔍 Step 1: 搜索候选景点...")
+        candidate_places = self.places_api.search_places(
+            city=city, 
+            place_type=place_type, 
+            max_results=max_places
         )
         
-        planning_end_time = datetime.now()
-        planning_duration = (planning_end_time - planning_start_time).total_seconds()
+        if not candidate_places:
+            return {"error": "未找到任何景点", "city": city}
+        
+        base = self._base_place(city, hotel, candidate_places[0])
+        places = [base] + [place for place in candidate_places if place.place_id != base.place_id]
         
-        print(f"✅ 规划完成！耗时 {planning_duration:.1f} 秒")
+        print(f"✅ 找到 {len(candidate_places)} 个候选景点")
         
-        # 组织完整结果
-        result = {
+        # Step 2: 获取旅行时间矩阵（所有天共用）
+        print(f"\n🗺️ Step 2: 计算景点间距离...")
+        travel_matrix = self.matrix_provider.get_travel_time_matrix(
+            places, 
+            mode=travel_mode,
+            departure_time=datetime.now()
+        )
+        
+        if not travel_matrix:
+            return {"error": "无法获取距离信息", "places": len(places)}
+        
+        # Step 3: 分配景点到各天
+        print(f"\n🧩 Step 3: 分配景点到 {len(day_budgets)} 天...")
+        day_candidates = self.day_partitioner.partition(
+            places, user_preferences, travel_matrix, day_budgets, start_index=0
+        )
+        print(f"✅ 每天候选景点数：{[len(members) for members in day_candidates]}")
+        
+        # Step 4: 各天独立，并行求解（每个任务只传当天的景点、子矩阵和分配时在完整矩阵上算出的得分）
+        print(f"\n⚙️ Step 4: 并行求解每天的行程...")
+        network_metrics = self.transport.metrics.to_dict()
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=max_workers or min(len(day_budgets), os.cpu_count() or 1))
+        try:
+            futures = []
+            for budget, members in zip(day_budgets, day_candidates):
+                indices = [0] + members
+                futures.append(executor.submit(
+                    self.plan_solver.solve,
+                    city, user_preferences, budget, [places[i] for i in indices],
+                    travel_matrix.submatrix(indices), place_type, max_places, travel_mode,
+                    strategy, strategy_options, planning_start_time, network_metrics,
+                    include_start=True,
+                    composite_scores=[places[i].composite_score for i in indices]
+                ))
+            day_results = [future.result() for future in futures]
+        finally:
+            if own_executor:
+                executor.shutdown()
+        
+        days = [
+            {"day": day, "time_limit": budget, **result}
+            for day, (budget, result) in enumerate(zip(day_budgets, day_results), start=1)
+        ]
+        visited = [
+            place["place_id"]
+            for result in day_results if result.get("success")
+            for place in result["selected_places"] if place["place_id"] != base.place_id
+        ]
+        planning_duration = (datetime.now() - planning_start_time).total_seconds()
+        
+        print(f"✅ {len(day_budgets)} 日规划完成！共 {len(visited)} 个景点，耗时 {planning_duration:.1f} 秒")
+        
+        return {
             "success": True,
             "city": city,
             "planning_time": planning_duration,
-            "user_preferences": {
-                "travel_style": user_preferences.travel_style.value,
-                "weights": {
-                    "rating": user_preferences.weight_rating,
-                    "preference": user_preferences.weight_preference,
-                    "travel": user_preferences.weight_travel
-                }
+            "hotel": {"name": base.name, "place_id": base.place_id, "address": base.address},
+            "days": days,
+            "statistics": {
+                "days": len(day_budgets),
+                "total_places": len(visited),
+                "total_composite_score": sum(
+                    result["statistics"]["total_composite_score"]
+                    for result in day_results if result.get("success")
+                ),
+                "total_time_budget": sum(day_budgets),
             },
-            "algorithm_results": {
-                "step1_knapsack": knapsack_details,
-                "step2_route_optimization": route_details
+            "partition": {
+                "candidates": len(candidate_places),
+                "per_day_candidates": [len(members) for members in day_candidates],
             },
-            "selected_places": [
-                {
-                    "name": place.name,
-                    "address": place.address,
-                    "rating": place.rating,
-                    "visit_time": place.visit_time,
-                    "composite_score": place.composite_score,
-                    "categories": [cat.value for cat in place.categories]
-                }
-                for place in optimized_route
-            ],
-            "itinerary": detailed_itinerary,
-            "statistics": final_stats,
+            "matrix_source": travel_matrix.source,
+            "estimated_cells": travel_matrix.estimated_cells,
+            "network_metrics": network_metrics,
             "parameters": {
-                "time_limit": time_limit,
+                "day_budgets": list(day_budgets),
                 "travel_mode": travel_mode,
                 "max_places": max_places,
-                "place_type": place_type
+                "place_type": place_type,
+                "strategy": strategy
             }
         }
-        
-        return result
     
-    def _generate_detailed_itinerary(self, 
-                                   route: List[Place],
-                                   travel_matrix: List[List[Dict[str, Any]]],
-                                   all_places: List[Place]) -> List[Dict[str, Any]]:
+    def plan_tours_batch(self, 
+                         city: str,
+                         preferences_list: Sequence[UserPreferences],
+                         time_limits: Union[int, Sequence[int]],
+                         place_type: str = "tourist_attraction",
+                         max_places: int = 15,
+                         travel_mode: str = "walking",
+                         strategy: str = "knapsack",
+                         strategy_options: Optional[Dict[str, Any]] = None,
+                         max_workers: Optional[int] = None,
+                         chunksize: Optional[int] = None) -> Dict[str, Any]:
         """
-        生成详细的行程安排
+        批量规划：同一城市的多个用户
+        候选景点和距离矩阵只获取一次，所有用户的综合得分用一次 (用户数 × 景点数) 的矩阵运算得到，
+        之后在进程池中逐个用户求解；矩阵放在共享内存中，每个进程只连接一次，不随任务序列化
+        
+        Args:
+            city: 城市名称
+            preferences_list: 各用户的偏好
+            time_limits: 时间限制（分钟），所有用户相同时可传一个整数
+            max_workers: 进程池大小（默认 min(用户数, CPU核数)）
+            chunksize: 每次发给工作进程的任务数（默认约为 用户数 / (4 × 进程数)）
+            其余参数同 plan_tour
+            
+        Returns:
+            批量规划结果，results 中每一项为对应用户的 plan_tour 格式结果
         """
-        itinerary = []
-        current_time = 0
-        
-        for i, place in enumerate(route):
-            # 访问活动
-            visit_item = {
-                "type": "visit",
-                "place_name": place.name,
-                "address": place.address,
-                "start_time": current_time,
-                "duration": place.visit_time,
-                "end_time": current_time + place.visit_time,
-                "activity": f"参观 {place.name}",
-                "rating": place.rating,
-                "composite_score": place.composite_score
+        if isinstance(time_limits, int):
+            time_limits = [time_limits] * len(preferences_list)
+        if len(time_limits) != len(preferences_list):
+            raise ValueError("time_limits must match preferences_list in length")
+        if any(limit <= 0 for limit in time_limits):
+            raise ValueError("time_limits must be positive minutes")
+        if strategy not in self.selection_strategies:
+            raise ValueError(f"Unknown selection strategy: {strategy}")
+        
+        planning_start_time = datetime.now()
+        
+        print(f"🌍 开始为 {len(preferences_list)} 位用户批量规划 {city} 的旅游行程...")
+        
+        # Step 1-2: 候选景点与距离矩阵（所有用户共用）
+        print(f"\n🔍 Step 1: 搜索候选景点...")
+        candidate_places = self.places_api.search_places(
+            city=city, 
+            place_type=place_type, 
+            max_results=max_places
+        )
+        
+        if not candidate_places:
+            return {"error": "未找到任何景点", "city": city}
+        
+        print(f"\n🗺️ Step 2: 计算景点间距离...")
+        travel_matrix = self.matrix_provider.get_travel_time_matrix(
+            candidate_places, 
+            mode=travel_mode,
+            departure_time=datetime.now()
+        )
+        
+        if not travel_matrix:
+            return {"error": "无法获取距离信息", "places": len(candidate_places)}
+        
+        # Step 3: 旅行惩罚与用户无关，只算一次；所有用户的综合得分一次矩阵运算
+        print(f"\n🧮 Step 3: 计算 {len(preferences_list)}×{len(candidate_places)} 综合得分矩阵...")
+        scoring_system = self.knapsack_solver.scoring_system
+        travel_penalties = self.knapsack_solver.penalty_calculator.calculate_travel_penalties(
+            candidate_places, travel_matrix
+        )
+        scores = scoring_system.score_matrix(
+            scoring_system.encode_places(candidate_places), preferences_list, travel_penalties
+        )
+        
+        # Step 4: 进程池逐用户求解
+        print(f"\n⚙️ Step 4: 并行求解各用户的行程...")
+        network_metrics = self.transport.metrics.to_dict()
+        tasks = [
+            {
+                "city": city,
+                "user_preferences": prefs,
+                "time_limit": limit,
+                "place_type": place_type,
+                "max_places": max_places,
+                "travel_mode": travel_mode,
+                "strategy": strategy,
+                "strategy_options": strategy_options,
+                "planning_start_time": planning_start_time,
+                "network_metrics": network_metrics,
+                "composite_scores": row,
             }
-            itinerary.append(visit_item)
-            current_time += place.visit_time
+            for prefs, limit, row in zip(preferences_list, time_limits, scores)
+        ]
+        workers = max(1, max_workers or min(len(tasks), os.cpu_count() or 1))
+        chunksize = chunksize or max(1, len(tasks) // (4 * workers))
+        
+        solve_start = datetime.now()
+        with SharedTravelMatrix(travel_matrix) as shared_matrix:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                     initargs=(self.plan_solver, candidate_places,
+                                               shared_matrix.handle)) as executor:
+                results = list(executor.map(_solve_batch_task, tasks, chunksize=chunksize))
+        solve_duration = (datetime.now() - solve_start).total_seconds()
+        planning_duration = (datetime.now() - planning_start_time).total_seconds()
+        
+        print(f"✅ 批量规划完成！{len(results)} 位用户，耗时 {planning_duration:.1f} 秒")
+        
+        return {
+            "success": True,
+            "city": city,
+            "planning_time": planning_duration,
+            "results": results,
+            "statistics": {
+                "users": len(results),
+                "successful": sum(1 for result in results if result.get("success")),
+                "candidates": len(candidate_places),
+                "workers": workers,
+                "chunksize": chunksize,
+                "solve_time": solve_duration,
+                "plans_per_second": len(results) / solve_duration if solve_duration > 0 else float("inf"),
+            },
+            "matrix_source": travel_matrix.source,
+            "estimated_cells": travel_matrix.estimated_cells,
+            "network_metrics": network_metrics,
+            "parameters": {
+                "time_limits": list(time_limits),
+                "travel_mode": travel_mode,
+                "max_places": max_places,
+                "place_type": place_type,
+                "strategy": strategy
+            }
+        }
+    
+    def create_plan_session(self, 
+                            city: str,
+                            place_type: str = "tourist_attraction",
+                            max_places: int = 15,
+                            travel_mode: str = "walking",
+                            replan_budget_ms: float = 5.0) -> Optional[PlanSession]:
+        """
+        创建交互式规划会话：候选景点和距离矩阵只获取一次，
+        之后 session.plan(prefs, time_limit) 在权重变化时增量重算得分、热启动求解，不访问网络
+        
+        Args:
+            replan_budget_ms: 热启动重新规划的求解时间预算（毫秒）
+            其余参数同 plan_tour
             
-            # 旅行到下一个地点（如果不是最后一个）
-            if i < len(route) - 1:
-                next_place = route[i + 1]
-                
-                from_index = all_places.index(place)
-                to_index = all_places.index(next_place)
-                
-                travel_time = self._get_travel_time(from_index, to_index, travel_matrix)
-                
-                travel_item = {
-                    "type": "travel",
-                    "from_place": place.name,
-                    "to_place": next_place.name,
-                    "start_time": current_time,
-                    "duration": travel_time,
-                    "end_time": current_time + travel_time,
-                    "activity": f"前往 {next_place.name}",
-                    "travel_mode": "步行"  # 可以根据实际情况调整
-                }
-                itinerary.append(travel_item)
-                current_time += travel_time
-        
-        return itinerary
+        Returns:
+            规划会话；找不到景点或无法获取距离信息时返回 None
+        """
+        candidate_places = self.places_api.search_places(
+            city=city, 
+            place_type=place_type, 
+            max_results=max_places
+        )
+        if not candidate_places:
+            print(f"❌ 未找到任何景点: {city}")
+            return None
+        
+        travel_matrix = self.matrix_provider.get_travel_time_matrix(
+            candidate_places, 
+            mode=travel_mode,
+            departure_time=datetime.now()
+        )
+        if not travel_matrix:
+            print(f"❌ 无法获取距离信息: {city}")
+            return None
+        
+        return PlanSession(
+            self.plan_solver, city, candidate_places, travel_matrix,
+            place_type=place_type, travel_mode=travel_mode,
+            network_metrics=self.transport.metrics.to_dict(),
+            replan_budget_ms=replan_budget_ms
+        )
+    
+    def _base_place(self, city: str, hotel: Optional[Place], fallback: Place) -> Place:
+        """多日行程每天的出发点（访问时间为0）：酒店，或第一个候选景点位置上的虚拟出发点"""
+        if hotel is not None:
+            return dataclasses.replace(hotel, visit_time=0)
+        
+        location = Location(lat=fallback.location.lat, lng=fallback.location.lng)
+        return Place(
+            name=f"{city} 出发点",
+            address=fallback.address,
+            place_id=f"start:{location.lat},{location.lng}",
+            location=location,
+            visit_time=0
+        )
+    
+    async def plan_tour_async(self, 
+                              city: str,
+                              user_preferences: UserPreferences,
+                              time_limit: int,
+                              place_type: str = "tourist_attraction",
+                              max_places: int = 15,
+                              travel_mode: str = "walking",
+                              strategy: str = "knapsack",
+                              strategy_options: Optional[Dict[str, Any]] = None,
+                              executor: Optional[Executor] = None) -> Dict[str, Any]:
+        """
+        plan_tour 的异步版本
+        景点搜索和距离矩阵（各块并发）通过 async_transport 请求，不占用线程；
+        CPU密集的选择与路径优化放到 executor 中执行（默认使用事件循环的线程池），
+        一个事件循环即可同时处理大量规划请求
+        
+        Args:
+            executor: 执行求解的 Executor（None表示事件循环默认的线程池）
+            其余参数同 plan_tour
+            
+        Returns:
+            完整的旅游规划结果
+        """
+        if strategy not in self.selection_strategies:
+            raise ValueError(f"Unknown selection strategy: {strategy}")
+        
+        planning_start_time = datetime.now()
+        
+        print(f"🌍 开始规划 {city} 的旅游行程...")
+        print(f"📋 参数：时间限制 {time_limit}分钟，交通方式：{travel_mode}")
+        
+        # Step 1: 获取候选景点
+        print(f"\n🔍 Step 1: 搜索候选景点...")
+        candidate_places = await self.places_api.search_places_async(
+            city=city, 
+            place_type=place_type, 
+            max_results=max_places
+        )
+        
+        if not candidate_places:
+            return {"error": "未找到任何景点", "city": city}
+        
+        print(f"✅ 找到 {len(candidate_places)} 个候选景点")
+        
+        # Step 2: 获取旅行时间矩阵
+        print(f"\n🗺️ Step 2: 计算景点间距离...")
+        travel_matrix = await self.matrix_provider.get_travel_time_matrix_async(
+            candidate_places, 
+            mode=travel_mode,
+            departure_time=datetime.now()
+        )
+        
+        if not travel_matrix:
+            return {"error": "无法获取距离信息", "places": len(candidate_places)}
+        
+        print(f"✅ 获取 {travel_matrix.size}x{travel_matrix.size} 距离矩阵")
+        
+        # Step 3-6: 求解放到 executor 中，不阻塞事件循环
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(
+            self.plan_solver.solve,
+            city, user_preferences, time_limit, candidate_places, travel_matrix,
+            place_type, max_places, travel_mode, strategy, strategy_options,
+            planning_start_time, self.async_transport.metrics.to_dict()
+        ))
     
-    def _get_travel_time(self, from_index: int, to_index: int, travel_matrix: List[List[Dict[str, Any]]]) -> float:
-        """获取旅行时间"""
-        if (from_index >= len(travel_matrix) or 
-            to_index >= len(travel_matrix[from_index])):
-            return 30.0  # 默认30分钟
-        
-        element = travel_matrix[from_index][to_index]
-        if element.get('status') == 'OK':
-            return element.get('duration_minutes', 30.0)
-        else:
-            return 30.0
-
     def _recommend_best_style(self, results: Dict[str, Any]) -> str:
         """根据分析结果推荐最佳旅行风格"""
         if not results:
@@ -132,3 +132,33 @@ class Place:
         """更新访问时间并重新计算兴趣分数"""
         self.visit_time = max(15, min(180, new_time))  # 限制在15-180分钟
         self._calculate_base_interest()
+
+
+class PlaceIndex:
+    """
+    景点 <-> 矩阵索引 的映射
+    每次规划只构建一次，按对象身份查找，避免 list.index() 的逐字段相等比较
+    """
+    
+    def __init__(self, places: List[Place]):
+        self.places = list(places)
+        self._positions = {id(place): i for i, place in enumerate(self.places)}
+    
+    def __len__(self) -> int:
+        return len(self.places)
+    
+    def index_of(self, place: Place) -> int:
+        """获取景点在候选列表中的索引"""
+        index = self._positions.get(id(place))
+        if index is None:
+            # 不是同一个对象（例如副本），回退到相等性查找
+            index = self.places.index(place)
+        return index
+    
+    def indices(self, places: List[Place]) -> List[int]:
+        """批量获取索引"""
+        return [self.index_of(place) for place in places]
+    
+    def places_at(self, indices: List[int]) -> List[Place]:
+        """根据索引获取景点列表"""
+        return [self.places[i] for i in indices]
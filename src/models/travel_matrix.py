@@ -0,0 +1,333 @@
+"""
+Travel Matrix Data Model
+稠密旅行时间矩阵：连续的float32数组 + 状态位掩码
+替代原来每个单元格一个dict的 List[List[Dict]] 结构
+"""
+
+from enum import IntFlag
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+class CellStatus(IntFlag):
+    """矩阵单元格状态位"""
+    OK = 1              # 有有效的旅行时间
+    HAS_TRAFFIC = 2     # 含实时交通时间（driving mode）
+    NOT_FOUND = 4       # 起点或终点无法地理编码
+    ZERO_RESULTS = 8    # 两点之间无可用路线
+    ERROR = 16          # 其他错误状态
+    ESTIMATED = 32      # 离线估算值（非API返回的精确时间）
+
+
+# Distance Matrix API 元素状态 -> 状态位
+_STATUS_FLAGS = {
+    "OK": CellStatus.OK,
+    "NOT_FOUND": CellStatus.NOT_FOUND,
+    "ZERO_RESULTS": CellStatus.ZERO_RESULTS,
+}
+
+
+def status_flag(status: str) -> CellStatus:
+    """将API状态字符串转换为状态位"""
+    return _STATUS_FLAGS.get(status, CellStatus.ERROR)
+
+
+# 各算法组件接受的矩阵输入：TravelMatrix 或旧的 List[List[Dict]] 格式
+TravelMatrixLike = Union["TravelMatrix", List[List[Dict[str, Any]]]]
+
+
+class TravelMatrix:
+    """
+    N×N 旅行时间矩阵
+
+    - durations: 旅行时间（分钟），float32，不可达为 inf
+    - distances: 距离（米），float32，不可达为 inf
+    - status: 每个单元格的 CellStatus 位掩码，uint8
+    - traffic_durations: 含交通的旅行时间（分钟），无数据为 nan
+    """
+
+    __slots__ = ("durations", "distances", "status", "traffic_durations", "__weakref__")
+
+    def __init__(self,
+                 durations: np.ndarray,
+                 distances: Optional[np.ndarray] = None,
+                 status: Optional[np.ndarray] = None,
+                 traffic_durations: Optional[np.ndarray] = None):
+        durations = np.ascontiguousarray(durations, dtype=np.float32)
+        if durations.ndim != 2 or durations.shape[0] != durations.shape[1]:
+            raise ValueError(f"Travel matrix must be square, got shape {durations.shape}")
+
+        shape = durations.shape
+        self.durations = durations
+        self.distances = (np.ascontiguousarray(distances, dtype=np.float32)
+                          if distances is not None else np.full(shape, np.inf, dtype=np.float32))
+        if status is None:
+            status = np.where(np.isfinite(durations), CellStatus.OK, CellStatus.ERROR)
+        self.status = np.ascontiguousarray(status, dtype=np.uint8)
+        self.traffic_durations = (np.ascontiguousarray(traffic_durations, dtype=np.float32)
+                                  if traffic_durations is not None
+                                  else np.full(shape, np.nan, dtype=np.float32))
+
+    # ------------------------------------------------------------------
+    # 构造方法
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def allocate(cls, n: int) -> "TravelMatrix":
+        """分配一个全部为未填充状态（不可达）的 n×n 矩阵"""
+        shape = (n, n)
+        return cls(
+            durations=np.full(shape, np.inf, dtype=np.float32),
+            distances=np.full(shape, np.inf, dtype=np.float32),
+            status=np.zeros(shape, dtype=np.uint8),
+        )
+
+    @classmethod
+    def empty(cls) -> "TravelMatrix":
+        """空矩阵（用于表示获取失败）"""
+        return cls.allocate(0)
+
+    @classmethod
+    def from_elements(cls, elements: List[List[Dict[str, Any]]]) -> "TravelMatrix":
+        """
+        从旧的 List[List[Dict]] 格式构建矩阵
+
+        Args:
+            elements: 每个单元格包含 status / duration_minutes / distance_meters 的嵌套列表
+        """
+        n = len(elements)
+        matrix = cls.allocate(n)
+
+        for i, row in enumerate(elements):
+            for j, element in enumerate(row[:n]):
+                if element.get("status") != "OK":
+                    matrix.status[i, j] = status_flag(element.get("status", ""))
+                    continue
+
+                if "duration_minutes" in element:
+                    duration_minutes = element["duration_minutes"]
+                else:
+                    duration_minutes = element.get("duration_seconds", float("inf")) / 60
+
+                traffic_minutes = element.get("duration_in_traffic_minutes")
+                matrix.set_cell(i, j, "OK", duration_minutes,
+                                element.get("distance_meters", float("inf")),
+                                traffic_minutes)
+
+        return matrix
+
+    @classmethod
+    def coerce(cls, matrix: Union[TravelMatrixLike, np.ndarray, None]) -> "TravelMatrix":
+        """
+        将任意支持的矩阵表示转换为 TravelMatrix
+
+        接受 TravelMatrix、旧的 List[List[Dict]] 格式或分钟数的二维数组
+        """
+        if isinstance(matrix, TravelMatrix):
+            return matrix
+        if matrix is None:
+            return cls.empty()
+        if isinstance(matrix, np.ndarray):
+            return cls(matrix)
+        if len(matrix) == 0:
+            return cls.empty()
+        return cls.from_elements(matrix)
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def set_cell(self,
+                 i: int,
+                 j: int,
+                 status: str,
+                 duration_minutes: float = float("inf"),
+                 distance_meters: float = float("inf"),
+                 traffic_minutes: Optional[float] = None):
+        """写入单个单元格"""
+        flag = status_flag(status)
+        if flag != CellStatus.OK:
+            self.durations[i, j] = np.inf
+            self.distances[i, j] = np.inf
+            self.status[i, j] = flag
+            return
+
+        self.durations[i, j] = duration_minutes
+        self.distances[i, j] = distance_meters
+        if traffic_minutes is not None:
+            self.traffic_durations[i, j] = traffic_minutes
+            flag |= CellStatus.HAS_TRAFFIC
+        self.status[i, j] = flag
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    @property
+    def size(self) -> int:
+        """矩阵维度 N"""
+        return self.durations.shape[0]
+
+    @property
+    def shape(self):
+        return self.durations.shape
+
+    @property
+    def nbytes(self) -> int:
+        """矩阵占用的字节数"""
+        return (self.durations.nbytes + self.distances.nbytes +
+                self.status.nbytes + self.traffic_durations.nbytes)
+
+    @property
+    def ok_mask(self) -> np.ndarray:
+        """状态为 OK 的单元格布尔掩码"""
+        return (self.status & CellStatus.OK).astype(bool)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return f"TravelMatrix(size={self.size}, ok={int(self.ok_mask.sum())})"
+
+    def is_ok(self, from_index: int, to_index: int) -> bool:
+        """单元格是否有有效的旅行时间"""
+        if from_index >= self.size or to_index >= self.size:
+            return False
+        return bool(self.status[from_index, to_index] & CellStatus.OK)
+
+    def is_estimated(self, from_index: int, to_index: int) -> bool:
+        """单元格是否为离线估算值"""
+        if from_index >= self.size or to_index >= self.size:
+            return False
+        return bool(self.status[from_index, to_index] & CellStatus.ESTIMATED)
+
+    @property
+    def estimated_cells(self) -> int:
+        """离线估算的单元格数"""
+        return int(np.count_nonzero(self.status & CellStatus.ESTIMATED))
+
+    @property
+    def source(self) -> str:
+        """旅行时间来源：api（全部来自API）、estimated（全部为离线估算）或 mixed"""
+        estimated = self.estimated_cells
+        if estimated == 0:
+            return "api"
+        return "estimated" if estimated == self.status.size else "mixed"
+
+    def duration(self, from_index: int, to_index: int, default: float = float("inf")) -> float:
+        """
+        获取旅行时间（分钟）
+
+        Args:
+            from_index: 起点索引
+            to_index: 终点索引
+            default: 越界或不可达时的返回值
+        """
+        if not self.is_ok(from_index, to_index):
+            return default
+        return float(self.durations[from_index, to_index])
+
+    def duration_row(self, from_index: int, length: Optional[int] = None) -> np.ndarray:
+        """
+        获取从某点出发到所有点的旅行时间（float64，越界或不可达为 inf）
+
+        Args:
+            from_index: 起点索引
+            length: 返回数组长度（默认为矩阵维度，超出矩阵的部分为 inf）
+        """
+        length = self.size if length is None else length
+        row = np.full(length, np.inf)
+        if from_index >= self.size:
+            return row
+
+        m = min(length, self.size)
+        row[:m] = np.where(self.status[from_index, :m] & CellStatus.OK,
+                           self.durations[from_index, :m], np.inf)
+        return row
+
+    def distance(self, from_index: int, to_index: int, default: float = float("inf")) -> float:
+        """获取距离（米）"""
+        if not self.is_ok(from_index, to_index):
+            return default
+        return float(self.distances[from_index, to_index])
+
+    def copy(self) -> "TravelMatrix":
+        """深拷贝"""
+        return TravelMatrix(
+            durations=self.durations.copy(),
+            distances=self.distances.copy(),
+            status=self.status.copy(),
+            traffic_durations=self.traffic_durations.copy(),
+        )
+
+    def submatrix(self, indices: Sequence[int]) -> "TravelMatrix":
+        """按索引抽取子矩阵（行列同序）"""
+        idx = np.asarray(indices, dtype=np.intp)
+        grid = np.ix_(idx, idx)
+        return TravelMatrix(
+            durations=self.durations[grid],
+            distances=self.distances[grid],
+            status=self.status[grid],
+            traffic_durations=self.traffic_durations[grid],
+        )
+
+
+class SharedTravelMatrix:
+    """
+    放在共享内存中的旅行时间矩阵，供进程池中的求解进程零拷贝读取
+
+    父进程创建并在用完后释放（上下文管理器）；handle 可序列化，
+    子进程用 attach(handle) 得到直接指向共享内存的 TravelMatrix（只读使用）
+    """
+
+    # (字段, dtype)；float32 字段在前，保证对齐
+    _LAYOUT = (
+        ("durations", np.float32),
+        ("distances", np.float32),
+        ("traffic_durations", np.float32),
+        ("status", np.uint8),
+    )
+
+    def __init__(self, matrix: TravelMatrix):
+        n = matrix.size
+        size = sum(n * n * np.dtype(dtype).itemsize for _, dtype in self._LAYOUT)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.handle = (self.shm.name, n)
+        self.matrix = self._view(self.shm, n)
+        for name, _ in self._LAYOUT:
+            getattr(self.matrix, name)[...] = getattr(matrix, name)
+
+    @classmethod
+    def attach(cls, handle: Tuple[str, int]) -> Tuple[shared_memory.SharedMemory, TravelMatrix]:
+        """
+        在子进程中连接共享矩阵
+
+        Returns:
+            (共享内存对象（需保持引用直到不再使用矩阵）, 矩阵)
+        """
+        name, n = handle
+        shm = shared_memory.SharedMemory(name=name)
+        return shm, cls._view(shm, n)
+
+    @classmethod
+    def _view(cls, shm: shared_memory.SharedMemory, n: int) -> TravelMatrix:
+        arrays = {}
+        offset = 0
+        for name, dtype in cls._LAYOUT:
+            arrays[name] = np.ndarray((n, n), dtype=dtype, buffer=shm.buf, offset=offset)
+            offset += n * n * np.dtype(dtype).itemsize
+        return TravelMatrix(**arrays)
+
+    def close(self):
+        """释放共享内存"""
+        self.matrix = None
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self) -> "SharedTravelMatrix":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -46,12 +46,23 @@ class OutputFormatter:
         print(f"📊 规划算法: 队友设计的两阶段算法")
         print(f"⏱️ 规划耗时: {result['planning_time']:.1f} 秒")
         print(f"🎯 旅行风格: {result['user_preferences']['travel_style']}")
+        self._print_matrix_source(result)
         
         weights = result['user_preferences']['weights']
         print(f"⚖️ 算法权重: 评分{weights['rating']:.1f} + " +
               f"偏好{weights['preference']:.1f} + " +
               f"旅行{weights['travel']:.1f}")
     
+    def _print_matrix_source(self, result: Dict[str, Any]):
+        """打印旅行时间来源（离线估算时给出提示）"""
+        source = result.get("matrix_source", "api")
+        if source == "api":
+            print(f"🗺️ 旅行时间来源: Distance Matrix API")
+        elif source == "estimated":
+            print(f"⚠️ 旅行时间来源: 离线估算（距离矩阵获取失败，时间仅供参考）")
+        else:
+            print(f"⚠️ 旅行时间来源: API + 离线估算（{result.get('estimated_cells', 0)} 个单元格为估算值）")
+    
     def _print_algorithm_performance(self, result: Dict[str, Any]):
         """打印算法性能信息"""
         print(f"\n🧠 算法性能分析")
@@ -71,6 +82,8 @@ class OutputFormatter:
         print(f"  初始旅行时间: {step2.get('initial_travel_time', 0):.1f} 分钟")
         print(f"  优化后时间: {step2.get('optimized_travel_time', 0):.1f} 分钟")
         print(f"  改进程度: {step2.get('improvement_percent', 0):.1f}%")
+        if 'optimal' in step2:
+            print(f"  最优性: {'精确最优解' if step2['optimal'] else '启发式解'}")
     
     def _print_selected_places(self, result: Dict[str, Any]):
         """打印选中的景点"""
@@ -133,6 +146,22 @@ class OutputFormatter:
         print(f"🔢 最大候选数: {params['max_places']}")
         print(f"🏷️ 景点类型: {params['place_type']}")
     
+    def print_comparison_result(self, result: Dict[str, Any]):
+        """打印增强背包与传统（精确上界）背包的比较结果"""
+        comparison = result['comparison_results']
+        enhanced = comparison['enhanced_knapsack']
+        traditional = comparison['traditional_knapsack']
+        improvement = comparison['improvement']
+        
+        print(f"\n⚖️ 算法比较")
+        print("-" * 40)
+        print(f"📦 增强背包: {enhanced['places_count']} 个景点, 得分 {enhanced['total_score']:.2f}, "
+              f"用时 {enhanced['time_used']:.1f} 分钟")
+        print(f"📐 传统背包（上界）: {traditional['places_count']} 个景点, 得分 {traditional['total_score']:.2f}, "
+              f"估计用时 {traditional['time_used']:.1f} 分钟")
+        print(f"🎯 最优性比率: {improvement['optimality_ratio'] * 100:.1f}% "
+              f"(最多差距 {improvement['max_gap_percent']:.1f}%)")
+    
     def _format_time(self, minutes: float) -> str:
         """格式化时间显示"""
         hours = int(minutes // 60)
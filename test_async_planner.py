@@ -0,0 +1,99 @@
+"""
+测试脚本：验证异步规划流程 (plan_tour_async)
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import asyncio
+
+import numpy as np
+
+from src.api.google_maps import GoogleMapsAPI
+from src.api.transport import AsyncHttpTransport
+from src.core.tour_planner import IntelligentTourPlanner
+from src.models.user_preferences import UserPreferences
+from test_matrix_batching import StubDistanceMatrixServer, create_grid_places
+from test_places_search import StubTextSearchServer
+
+
+def test_async_matrix_matches_sync():
+    """测试异步矩阵请求与同步结果一致，且并发不超过 max_concurrency"""
+    places = create_grid_places(40)
+
+    with StubDistanceMatrixServer() as stub:
+        api = GoogleMapsAPI(api_key="test-key", max_concurrency=4)
+        api.base_url = stub.url
+        sync_matrix = api.get_travel_time_matrix(places)
+        stub.max_in_flight = 0
+
+        async_matrix = asyncio.run(api.get_travel_time_matrix_async(places))
+
+    print(f"⚡ 异步矩阵 {async_matrix}, 最大并发 {stub.max_in_flight}")
+    assert np.array_equal(sync_matrix.durations, async_matrix.durations)
+    assert 1 < stub.max_in_flight <= 4
+
+
+def test_concurrent_async_plans():
+    """测试一个事件循环并发执行多个规划，结果与同步规划一致"""
+    preferences = UserPreferences()
+
+    with StubTextSearchServer(total_results=12) as places_stub, StubDistanceMatrixServer() as matrix_stub:
+        def create_planner():
+            planner = IntelligentTourPlanner(api_key="test-key",
+                                             async_transport=AsyncHttpTransport())
+            planner.places_api.base_url = places_stub.place_url
+            planner.maps_api.base_url = matrix_stub.url
+            return planner
+
+        sync_result = create_planner().plan_tour("Vancouver", preferences, 240, max_places=12)
+
+        async def plan_many(count):
+            planner = create_planner()
+            try:
+                return await asyncio.gather(*(
+                    planner.plan_tour_async("Vancouver", preferences, 240, max_places=12)
+                    for _ in range(count)
+                ))
+            finally:
+                await planner.async_transport.aclose()
+
+        results = asyncio.run(plan_many(8))
+
+    print(f"🧵 {len(results)} 个并发规划, 矩阵请求最大并发 {matrix_stub.max_in_flight}")
+    expected = [place["name"] for place in sync_result["selected_places"]]
+    assert sync_result["success"]
+    for result in results:
+        assert result["success"]
+        assert [place["name"] for place in result["selected_places"]] == expected
+        assert result["network_metrics"]["requests"] > 0
+
+
+def test_transport_reused_across_event_loops():
+    """测试同一个规划器可以在多次 asyncio.run() 中使用（每个事件循环各自的客户端）"""
+    with StubTextSearchServer(total_results=12) as places_stub, StubDistanceMatrixServer() as matrix_stub:
+        planner = IntelligentTourPlanner(api_key="test-key", async_transport=AsyncHttpTransport())
+        planner.places_api.base_url = places_stub.place_url
+        planner.maps_api.base_url = matrix_stub.url
+
+        # 第一次运行不关闭客户端，第二次运行用 async with 关闭
+        first = asyncio.run(planner.plan_tour_async("Vancouver", UserPreferences(), 240, max_places=12))
+        requests_after_first = len(places_stub.requests)
+
+        async def plan_and_close():
+            async with planner.async_transport:
+                return await planner.plan_tour_async("Vancouver", UserPreferences(), 180, max_places=12)
+
+        second = asyncio.run(plan_and_close())
+        assert len(places_stub.requests) > requests_after_first
+
+    assert first["success"] and second["success"]
+    assert planner.async_transport._clients == {}
+
+
+if __name__ == "__main__":
+    test_async_matrix_matches_sync()
+    test_concurrent_async_plans()
+    test_transport_reused_across_event_loops()
+    print("✅ 异步规划测试完成")
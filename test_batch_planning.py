@@ -0,0 +1,142 @@
+"""
+测试脚本：验证批量规划（共享候选与矩阵、得分矩阵、共享内存 + 进程池求解）
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import random
+from datetime import datetime
+
+import numpy as np
+
+from src.algorithms.scoring import CompositeScoringSystem
+from src.algorithms.travel_penalty import TravelPenaltyCalculator
+from src.api.matrix_provider import HaversineEstimator
+from src.core import plan_solver
+from src.core.plan_solver import PlanSolver, _init_batch_worker, _solve_batch_task
+from src.core.tour_planner import IntelligentTourPlanner
+from src.models.travel_matrix import SharedTravelMatrix
+from src.models.user_preferences import UserPreferences, TravelStyle, PreferenceCategory
+from test_matrix_batching import StubDistanceMatrixServer
+from test_matrix_provider import create_city_places
+from test_places_search import StubTextSearchServer
+
+
+def create_users(n, seed=0):
+    """随机生成不同风格、不同类别偏好的用户（部分用户只关心少数类别）"""
+    rng = random.Random(seed)
+    styles = list(TravelStyle)
+    users = []
+    for _ in range(n):
+        categories = rng.sample(list(PreferenceCategory), rng.randint(1, len(PreferenceCategory)))
+        users.append(UserPreferences(
+            weight_rating=rng.random(), weight_preference=rng.random(), weight_travel=rng.random(),
+            travel_style=rng.choice(styles),
+            category_preferences={category: rng.choice([0.0, rng.random()]) for category in categories},
+        ))
+    return users
+
+
+def test_score_matrix_matches_per_place_scoring():
+    """测试得分矩阵与逐个景点计算的综合得分一致"""
+    places = create_city_places(120, seed=3)
+    matrix = HaversineEstimator().get_travel_time_matrix(places)
+    penalties = TravelPenaltyCalculator().calculate_travel_penalties(places, matrix)
+    users = create_users(25)
+    scoring = CompositeScoringSystem()
+
+    scores = scoring.score_matrix(scoring.encode_places(places), users, penalties)
+
+    assert scores.shape == (25, 120)
+    for u, prefs in enumerate(users):
+        expected = [scoring.calculate_composite_score(place, prefs, penalty)
+                    for place, penalty in zip(places, penalties)]
+        assert np.allclose(scores[u], expected, rtol=1e-12, atol=1e-12)
+
+
+def test_shared_matrix_round_trip():
+    """测试共享内存矩阵与原矩阵一致，连接方看到的是同一块内存"""
+    places = create_city_places(30, seed=4)
+    matrix = HaversineEstimator().get_travel_time_matrix(places)
+
+    with SharedTravelMatrix(matrix) as shared:
+        shm, attached = SharedTravelMatrix.attach(shared.handle)
+        for name in ("durations", "distances", "status", "traffic_durations"):
+            assert np.array_equal(getattr(attached, name), getattr(matrix, name), equal_nan=True)
+        shared.matrix.durations[0, 1] = 123.0
+        assert attached.durations[0, 1] == 123.0
+        del attached
+        shm.close()
+
+
+def test_batch_matches_individual_plans():
+    """测试批量规划：搜索和矩阵只请求一次，每位用户的结果与单独调用 plan_tour 一致"""
+    users = create_users(12, seed=1)
+    time_limits = [180, 240, 300] * 4
+
+    with StubTextSearchServer(total_results=30) as places_stub, StubDistanceMatrixServer(delay=0.0) as matrix_stub:
+        planner = IntelligentTourPlanner(api_key="test-key")
+        planner.places_api.base_url = places_stub.place_url
+        planner.places_api.page_token_delay = 0.0
+        planner.maps_api.base_url = matrix_stub.url
+
+        batch = planner.plan_tours_batch("Vancouver", users, time_limits, max_places=30, max_workers=2)
+        search_requests = len(places_stub.requests)
+        matrix_elements = sum(o * d for o, d in matrix_stub.requests)
+
+        individual = [planner.plan_tour("Vancouver", prefs, limit, max_places=30)
+                      for prefs, limit in zip(users[:4], time_limits[:4])]
+
+    stats = batch["statistics"]
+    print(f"👥 批量规划 {stats['users']} 位用户: {stats['plans_per_second']:.1f} 个/秒 "
+          f"({stats['workers']} 个进程, chunksize {stats['chunksize']})")
+
+    assert batch["success"]
+    assert batch["matrix_source"] == "api" and batch["estimated_cells"] == 0
+    assert search_requests == 2
+    assert matrix_elements == 30 * 30
+    assert stats["successful"] == len(users)
+    for result, expected in zip(batch["results"], individual):
+        assert [p["place_id"] for p in result["selected_places"]] == \
+            [p["place_id"] for p in expected["selected_places"]]
+        assert np.isclose(result["statistics"]["total_composite_score"],
+                          expected["statistics"]["total_composite_score"])
+
+    try:
+        planner.plan_tours_batch("Vancouver", users, [180, 240])
+        raise AssertionError("expected ValueError")
+    except ValueError:
+        pass
+
+
+def test_worker_functions_in_process():
+    """测试工作进程函数可以在当前进程中直接使用（initializer + 任务）"""
+    places = create_city_places(20, seed=8)
+    matrix = HaversineEstimator().get_travel_time_matrix(places)
+
+    with SharedTravelMatrix(matrix) as shared:
+        _init_batch_worker(PlanSolver(), places, shared.handle)
+        result = _solve_batch_task({
+            "city": "Test", "user_preferences": UserPreferences(), "time_limit": 120,
+            "place_type": "tourist_attraction", "max_places": 20, "travel_mode": "walking",
+            "strategy": "knapsack", "strategy_options": None,
+            "planning_start_time": datetime.now(), "network_metrics": {},
+        })
+        state = plan_solver._batch_worker_state
+        shared.matrix.durations[0, 1] = 0.5
+        assert state["travel_matrix"].durations[0, 1] == 0.5
+        state.pop("travel_matrix")
+        state.pop("shm").close()
+        state.clear()
+
+    assert result["success"]
+
+
+if __name__ == "__main__":
+    test_score_matrix_matches_per_place_scoring()
+    test_shared_matrix_round_trip()
+    test_batch_matches_individual_plans()
+    test_worker_functions_in_process()
+    print("✅ 批量规划测试完成")
@@ -0,0 +1,165 @@
+"""
+测试脚本：验证旅行时间聚类 (TravelTimeClustering) 与簇优先选择 (ClusterFirstSolver)
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import time
+
+import numpy as np
+
+from src.algorithms.clustering import TravelTimeClustering
+from src.algorithms.cluster_first import ClusterFirstSolver
+from src.algorithms.enhanced_knapsack import EnhancedKnapsackSolver
+from src.algorithms.travel_penalty import TravelPenaltyCalculator
+from src.api.matrix_provider import HaversineEstimator
+from src.models.user_preferences import UserPreferences
+from test_matrix_provider import create_city_places
+
+
+def reference_components(matrix, threshold):
+    """逐点广度优先搜索得到的连通分量（成员集合）"""
+    durations = np.maximum(matrix.durations, matrix.durations.T)
+    adjacent = matrix.ok_mask & matrix.ok_mask.T & (durations <= threshold)
+    unseen = set(range(matrix.size))
+    components = []
+    while unseen:
+        frontier = [min(unseen)]
+        unseen.discard(frontier[0])
+        component = set(frontier)
+        while frontier:
+            node = frontier.pop()
+            for other in np.flatnonzero(adjacent[node]).tolist():
+                if other in unseen:
+                    unseen.discard(other)
+                    component.add(other)
+                    frontier.append(other)
+        components.append(component)
+    return components
+
+
+def test_components_match_reference():
+    """测试聚类结果等于阈值图的连通分量（空间预筛选与两两比较一致）"""
+    places = create_city_places(300, seed=11)
+    matrix = HaversineEstimator().get_travel_time_matrix(places)
+    matrix.durations[3, 4] = matrix.durations[4, 3] = 1.0  # 非几何的捷径也要被计入
+    clustering = TravelTimeClustering(max_travel_minutes=25.0, min_cluster_size=1)
+
+    clusters = clustering.cluster(places, matrix)
+    expected = reference_components(matrix, 25.0)
+
+    assert sorted(map(sorted, expected)) == [cluster.members for cluster in clusters]
+
+    # 强制使用空间索引预筛选，结果与两两比较一致
+    clustering.DENSE_MAX_MEMBERS = 0
+    assert [c.members for c in clustering.cluster(places, matrix)] == [c.members for c in clusters]
+
+    # 没有距离信息时仍退回两两比较
+    scan_matrix = matrix.copy()
+    scan_matrix.distances[:] = 0
+    assert [c.members for c in clustering.cluster(places, scan_matrix)] == [c.members for c in clusters]
+
+
+def test_clusters_independent_of_order():
+    """测试打乱景点顺序后得到相同的簇"""
+    places = create_city_places(150, seed=2)
+    permutation = np.random.default_rng(0).permutation(150)
+    shuffled = [places[i] for i in permutation]
+    clustering = TravelTimeClustering(max_travel_minutes=20.0)
+
+    original = clustering.cluster(places, HaversineEstimator().get_travel_time_matrix(places))
+    reordered = clustering.cluster(shuffled, HaversineEstimator().get_travel_time_matrix(shuffled))
+
+    as_ids = lambda clusters, source: sorted(sorted(source[i].place_id for i in c.members) for c in clusters)
+    assert as_ids(original, places) == as_ids(reordered, shuffled)
+
+
+def test_cluster_statistics():
+    """测试簇中心、代表点和簇内旅行时间统计"""
+    places = create_city_places(40, seed=4)
+    matrix = HaversineEstimator().get_travel_time_matrix(places)
+    clusters = TravelTimeClustering(max_travel_minutes=40.0).cluster(places, matrix)
+
+    assert clusters
+    for cluster in clusters:
+        assert cluster.size >= 2
+        assert cluster.representative in cluster.members
+        assert np.isclose(cluster.centroid.lat, np.mean([places[i].location.lat for i in cluster.members]))
+        assert 0 < cluster.mean_travel_minutes <= cluster.max_travel_minutes <= 40.0
+        assert cluster.edge_count >= cluster.size - 1
+        assert cluster.total_visit_time == sum(places[i].visit_time for i in cluster.members)
+
+    # get_well_connected_clusters 委托给聚类器
+    calculator = TravelPenaltyCalculator()
+    well_connected = calculator.get_well_connected_clusters(places, matrix, penalty_threshold=10.0,
+                                                            max_travel_minutes=40.0)
+    assert well_connected == [cluster.members for cluster in clusters]
+
+
+class RecordingSolver(EnhancedKnapsackSolver):
+    """记录细选阶段收到的候选池和综合得分"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def solve(self, places, user_preferences, travel_matrix, time_limit, start_location_index=0,
+              composite_scores=None, **options):
+        self.calls.append((list(places), None if composite_scores is None else list(composite_scores)))
+        return super().solve(places, user_preferences, travel_matrix, time_limit, start_location_index,
+                             composite_scores=composite_scores, **options)
+
+
+def test_cluster_first_on_large_pool():
+    """测试大规模候选集的簇优先选择：只在候选池上求解，得分接近在全部候选上求解"""
+    places = create_city_places(600, seed=9)
+    rng = np.random.default_rng(9)
+    for place in places:
+        place.rating = float(rng.uniform(3.5, 5.0))
+        place.user_ratings_total = int(rng.integers(10, 5000))
+    matrix = HaversineEstimator().get_travel_time_matrix(places)
+    preferences = UserPreferences()
+
+    start = time.perf_counter()
+    _, full_score, _ = EnhancedKnapsackSolver().solve(places, preferences, matrix, 240)
+    full_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    selected, score, details = ClusterFirstSolver(max_pool=40).solve(places, preferences, matrix, 240)
+    cluster_ms = (time.perf_counter() - start) * 1000
+
+    report = details["cluster_first"]
+    print(f"🧩 600个候选: 全量背包 {full_score:.2f} ({full_ms:.0f} ms), "
+          f"簇优先 {score:.2f} ({cluster_ms:.0f} ms, {report['clusters']} 个簇, 候选池 {report['pool_size']})")
+    assert selected[0] is places[0]
+    assert report["pool_size"] <= 40
+    assert details["total_places_considered"] == 600
+    assert score >= 0.8 * full_score
+
+    # 一个大簇只纳入 得分/访问时间 最高的成员，候选池访问时间达到上限即停止；
+    # 细选使用在全部候选上计算的综合得分
+    recorder = RecordingSolver()
+    _, _, single = ClusterFirstSolver(inner_solver=recorder, max_pool=40, max_travel_minutes=1e4).solve(
+        places, preferences, matrix, 120
+    )
+    pool_places, pool_scores = recorder.calls[-1]
+    visit_times = [place.visit_time for place in pool_places[1:]]
+    densities = [score / place.visit_time for place, score in zip(pool_places[1:], pool_scores[1:])]
+    assert single["cluster_first"]["clusters"] == 1
+    assert sum(visit_times[:-1]) < 2 * 120 <= sum(visit_times)
+    assert densities == sorted(densities, reverse=True)
+    assert np.allclose(pool_scores, [place.composite_score for place in pool_places])
+
+    # 候选不超过 max_pool 时直接使用内层求解器
+    _, _, small = ClusterFirstSolver(max_pool=40).solve(places[:30], preferences, matrix.submatrix(list(range(30))), 240)
+    assert "cluster_first" not in small
+
+
+if __name__ == "__main__":
+    test_components_match_reference()
+    test_clusters_independent_of_order()
+    test_cluster_statistics()
+    test_cluster_first_on_large_pool()
+    print("✅ 聚类测试完成")
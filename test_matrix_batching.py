@@ -0,0 +1,168 @@
+"""
+测试脚本：验证 Distance Matrix 分块请求（本地桩服务器）
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from src.models.place import Place, Location
+from src.api.google_maps import GoogleMapsAPI
+
+
+def create_grid_places(n):
+    """创建 n 个坐标互不相同的景点"""
+    return [
+        Place(place_id=f"grid{i}", name=f"Grid {i}", address=f"{i} Grid Street",
+              location=Location(lat=48.80 + i * 0.001, lng=2.30 + i * 0.002),
+              rating=4.0, visit_time=30)
+        for i in range(n)
+    ]
+
+
+def expected_seconds(origin, destination):
+    """桩服务器的旅行时间：两点坐标差（可按行列复原）"""
+    o_lat, o_lng = map(float, origin.split(","))
+    d_lat, d_lng = map(float, destination.split(","))
+    return int(round((abs(o_lat - d_lat) + abs(o_lng - d_lng)) * 1e5))
+
+
+class StubDistanceMatrixServer:
+    """
+    本地 Distance Matrix 桩服务器
+    按真实API的限制校验请求（25个起点/终点、100个元素），记录请求数与最大并发数
+    """
+
+    def __init__(self, max_dimension=25, max_elements=100, delay=0.02):
+        self.max_dimension = max_dimension
+        self.max_elements = max_elements
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/maps/api/distancematrix/json"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def respond(self, params):
+        origins = params["origins"][0].split("|")
+        destinations = params["destinations"][0].split("|")
+        self.requests.append((len(origins), len(destinations)))
+
+        if (len(origins) > self.max_dimension or len(destinations) > self.max_dimension or
+                len(origins) * len(destinations) > self.max_elements):
+            return {"status": "MAX_ELEMENTS_EXCEEDED", "rows": []}
+
+        def element(origin, destination):
+            seconds = expected_seconds(origin, destination)
+            return {"status": "OK",
+                    "duration": {"value": seconds},
+                    "distance": {"value": seconds * 2}}
+
+        return {
+            "status": "OK",
+            "rows": [{"elements": [element(o, d) for d in destinations]} for o in origins]
+        }
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.delay)
+                    with stub._lock:
+                        body = json.dumps(stub.respond(parse_qs(urlparse(self.path).query)))
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(body.encode())
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def test_block_plan_respects_limits():
+    """测试分块方案满足API限制并覆盖全部单元格"""
+    api = GoogleMapsAPI(api_key="test-key")
+
+    for n in (1, 7, 10, 11, 25, 26, 60, 100):
+        indices = list(range(n))
+        blocks = api._plan_blocks(indices, indices)
+        covered = set()
+        for origins, destinations in blocks:
+            assert len(origins) <= api.MAX_DIMENSION
+            assert len(destinations) <= api.MAX_DIMENSION
+            assert len(origins) * len(destinations) <= api.MAX_ELEMENTS
+            covered.update((i, j) for i in origins for j in destinations)
+        assert len(covered) == n * n
+
+    print(f"🧩 100个景点切分为 {len(api._plan_blocks(list(range(100)), list(range(100))))} 个请求")
+
+
+def test_batched_matrix_against_stub():
+    """测试超过10个景点时分块并发请求并正确拼接"""
+    places = create_grid_places(60)
+
+    with StubDistanceMatrixServer() as stub:
+        api = GoogleMapsAPI(api_key="test-key", max_concurrency=3)
+        api.base_url = stub.url
+        matrix = api.get_travel_time_matrix(places)
+
+    print(f"🌐 {len(stub.requests)} 个请求, 最大并发 {stub.max_in_flight}, 矩阵 {matrix}")
+    assert matrix.shape == (60, 60)
+    assert matrix.ok_mask.all()
+    assert all(o * d <= 100 for o, d in stub.requests)
+    assert stub.max_in_flight <= 3
+
+    locations = [f"{p.location.lat},{p.location.lng}" for p in places]
+    for i, j in [(0, 59), (59, 0), (13, 42), (37, 8), (24, 25)]:
+        seconds = expected_seconds(locations[i], locations[j])
+        assert math.isclose(matrix.duration(i, j), seconds / 60, rel_tol=1e-6)
+        assert matrix.distance(i, j) == seconds * 2
+
+
+def test_failed_block_returns_empty_matrix():
+    """测试任一块失败时返回空矩阵"""
+    with StubDistanceMatrixServer(max_elements=50) as stub:
+        api = GoogleMapsAPI(api_key="test-key")
+        api.base_url = stub.url
+        matrix = api.get_travel_time_matrix(create_grid_places(12))
+
+    assert matrix.size == 0
+
+
+if __name__ == "__main__":
+    test_block_plan_respects_limits()
+    test_batched_matrix_against_stub()
+    test_failed_block_returns_empty_matrix()
+    print("✅ 分块请求测试完成")
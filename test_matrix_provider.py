@@ -0,0 +1,122 @@
+"""
+测试脚本：验证离线旅行时间估算 (HaversineEstimator) 与矩阵提供者
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import math
+import time
+
+import numpy as np
+
+from src.api.matrix_provider import HaversineEstimator, FallbackMatrixProvider
+from src.api.google_maps import GoogleMapsAPI
+from src.api.transport import HttpTransport
+from src.core.tour_planner import IntelligentTourPlanner
+from src.models.place import Place, Location
+from src.models.user_preferences import UserPreferences
+from test_places_search import StubTextSearchServer
+from test_transport import ScriptedServer
+
+
+def create_city_places(n, seed=0):
+    """在约30km范围内随机生成 n 个景点"""
+    rng = np.random.default_rng(seed)
+    return [
+        Place(name=f"Place {i}", address="", place_id=f"p{i}",
+              location=Location(lat=49.15 + rng.random() * 0.3, lng=-123.25 + rng.random() * 0.3))
+        for i in range(n)
+    ]
+
+
+def reference_haversine(a, b):
+    """逐对计算的球面距离（米）"""
+    lat1, lng1, lat2, lng2 = map(math.radians, [a.lat, a.lng, b.lat, b.lng])
+    h = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * HaversineEstimator.EARTH_RADIUS_METERS * math.asin(math.sqrt(h))
+
+
+def test_distance_matches_reference():
+    """测试向量化距离与逐对计算一致（米级误差）"""
+    places = create_city_places(60)
+    distances = HaversineEstimator().distance_matrix(places)
+
+    assert distances.shape == (60, 60)
+    assert np.allclose(distances, distances.T)
+    for i, j in [(0, 1), (5, 42), (59, 17), (30, 31)]:
+        expected = reference_haversine(places[i].location, places[j].location)
+        assert abs(distances[i, j] - expected) < 5.0
+
+    # 巴黎 -> 伦敦 约 344km
+    paris = Place(name="Paris", address="", place_id="paris", location=Location(48.8566, 2.3522))
+    london = Place(name="London", address="", place_id="london", location=Location(51.5074, -0.1278))
+    assert abs(HaversineEstimator().distance_matrix([paris, london])[0, 1] / 1000 - 343.5) < 1.0
+
+
+def test_mode_profiles():
+    """测试不同交通方式的速度与绕行系数"""
+    estimator = HaversineEstimator()
+    places = create_city_places(10)
+    walking = estimator.get_travel_time_matrix(places, mode="walking")
+    driving = estimator.get_travel_time_matrix(places, mode="driving")
+
+    assert walking.ok_mask.all()
+    assert walking.duration(3, 3) == 0.0
+    assert driving.duration(1, 2) < walking.duration(1, 2)
+    straight = estimator.distance_matrix(places)[1, 2]
+    assert math.isclose(walking.duration(1, 2), straight * 1.3 / (4.8 * 1000 / 60), rel_tol=1e-5)
+
+    try:
+        estimator.get_travel_time_matrix(places, mode="teleport")
+        raise AssertionError("expected ValueError")
+    except ValueError:
+        pass
+
+
+def test_thousand_place_benchmark():
+    """基准：1000×1000 估算矩阵"""
+    places = create_city_places(1000)
+    estimator = HaversineEstimator()
+    estimator.get_travel_time_matrix(places)
+
+    start = time.perf_counter()
+    matrix = estimator.get_travel_time_matrix(places)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    print(f"⚡ 1000×1000 估算矩阵: {elapsed_ms:.1f} ms, {matrix.nbytes / 1e6:.1f} MB")
+    assert matrix.shape == (1000, 1000)
+    assert elapsed_ms < 500
+
+
+def test_planner_falls_back_to_estimator():
+    """测试 Distance Matrix 失败时规划器改用离线估算"""
+    with StubTextSearchServer(total_results=10) as places_stub, \
+            ScriptedServer([(200, {"status": "REQUEST_DENIED"}, 0.0)]) as maps_stub:
+        planner = IntelligentTourPlanner(api_key="test-key")
+        planner.places_api.base_url = places_stub.place_url
+        planner.maps_api.base_url = maps_stub.url
+
+        result = planner.plan_tour("Vancouver", UserPreferences(), 240, max_places=10)
+
+    assert isinstance(planner.matrix_provider, FallbackMatrixProvider)
+    assert result["success"]
+    assert len(result["selected_places"]) > 0
+    assert result["matrix_source"] == "estimated"
+    assert result["estimated_cells"] == 10 * 10
+
+    # 不使用备用时仍返回原来的错误
+    with ScriptedServer([(200, {"status": "REQUEST_DENIED"}, 0.0)]) as maps_stub:
+        api = GoogleMapsAPI(api_key="test-key", transport=HttpTransport(max_retries=0))
+        api.base_url = maps_stub.url
+        assert api.get_travel_time_matrix(create_city_places(3)).size == 0
+
+
+if __name__ == "__main__":
+    test_distance_matches_reference()
+    test_mode_profiles()
+    test_thousand_place_benchmark()
+    test_planner_falls_back_to_estimator()
+    print("✅ 离线估算测试完成")
@@ -0,0 +1,107 @@
+"""
+测试脚本：验证多日行程规划（按天分配景点 + 进程池并行求解）
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.algorithms.day_partition import DayPartitioner
+from src.algorithms.scoring import CompositeScoringSystem
+from src.algorithms.travel_penalty import TravelPenaltyCalculator
+from src.api.matrix_provider import HaversineEstimator
+from src.core.tour_planner import IntelligentTourPlanner
+from src.models.place import Place, Location
+from src.models.user_preferences import UserPreferences
+from test_matrix_batching import StubDistanceMatrixServer
+from test_matrix_provider import create_city_places
+from test_places_search import StubTextSearchServer
+
+
+def test_partition_is_disjoint_and_compact():
+    """测试各天候选互不相交、按预算比例分配，且同一天的景点在地理上相邻"""
+    places = create_city_places(200, seed=6)
+    matrix = HaversineEstimator().get_travel_time_matrix(places)
+    budgets = [480, 240, 480]
+
+    days = DayPartitioner().partition(places, UserPreferences(), matrix, budgets, start_index=0)
+
+    assigned = [i for day in days for i in day]
+    assert len(assigned) == len(set(assigned))
+    assert 0 not in assigned
+    visit = [sum(places[i].visit_time for i in day) for day in days]
+    assert visit[1] < visit[0] and visit[1] < visit[2]
+
+    # 按方位切段：同一天景点之间的平均距离明显小于全体候选之间的平均距离
+    distances = HaversineEstimator().distance_matrix(places)
+    overall = distances[np.ix_(assigned, assigned)].mean()
+    within = np.mean([distances[np.ix_(day, day)].mean() for day in days])
+    assert within < 0.8 * overall
+
+
+def test_multi_day_plan_has_no_repeats():
+    """测试多日规划：每天从酒店出发、各天景点不重复、每天不超过预算（进程池求解）"""
+    hotel = Place(name="Hotel Vancouver", address="900 W Georgia St", place_id="hotel",
+                  location=Location(lat=49.2838, lng=-123.1208), visit_time=60)
+    budgets = [300, 240, 300]
+
+    with StubTextSearchServer(total_results=40) as places_stub, StubDistanceMatrixServer(delay=0.0) as matrix_stub:
+        planner = IntelligentTourPlanner(api_key="test-key")
+        planner.places_api.base_url = places_stub.place_url
+        planner.places_api.page_token_delay = 0.0
+        planner.maps_api.base_url = matrix_stub.url
+
+        result = planner.plan_multi_day_tour("Vancouver", UserPreferences(), budgets, hotel=hotel,
+                                             max_places=40, max_workers=2)
+        matrix_elements = sum(o * d for o, d in matrix_stub.requests)
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            threaded = planner.plan_multi_day_tour("Vancouver", UserPreferences(), budgets, hotel=hotel,
+                                                   max_places=40, executor=executor)
+
+        # 每天的综合得分与分配时在完整矩阵上计算的一致（不在当天的子矩阵上重新计算）
+        candidates = planner.places_api.search_places("Vancouver", max_results=40)
+        all_places = [planner._base_place("Vancouver", hotel, candidates[0])] + candidates
+        full_matrix = planner.matrix_provider.get_travel_time_matrix(all_places)
+        CompositeScoringSystem().batch_calculate_scores(
+            all_places, UserPreferences(),
+            TravelPenaltyCalculator().calculate_travel_penalties(all_places, full_matrix)
+        )
+        expected_scores = {place.place_id: place.composite_score for place in all_places}
+
+    visited = [place["place_id"] for day in result["days"] for place in day["selected_places"]
+               if place["place_id"] != "hotel"]
+    print(f"📆 {len(budgets)} 天共 {len(visited)} 个景点, 每天候选 {result['partition']['per_day_candidates']}, "
+          f"总得分 {result['statistics']['total_composite_score']:.2f}")
+
+    assert result["success"]
+    assert result["matrix_source"] == "api"
+    assert matrix_elements == 41 * 41
+    assert len(result["days"]) == 3
+    assert len(visited) == len(set(visited)) == result["statistics"]["total_places"]
+    for day, budget in zip(result["days"], budgets):
+        assert day["success"]
+        assert day["time_limit"] == budget
+        assert day["itinerary"][0]["place_name"] == "Hotel Vancouver"
+        assert day["itinerary"][0]["duration"] == 0
+        assert day["itinerary"][-1]["end_time"] <= budget
+        for place in day["selected_places"]:
+            assert np.isclose(place["composite_score"], expected_scores[place["place_id"]])
+
+    assert [d["selected_places"] for d in threaded["days"]] == [d["selected_places"] for d in result["days"]]
+
+    try:
+        planner.plan_multi_day_tour("Vancouver", UserPreferences(), [300, 0])
+        raise AssertionError("expected ValueError")
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    test_partition_is_disjoint_and_compact()
+    test_multi_day_plan_has_no_repeats()
+    print("✅ 多日规划测试完成")
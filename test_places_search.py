@@ -0,0 +1,132 @@
+"""
+测试脚本：验证景点搜索的翻页与缓存 (PlacesSearchCache)
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import json
+
+from src.api.cache import PlacesSearchCache
+from src.api.google_places import GooglePlacesAPI
+from test_matrix_batching import StubDistanceMatrixServer
+
+
+class StubTextSearchServer(StubDistanceMatrixServer):
+    """本地 Places textsearch 桩服务器：每页20条，用 next_page_token 翻页"""
+
+    def __init__(self, total_results=55):
+        super().__init__(delay=0.0)
+        self.total_results = total_results
+
+    @property
+    def place_url(self):
+        return self.url.replace("/distancematrix/json", "/place")
+
+    def respond(self, params):
+        self.requests.append(params)
+        start = int(params["pagetoken"][0]) if "pagetoken" in params else 0
+        end = min(start + 20, self.total_results)
+
+        data = {
+            "status": "OK",
+            "results": [
+                {
+                    "name": f"Attraction {k}",
+                    "formatted_address": f"{k} Main Street",
+                    "place_id": f"stub{k}",
+                    "geometry": {"location": {"lat": 49.28 + k * 0.001, "lng": -123.12}},
+                    "rating": 4.0 + (k % 10) / 10,
+                    "user_ratings_total": 100 + k,
+                    "types": ["museum"] if k % 2 else ["park"],
+                }
+                for k in range(start, end)
+            ]
+        }
+        if end < self.total_results:
+            data["next_page_token"] = str(end)
+        return data
+
+
+def test_pagination_beyond_twenty():
+    """测试 max_results 超过20时按令牌翻页"""
+    with StubTextSearchServer() as stub:
+        api = GooglePlacesAPI(api_key="test-key", page_token_delay=0.0)
+        api.base_url = stub.place_url
+
+        places = api.search_places("Vancouver", max_results=45)
+        assert len(stub.requests) == 3
+        stub.requests.clear()
+
+        all_places = api.search_places("Vancouver", max_results=100)
+
+    print(f"📄 45 → {len(places)} 个景点, 100 → {len(all_places)} 个景点")
+    assert [p.place_id for p in places] == [f"stub{k}" for k in range(45)]
+    assert len(all_places) == 55
+    assert len(stub.requests) == 3
+
+
+def test_cached_search_fetches_lazily():
+    """测试缓存命中时不请求网络，结果不够时只请求后续页面"""
+    cache = PlacesSearchCache()
+
+    with StubTextSearchServer() as stub:
+        api = GooglePlacesAPI(api_key="test-key", cache=cache, page_token_delay=0.0)
+        api.base_url = stub.place_url
+
+        first = api.search_places("Vancouver", max_results=15)
+        assert len(stub.requests) == 1
+
+        again = api.search_places("Vancouver", max_results=10)
+        assert len(stub.requests) == 1
+
+        more = api.search_places("Vancouver", max_results=30)
+        assert len(stub.requests) == 2
+        assert "pagetoken" in stub.requests[-1]
+
+    print(f"💾 缓存结果: {len(first)}, {len(again)}, {len(more)} 个景点, 共 {len(stub.requests)} 个请求")
+    assert [p.place_id for p in again] == [p.place_id for p in first[:10]]
+    assert [p.place_id for p in more] == [f"stub{k}" for k in range(30)]
+
+    # 反序列化得到的是新的对象，互不影响
+    assert again[0] is not first[0]
+    assert again[0].visit_time == first[0].visit_time
+    assert again[0].categories == first[0].categories
+
+
+def test_cache_stores_json_and_expires_page_token():
+    """测试缓存以JSON保存景点字段；翻页令牌过期后需要更多结果时重新搜索"""
+    now = [0.0]
+    cache = PlacesSearchCache(clock=lambda: now[0])
+
+    with StubTextSearchServer() as stub:
+        api = GooglePlacesAPI(api_key="test-key", cache=cache, page_token_delay=0.0)
+        api.base_url = stub.place_url
+
+        first = api.search_places("Vancouver", max_results=15)
+        blob = cache._conn.execute("SELECT places FROM places_search_json").fetchone()[0]
+        assert [data["place_id"] for data in json.loads(blob)] == [f"stub{k}" for k in range(20)]
+
+        # 令牌过期：结果足够时仍然命中缓存，不够时从第一页重新搜索
+        now[0] = cache.page_token_ttl_seconds + 1
+        cached_places, token, has_more = cache.get("tourist_attraction in Vancouver", "tourist_attraction", "Vancouver")
+        assert token is None and has_more
+
+        assert [p.place_id for p in api.search_places("Vancouver", max_results=20)] == \
+            [p.place_id for p in cached_places]
+        assert len(stub.requests) == 1
+
+        more = api.search_places("Vancouver", max_results=30)
+        assert len(stub.requests) == 3
+        assert "pagetoken" not in stub.requests[1]
+
+    assert [p.place_id for p in more] == [f"stub{k}" for k in range(30)]
+    assert cached_places[0].interest_score == first[0].interest_score
+
+
+if __name__ == "__main__":
+    test_pagination_beyond_twenty()
+    test_cached_search_fetches_lazily()
+    test_cache_stores_json_and_expires_page_token()
+    print("✅ 景点搜索测试完成")
@@ -0,0 +1,99 @@
+"""
+测试脚本：验证交互式规划会话（权重变化时增量重算得分 + 热启动重新规划，不访问网络）
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import dataclasses
+
+import numpy as np
+
+from src.algorithms.orienteering import OrienteeringSolver
+from src.algorithms.scoring import CompositeScoringSystem
+from src.algorithms.travel_penalty import TravelPenaltyCalculator
+from src.api.matrix_provider import HaversineEstimator
+from src.core.tour_planner import IntelligentTourPlanner
+from src.models.user_preferences import UserPreferences, TravelStyle, PreferenceCategory
+from test_batch_planning import create_users
+from test_matrix_batching import StubDistanceMatrixServer
+from test_matrix_provider import create_city_places
+from test_places_search import StubTextSearchServer
+
+
+def test_rescore_matches_full_scoring():
+    """测试缓存分量重算的得分与完整评分一致，且只有类别权重变化时才重算偏好匹配"""
+    places = create_city_places(200, seed=21)
+    matrix = HaversineEstimator().get_travel_time_matrix(places)
+    penalties = TravelPenaltyCalculator().calculate_travel_penalties(places, matrix)
+    scoring = CompositeScoringSystem()
+    components = scoring.compute_components(places, penalties)
+
+    for prefs in create_users(10, seed=3):
+        scores = scoring.rescore(components, prefs)
+        scoring.batch_calculate_scores(places, prefs, penalties)
+        assert np.allclose(scores, [place.composite_score for place in places], rtol=1e-12, atol=1e-12)
+
+    match = components.preference_match
+    prefs = dataclasses.replace(prefs, weight_rating=0.9, travel_style=TravelStyle.CUSTOM)
+    scoring.rescore(components, prefs)
+    assert components.preference_match is match
+
+    prefs.set_category_weight(PreferenceCategory.NATURE, 0.9)
+    scoring.rescore(components, prefs)
+    assert components.preference_match is not match
+
+
+def test_warm_start_repairs_infeasible_route():
+    """测试热启动路径超出时间限制时先被修复，结果仍满足时间限制"""
+    places = create_city_places(40, seed=22)
+    matrix = HaversineEstimator().get_travel_time_matrix(places)
+    solver = OrienteeringSolver(time_budget_ms=20)
+
+    selected, _, details = solver.solve(places, UserPreferences(), matrix, 480)
+    previous = [places.index(place) for place in selected]
+
+    warm, score, warm_details = solver.solve(places, UserPreferences(), matrix, 180,
+                                             initial_route=previous + [previous[0], 999])
+    assert warm_details["selection_details"]["warm_start"]
+    assert warm_details["time_used"] <= 180
+    assert len(set(place.place_id for place in warm)) == len(warm)
+    assert score > 0
+
+
+def test_session_replans_without_network():
+    """测试会话：拖动权重滑块时不再请求网络，热启动重新规划在交互时延内完成"""
+    with StubTextSearchServer(total_results=30) as places_stub, StubDistanceMatrixServer(delay=0.0) as matrix_stub:
+        planner = IntelligentTourPlanner(api_key="test-key")
+        planner.places_api.base_url = places_stub.place_url
+        planner.places_api.page_token_delay = 0.0
+        planner.maps_api.base_url = matrix_stub.url
+
+        session = planner.create_plan_session("Vancouver", max_places=30)
+        requests_after_setup = (len(places_stub.requests), len(matrix_stub.requests))
+
+        prefs = UserPreferences(travel_style=TravelStyle.CUSTOM)
+        first = session.plan(prefs, 300)
+
+        timings = []
+        for weight in np.linspace(0.1, 0.9, 9):
+            prefs = dataclasses.replace(prefs, weight_rating=float(weight), weight_travel=float(1 - weight))
+            result = session.plan(prefs, 300)
+            assert result["success"] and result["session"]["warm_start"]
+            assert result["statistics"]["total_time"] <= 300
+            timings.append(result["session"]["elapsed_ms"])
+
+        assert (len(places_stub.requests), len(matrix_stub.requests)) == requests_after_setup
+
+    print(f"🎚️ 热启动重新规划: 中位数 {np.median(timings):.1f} ms, 最大 {max(timings):.1f} ms "
+          f"(首次 {first['session']['elapsed_ms']:.1f} ms)")
+    assert first["success"] and not first["session"]["warm_start"]
+    assert np.median(timings) < 20
+
+
+if __name__ == "__main__":
+    test_rescore_matches_full_scoring()
+    test_warm_start_repairs_infeasible_route()
+    test_session_replans_without_network()
+    print("✅ 交互式规划会话测试完成")
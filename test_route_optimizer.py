@@ -0,0 +1,210 @@
+"""
+测试脚本：验证路径优化器 (Route Optimizer)
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import random
+
+import numpy as np
+
+from src.models.place import Place, Location, PlaceIndex
+from src.models.travel_matrix import TravelMatrix
+from src.algorithms.route_optimizer import RouteOptimizer
+
+
+def create_random_instance(n: int, seed: int = 42, asymmetry: float = 0.2):
+    """创建随机景点和非对称旅行时间矩阵"""
+    rng = np.random.default_rng(seed)
+    coords = rng.uniform(0, 10, size=(n, 2))
+
+    places = [
+        Place(
+            name=f"Place {i}",
+            address=f"{i} Test St",
+            place_id=f"test{i}",
+            location=Location(49.2 + coords[i, 0] / 100, -123.1 + coords[i, 1] / 100),
+            rating=4.0,
+            visit_time=30
+        )
+        for i in range(n)
+    ]
+
+    # 欧氏距离 × 5分钟，并加入单向扰动（模拟单行道、上坡）
+    distances = np.linalg.norm(coords[:, None, :] - coords[None, :, :], axis=2) * 5
+    noise = 1 + asymmetry * rng.random((n, n))
+    durations = distances * noise
+    np.fill_diagonal(durations, 0)
+
+    return places, TravelMatrix(durations)
+
+
+def test_index_based_route():
+    """测试路径以索引表示，结果为选中景点的排列且从起点出发"""
+    places, matrix = create_random_instance(30)
+    optimizer = RouteOptimizer()
+
+    selected = random.Random(0).sample(places, 12) + [places[0]]
+    route, details = optimizer.optimize_route(selected, matrix, places, start_index=0)
+
+    print(f"🛣️ {details['algorithm']}: {details['initial_travel_time']:.1f} → "
+          f"{details['optimized_travel_time']:.1f} 分钟")
+    assert route[0] is places[0]
+    assert sorted(p.place_id for p in route) == sorted(p.place_id for p in selected)
+    assert details["optimized_travel_time"] <= details["initial_travel_time"] + 1e-6
+
+    place_index = PlaceIndex(places)
+    stats = optimizer.calculate_route_statistics(route, matrix, places, place_index)
+    assert abs(stats["total_travel_time"] - details["optimized_travel_time"]) < 1e-6
+
+
+def test_two_opt_local_optimum():
+    """测试增量2-opt的结果不存在任何改进的反转（完整邻居列表）"""
+    places, matrix = create_random_instance(25, seed=7)
+    optimizer = RouteOptimizer(neighbor_count=24)
+
+    initial = optimizer._nearest_neighbor_initialization(list(range(25)), matrix, 0)
+    route = optimizer._two_opt_improvement(initial, matrix)
+    best = optimizer._calculate_total_travel_time(route, matrix)
+
+    assert route[0] == 0
+    assert best <= optimizer._calculate_total_travel_time(initial, matrix)
+    for i in range(1, len(route) - 1):
+        for j in range(i + 2, len(route) + 1):
+            candidate = route[:i] + route[i:j][::-1] + route[j:]
+            assert optimizer._calculate_total_travel_time(candidate, matrix) >= best - 1e-4
+
+
+def test_two_opt_large_route():
+    """测试150个景点的路径优化在毫秒级完成"""
+    import time
+
+    places, matrix = create_random_instance(150, seed=3)
+    optimizer = RouteOptimizer()
+
+    start = time.perf_counter()
+    route, details = optimizer.optimize_route(places, matrix, places)
+    elapsed = time.perf_counter() - start
+
+    print(f"⏱️ 150个景点优化耗时 {elapsed * 1000:.1f} ms, 改进 {details['improvement_percent']:.1f}%")
+    assert len(route) == 150
+    assert details["optimized_travel_time"] < details["initial_travel_time"]
+    assert elapsed < 1.0
+
+
+def test_move_neighborhoods():
+    """测试Or-opt / relocate / exchange 移动集合在非对称矩阵上的效果"""
+    places, matrix = create_random_instance(60, seed=11, asymmetry=0.5)
+    optimizer = RouteOptimizer()
+
+    _, two_opt = optimizer.optimize_route(places, matrix, places, moves=["2opt"])
+    route, combined = optimizer.optimize_route(
+        places, matrix, places, moves=["2opt", "or_opt", "exchange"]
+    )
+
+    print(f"🔀 2-Opt: {two_opt['optimized_travel_time']:.1f}, "
+          f"{combined['algorithm']}: {combined['optimized_travel_time']:.1f}, {combined['move_stats']}")
+    assert combined["moves"] == ["2opt", "or_opt", "exchange"]
+    assert set(combined["move_stats"]) == {"2opt", "or_opt", "exchange"}
+    assert combined["optimized_travel_time"] <= two_opt["optimized_travel_time"] + 1e-6
+    assert route[0] is places[0]
+    assert sorted(p.place_id for p in route) == sorted(p.place_id for p in places)
+
+    try:
+        optimizer.optimize_route(places, matrix, places, moves=["3opt"])
+        assert False, "unknown move should raise ValueError"
+    except ValueError:
+        pass
+
+
+def test_exact_small_route():
+    """测试小规模路径自动使用Held-Karp精确求解，并与穷举结果一致"""
+    import itertools
+
+    places, matrix = create_random_instance(8, seed=1, asymmetry=0.7)
+    optimizer = RouteOptimizer()
+
+    route, details = optimizer.optimize_route(places, matrix, places, start_index=0)
+    brute_force = min(
+        optimizer._calculate_total_travel_time([0] + list(perm), matrix)
+        for perm in itertools.permutations(range(1, 8))
+    )
+
+    print(f"🎯 {details['algorithm']}: {details['optimized_travel_time']:.2f} (穷举 {brute_force:.2f})")
+    assert details["optimal"] is True
+    assert route[0] is places[0]
+    assert abs(details["optimized_travel_time"] - brute_force) < 1e-4
+
+    # 起点不在选中景点中时，起点任意
+    _, free_start = optimizer.optimize_route(places[1:], matrix, places, start_index=0)
+    brute_force = min(
+        optimizer._calculate_total_travel_time(list(perm), matrix)
+        for perm in itertools.permutations(range(1, 8))
+    )
+    assert abs(free_start["optimized_travel_time"] - brute_force) < 1e-4
+
+    # 超过阈值时使用启发式
+    _, heuristic = RouteOptimizer(exact_threshold=5).optimize_route(places, matrix, places)
+    assert heuristic["optimal"] is False
+
+
+def test_moves_and_free_start_heuristic():
+    """测试显式指定移动时小规模路径也使用局部搜索；起点未选中时局部搜索与精确求解一样起点任意"""
+    # 一条直线上的景点，从中间出发的最近邻路径需要折返
+    positions = [5, 4, 6, 3, 7, 2, 8, 1, 9, 0]
+    places = [
+        Place(name=f"Line {x}", address="", place_id=f"line{x}",
+              location=Location(49.2, -123.1 + x / 100), rating=4.0, visit_time=30)
+        for x in [100] + positions
+    ]
+    coords = np.array([100] + positions, dtype=np.float64)
+    matrix = TravelMatrix(np.abs(coords[:, None] - coords[None, :]))
+    optimizer = RouteOptimizer()
+
+    _, explicit = optimizer.optimize_route(places[1:], matrix, places, start_index=0, moves=["2opt", "or_opt"])
+    assert explicit["optimal"] is False
+    assert explicit["moves"] == ["2opt", "or_opt"]
+
+    _, exact = optimizer.optimize_route(places[1:], matrix, places, start_index=0)
+    heuristic_route, heuristic = RouteOptimizer(exact_threshold=0).optimize_route(
+        places[1:], matrix, places, start_index=0
+    )
+    assert exact["optimal"] is True
+    assert abs(exact["optimized_travel_time"] - 9.0) < 1e-6
+    assert abs(heuristic["optimized_travel_time"] - 9.0) < 1e-6
+    assert heuristic_route[0].place_id in ("line0", "line9")
+
+    # 起点在选中景点中时仍固定在首位
+    route, pinned = RouteOptimizer(exact_threshold=0).optimize_route(places[1:], matrix, places, start_index=1)
+    assert route[0] is places[1]
+
+    # 公共接口 improve_route：改进已有的索引路径
+    improved, move_stats = optimizer.improve_route([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], matrix)
+    assert improved[0] == 1 and sorted(improved) == list(range(1, 11))
+    assert optimizer._calculate_total_travel_time(improved, matrix) < \
+        optimizer._calculate_total_travel_time([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], matrix)
+    assert set(move_stats) == {"2opt", "or_opt"}
+
+
+def test_place_index_fallback():
+    """测试PlaceIndex对非同一对象的景点回退到相等性查找"""
+    places, _ = create_random_instance(5)
+    place_index = PlaceIndex(places)
+    copy = Place(**{field: getattr(places[3], field) for field in places[3].__dataclass_fields__})
+
+    assert place_index.index_of(places[3]) == 3
+    assert place_index.index_of(copy) == 3
+    assert place_index.places_at([4, 1]) == [places[4], places[1]]
+
+
+if __name__ == "__main__":
+    test_index_based_route()
+    test_two_opt_local_optimum()
+    test_two_opt_large_route()
+    test_move_neighborhoods()
+    test_exact_small_route()
+    test_moves_and_free_start_heuristic()
+    test_place_index_fallback()
+    print("✅ 路径优化器测试完成")
@@ -0,0 +1,107 @@
+"""
+测试脚本：验证向量化综合评分与逐个景点计算的公式一致
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import copy
+import time
+
+import numpy as np
+
+from src.algorithms.scoring import CompositeScoringSystem
+from src.models.place import Place, Location
+from src.models.user_preferences import UserPreferences, PreferenceCategory
+from test_batch_planning import create_users
+from test_matrix_provider import create_city_places
+
+
+def create_edge_places():
+    """无评价、无评分、多类别等边界情况"""
+    location = Location(lat=49.28, lng=-123.12)
+    return [
+        Place(name="No reviews", address="", place_id="a", location=location, rating=4.0, user_ratings_total=0),
+        Place(name="One review", address="", place_id="b", location=location, rating=5.0, user_ratings_total=1),
+        Place(name="Unrated", address="", place_id="c", location=location, rating=0.0, user_ratings_total=0),
+        Place(name="Popular", address="", place_id="d", location=location, rating=4.8, user_ratings_total=250000,
+              place_types=["museum", "restaurant", "park", "shopping_mall"]),
+    ]
+
+
+def test_batch_matches_per_place_formula():
+    """测试 batch_calculate_scores 与逐个调用 calculate_composite_score 的结果一致"""
+    scoring = CompositeScoringSystem()
+    places = create_city_places(300, seed=11) + create_edge_places()
+    penalties = np.random.default_rng(2).uniform(0, 10, len(places)).tolist()
+    users = create_users(20, seed=5) + [
+        UserPreferences(),
+        UserPreferences(category_preferences={}),
+        UserPreferences(category_preferences={PreferenceCategory.FOOD: 0.0}),
+    ]
+
+    for prefs in users:
+        reference = copy.deepcopy(places)
+        expected = [scoring.calculate_composite_score(place, prefs, penalty)
+                    for place, penalty in zip(reference, penalties)]
+
+        scoring.batch_calculate_scores(places, prefs, penalties)
+
+        assert np.allclose([place.composite_score for place in places], expected, rtol=1e-12, atol=1e-12)
+        assert [place.travel_penalty for place in places] == penalties
+
+    # 惩罚列表较短或缺省时其余景点的惩罚为0
+    scoring.batch_calculate_scores(places, UserPreferences(), penalties[:10])
+    assert all(place.travel_penalty == 0.0 for place in places[10:])
+    assert scoring.batch_calculate_scores([], UserPreferences()) == []
+
+
+def test_quality_features_match_multiplier():
+    """测试编码得到的质量乘数与 _get_category_quality_multiplier 一致"""
+    scoring = CompositeScoringSystem()
+    places = create_city_places(100, seed=12) + create_edge_places()
+    features = scoring.encode_places(places)
+
+    for i, place in enumerate(places):
+        for j, category in enumerate(PreferenceCategory):
+            if category in place.categories:
+                assert features.categories[i, j]
+                assert np.isclose(features.quality[i, j], scoring._get_category_quality_multiplier(place, category),
+                                  rtol=1e-12)
+            else:
+                assert not features.categories[i, j]
+
+
+def test_vectorized_scoring_benchmark():
+    """基准：5000个景点的评分，向量化 vs 逐个景点"""
+    scoring = CompositeScoringSystem()
+    places = create_city_places(5000, seed=13)
+    prefs = UserPreferences()
+
+    start = time.perf_counter()
+    for place in places:
+        scoring.calculate_composite_score(place, prefs, 1.0)
+    loop_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    scoring.batch_calculate_scores(places, prefs, [1.0] * len(places))
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    features = scoring.encode_places(places)
+    users = create_users(1000)
+    start = time.perf_counter()
+    scores = scoring.score_matrix(features, users, np.ones(len(places)))
+    matrix_ms = (time.perf_counter() - start) * 1000
+
+    print(f"🧮 5000个景点: 逐个 {loop_ms:.1f} ms, 向量化 {batch_ms:.1f} ms; "
+          f"1000位用户得分矩阵 {matrix_ms:.1f} ms")
+    assert scores.shape == (1000, 5000)
+    assert batch_ms < loop_ms
+
+
+if __name__ == "__main__":
+    test_batch_matches_per_place_formula()
+    test_quality_features_match_multiplier()
+    test_vectorized_scoring_benchmark()
+    print("✅ 综合评分测试完成")
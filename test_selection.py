@@ -0,0 +1,159 @@
+"""
+测试脚本：验证景点选择算法（增强背包 / 定向问题）
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import time
+
+import numpy as np
+
+from src.models.user_preferences import UserPreferences
+from src.algorithms.enhanced_knapsack import EnhancedKnapsackSolver
+from src.algorithms.orienteering import OrienteeringSolver
+from src.algorithms.exact_knapsack import ExactKnapsackSolver
+from src.algorithms.route_optimizer import RouteOptimizer
+from test_route_optimizer import create_random_instance
+
+
+def create_scored_instance(n: int, seed: int = 0):
+    """创建带随机评分和访问时间的测试实例"""
+    places, matrix = create_random_instance(n, seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    for place in places:
+        place.rating = float(rng.uniform(3.0, 5.0))
+        place.user_ratings_total = int(rng.integers(10, 5000))
+        place.visit_time = int(rng.integers(20, 90))
+    return places, matrix
+
+
+def route_time(route, matrix, start_index=0):
+    """从起点出发的总耗时（旅行 + 访问）"""
+    path = [start_index] + [int(place.place_id[4:]) for place in route]
+    travel = sum(matrix.duration(a, b) for a, b in zip(path, path[1:]) if a != b)
+    return travel + sum(place.visit_time for place in route)
+
+
+def reference_greedy_selection(places, matrix, time_limit, start_index=0):
+    """逐个比较的位置感知贪心（向量化前的参考实现）"""
+    selected, available = [], list(range(len(places)))
+    current, remaining = start_index, time_limit
+
+    while available and remaining > 0:
+        best_efficiency, best_index, best_time = -1, None, 0
+        for index in available:
+            total_time = matrix.duration(current, index) + places[index].visit_time
+            if total_time <= remaining:
+                efficiency = places[index].composite_score / total_time
+                if efficiency > best_efficiency:
+                    best_efficiency, best_index, best_time = efficiency, index, total_time
+        if best_index is None:
+            break
+        selected.append(best_index)
+        available.remove(best_index)
+        remaining -= best_time
+        current = best_index
+
+    return selected, remaining
+
+
+def test_vectorized_selection_matches_reference():
+    """测试向量化的位置感知选择与逐个比较的贪心结果完全一致"""
+    solver = EnhancedKnapsackSolver()
+    for seed, n, time_limit in [(1, 20, 180), (2, 80, 480), (3, 300, 900)]:
+        places, matrix = create_scored_instance(n, seed=seed)
+        matrix.set_cell(0, 5, "ZERO_RESULTS")
+
+        selected, total_score, details = solver.solve(places, UserPreferences(), matrix, time_limit)
+        expected, remaining = reference_greedy_selection(places, matrix, time_limit)
+
+        assert [places.index(place) for place in selected] == expected
+        assert details["selection_details"]["remaining_time"] == remaining
+        assert total_score == sum(places[i].composite_score for i in expected)
+
+
+def test_beam_search_selection():
+    """测试束搜索：满足时间约束、不差于贪心、返回每个束的选择日志"""
+    solver = EnhancedKnapsackSolver()
+    for seed in (60, 200):
+        places, matrix = create_scored_instance(seed, seed=seed)
+        time_limit = 360
+
+        greedy, greedy_score, _ = solver.solve(places, UserPreferences(), matrix, time_limit)
+        selected, score, details = solver.solve(
+            places, UserPreferences(), matrix, time_limit, beam_width=8, lookahead_depth=2
+        )
+        selection = details["selection_details"]
+
+        print(f"🔦 {details['algorithm']}: {score:.2f} (贪心 {greedy_score:.2f})")
+        assert score >= greedy_score - 1e-9
+        assert len({id(place) for place in selected}) == len(selected)
+        assert route_time(selected, matrix) <= time_limit + 1e-3
+        assert 1 <= len(selection["beam_selection_logs"]) <= 8
+        assert [entry["selected_place"] for entry in selection["selection_log"]] == \
+            [place.name for place in selected]
+
+
+def test_exact_knapsack_bound():
+    """测试精确背包：与穷举一致，是贪心的上界，多日预算内存在MB级别"""
+    import itertools
+
+    solver = ExactKnapsackSolver()
+    values = np.array([6.0, 5.0, 4.5, 3.0, 2.0, 7.5, 1.0, 4.0, 3.5, 5.5])
+    weights = np.array([50, 40, 35, 30, 20, 70, 10, 45, 25, 60], dtype=np.float64)
+    selected, best, _ = solver._solve_01_knapsack(values, weights, 150)
+    brute_force = max(
+        values[list(subset)].sum()
+        for r in range(len(values) + 1)
+        for subset in itertools.combinations(range(len(values)), r)
+        if weights[list(subset)].sum() <= 150
+    )
+    assert abs(best - brute_force) < 1e-9
+    assert abs(values[selected].sum() - best) < 1e-9 and weights[selected].sum() <= 150
+
+    places, matrix = create_scored_instance(60, seed=5)
+    comparison = EnhancedKnapsackSolver().compare_with_traditional_knapsack(
+        places, UserPreferences(), matrix, 360
+    )
+    print(f"📐 上界 {comparison['traditional_knapsack']['total_score']:.2f}, "
+          f"贪心 {comparison['enhanced_knapsack']['total_score']:.2f}, "
+          f"最优性比率 {comparison['improvement']['optimality_ratio']:.3f}")
+    assert comparison["traditional_knapsack"]["total_score"] >= comparison["enhanced_knapsack"]["total_score"]
+
+    places, matrix = create_scored_instance(500, seed=6)
+    _, _, details = solver.solve(places, UserPreferences(), matrix, 2400)
+    assert details["memory_bytes"] < 4 * 1024 * 1024
+
+
+def test_orienteering_solver():
+    """测试定向问题求解器满足时间约束，且得分不低于贪心背包"""
+    places, matrix = create_scored_instance(60, seed=3)
+    prefs = UserPreferences()
+    time_limit = 360
+
+    _, knapsack_score, _ = EnhancedKnapsackSolver().solve(places, prefs, matrix, time_limit)
+
+    start = time.perf_counter()
+    route, score, details = OrienteeringSolver().solve(
+        places, prefs, matrix, time_limit, time_budget_ms=100
+    )
+    elapsed = time.perf_counter() - start
+
+    print(f"🧭 {details['algorithm']}: 得分 {score:.2f} (背包 {knapsack_score:.2f}), "
+          f"{len(route)} 个景点, 用时 {details['time_used']:.1f}/{time_limit} 分钟, "
+          f"{details['selection_details']['iterations']} 次迭代")
+    assert score >= knapsack_score - 1e-6
+    assert abs(score - sum(place.composite_score for place in route)) < 1e-6
+    assert route_time(route, matrix) <= time_limit + 1e-3
+    assert abs(route_time(route, matrix) - details["time_used"]) < 1e-3
+    assert elapsed < 1.0
+
+
+if __name__ == "__main__":
+    test_vectorized_selection_matches_reference()
+    test_beam_search_selection()
+    test_exact_knapsack_bound()
+    test_orienteering_solver()
+    print("✅ 景点选择算法测试完成")
@@ -0,0 +1,135 @@
+"""
+测试脚本：验证请求合并 (SingleFlight)
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.api.single_flight import SingleFlight
+from src.api.transport import AsyncHttpTransport
+from src.core.tour_planner import IntelligentTourPlanner
+from src.models.user_preferences import UserPreferences
+from test_matrix_batching import StubDistanceMatrixServer
+from test_places_search import StubTextSearchServer
+
+
+def test_threads_share_one_call():
+    """测试并发线程的相同请求只执行一次，异常也会传给所有等待者"""
+    flight = SingleFlight()
+    barrier = threading.Barrier(8)
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"value": 42}
+
+    def worker(key):
+        barrier.wait()
+        return flight.do(key, slow_fetch)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(worker, ["vancouver"] * 8))
+
+    print(f"🧵 8个线程执行 {flight.executed} 次, 合并 {flight.coalesced} 次")
+    assert len(calls) == 1
+    assert sum(shared for _, shared in results) == 7
+    assert all(result is results[0][0] for result, _ in results)
+
+    # 执行完成后再次调用会重新执行
+    assert flight.do("vancouver", slow_fetch) == ({"value": 42}, False)
+
+    def failing():
+        time.sleep(0.05)
+        raise RuntimeError("quota")
+
+    errors = []
+
+    def failing_worker(_):
+        try:
+            flight.do("broken", failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(failing_worker, range(4)))
+    assert len(errors) == 4
+
+
+def test_asyncio_shares_one_call():
+    """测试同一事件循环内的相同请求只执行一次"""
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return [1, 2, 3]
+
+    async def run():
+        return await asyncio.gather(*(flight.do_async("paris", fetch) for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert sum(shared for _, shared in results) == 9
+
+
+def test_concurrent_plans_coalesce_api_calls():
+    """测试并发规划同一城市时搜索和矩阵请求被合并，每个规划拿到独立的景点对象"""
+    preferences = UserPreferences()
+
+    with StubTextSearchServer(total_results=12) as places_stub, StubDistanceMatrixServer(delay=0.1) as matrix_stub:
+        planner = IntelligentTourPlanner(api_key="test-key", async_transport=AsyncHttpTransport())
+        planner.places_api.base_url = places_stub.place_url
+        planner.maps_api.base_url = matrix_stub.url
+
+        planner.plan_tour("Vancouver", preferences, 240, max_places=12)
+        single_plan_requests = (len(places_stub.requests), len(matrix_stub.requests))
+        places_stub.requests.clear()
+        matrix_stub.requests.clear()
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(executor.map(
+                lambda _: planner.plan_tour("Vancouver", preferences, 240, max_places=12), range(6)
+            ))
+        threaded_requests = (len(places_stub.requests), len(matrix_stub.requests))
+        places_stub.requests.clear()
+        matrix_stub.requests.clear()
+
+        async def plan_many():
+            try:
+                return await asyncio.gather(*(
+                    planner.plan_tour_async("Vancouver", preferences, 240, max_places=12)
+                    for _ in range(6)
+                ))
+            finally:
+                await planner.async_transport.aclose()
+
+        async_results = asyncio.run(plan_many())
+        async_requests = (len(places_stub.requests), len(matrix_stub.requests))
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            searches = list(executor.map(
+                lambda _: planner.places_api.search_places("Vancouver", max_results=12), range(2)
+            ))
+
+    print(f"🤝 单次规划请求 {single_plan_requests}, 6个线程 {threaded_requests}, "
+          f"6个协程 {async_requests}, 合并 {planner.single_flight.coalesced} 次")
+    assert all(result["success"] for result in results + async_results)
+    assert threaded_requests[0] <= single_plan_requests[0] * 2
+    assert threaded_requests[1] < single_plan_requests[1] * 6
+    assert async_requests == single_plan_requests
+    assert searches[0][0] is not searches[1][0]
+
+
+if __name__ == "__main__":
+    test_threads_share_one_call()
+    test_asyncio_shares_one_call()
+    test_concurrent_plans_coalesce_api_calls()
+    print("✅ 请求合并测试完成")
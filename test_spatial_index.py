@@ -0,0 +1,96 @@
+"""
+测试脚本：验证空间索引 (SpatialIndex) 及其在路径优化中的使用
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import time
+
+import numpy as np
+
+from src.algorithms.spatial_index import SpatialIndex
+from src.algorithms.route_optimizer import RouteOptimizer
+from src.api.matrix_provider import HaversineEstimator
+from test_matrix_provider import create_city_places
+
+
+def brute_force_distances(index, i):
+    offsets = index.coordinates - index.coordinates[i]
+    return np.hypot(offsets[:, 0], offsets[:, 1])
+
+
+def test_queries_match_brute_force():
+    """测试半径查询和k近邻与暴力计算一致（含密集簇和极少点的情况）"""
+    rng = np.random.default_rng(7)
+    clustered = np.concatenate([rng.normal(0, 30, (300, 2)), rng.normal(8000, 2000, (300, 2))])
+
+    for coordinates in [SpatialIndex.from_places(create_city_places(500)).coordinates, clustered,
+                        np.array([[0.0, 0.0], [10.0, 0.0], [0.0, 10.0]])]:
+        index = SpatialIndex(coordinates)
+        nearest = index.knn_all(6)
+        for i in range(0, len(coordinates), 7):
+            distances = brute_force_distances(index, i)
+            assert np.array_equal(index.query_radius(i, 1200), np.flatnonzero(distances <= 1200))
+
+            distances[i] = np.inf
+            expected = np.sort(distances)[:min(6, len(coordinates) - 1)]
+            assert np.allclose(distances[index.knn(i, 6)], expected)
+            assert np.allclose(distances[nearest[i]], expected)
+
+
+def test_projection_matches_haversine():
+    """测试投影后的平面距离与球面距离在城市范围内误差很小"""
+    places = create_city_places(50)
+    index = SpatialIndex.from_places(places)
+    haversine = HaversineEstimator().distance_matrix(places)
+
+    planar = brute_force_distances(index, 0)
+    assert np.allclose(planar[1:], haversine[0, 1:], rtol=0.005)
+
+
+def test_ten_thousand_place_benchmark():
+    """基准：1万个景点的构建、k近邻和半径查询"""
+    places = create_city_places(10000)
+
+    start = time.perf_counter()
+    index = SpatialIndex.from_places(places)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    nearest = index.knn_all(8)
+    knn_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    found = sum(len(index.within_minutes(i, 5)) for i in range(1000))
+    radius_ms = (time.perf_counter() - start) * 1000
+
+    print(f"🗺️ 1万个景点: 构建 {build_ms:.1f} ms, 全部8近邻 {knn_ms:.1f} ms, "
+          f"1000次5分钟步行半径查询 {radius_ms:.1f} ms (平均 {found / 1000:.1f} 个)")
+    assert nearest.shape == (10000, 8)
+    assert knn_ms < 5000
+
+
+def test_route_optimizer_with_spatial_neighbors():
+    """测试路径优化可并入地理近邻候选列表"""
+    places = create_city_places(60, seed=5)
+    matrix = HaversineEstimator().get_travel_time_matrix(places)
+    optimizer = RouteOptimizer(exact_threshold=0, neighbor_count=4)
+
+    route, details = optimizer.optimize_route(places, matrix, places, start_index=0,
+                                              spatial_index=SpatialIndex.from_places(places))
+    _, baseline = optimizer.optimize_route(places, matrix, places, start_index=0)
+
+    assert route[0] is places[0]
+    assert sorted(place.place_id for place in route) == sorted(place.place_id for place in places)
+    assert details["optimized_travel_time"] <= details["initial_travel_time"]
+    assert details["optimized_travel_time"] <= baseline["optimized_travel_time"] * 1.05
+
+
+if __name__ == "__main__":
+    test_queries_match_brute_force()
+    test_projection_matches_haversine()
+    test_ten_thousand_place_benchmark()
+    test_route_optimizer_with_spatial_neighbors()
+    print("✅ 空间索引测试完成")
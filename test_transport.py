@@ -0,0 +1,156 @@
+"""
+测试脚本：验证共享HTTP传输层 (HttpTransport)
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from src.api.transport import HttpTransport
+from src.api.google_maps import GoogleMapsAPI
+from test_matrix_batching import create_grid_places
+
+
+class ScriptedServer:
+    """
+    按脚本依次返回响应的本地假服务器
+    每个脚本项为 (HTTP状态码, JSON响应体, 延迟秒数)；脚本用完后重复最后一项
+    记录每个请求的客户端端口，用于检查连接复用
+    """
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+        self.client_ports = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/json"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # 支持 keep-alive
+
+            def do_GET(self):
+                with server._lock:
+                    code, body, delay = server.script[min(server.calls, len(server.script) - 1)]
+                    server.calls += 1
+                    server.client_ports.append(self.client_address[1])
+
+                time.sleep(delay)
+                payload = json.dumps(body).encode()
+                try:
+                    self.send_response(code)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except OSError:
+                    pass  # 客户端已超时断开
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+OK = (200, {"status": "OK", "rows": []}, 0.0)
+
+
+def test_connection_reuse_and_metrics():
+    """测试连续请求复用同一个连接并记录指标"""
+    with ScriptedServer([OK]) as server:
+        transport = HttpTransport()
+        for _ in range(5):
+            assert transport.get_json(server.url, {"q": "x"})["status"] == "OK"
+
+    metrics = transport.metrics.to_dict()
+    print(f"🔌 客户端端口: {set(server.client_ports)}, 指标: {metrics}")
+    assert len(set(server.client_ports)) == 1
+    assert metrics["requests"] == 5
+    assert metrics["retries"] == 0
+    assert metrics["bytes_received"] == 5 * len(json.dumps(OK[1]))
+
+
+def test_retry_on_server_error_and_quota():
+    """测试 5xx 与 OVER_QUERY_LIMIT 时指数退避重试"""
+    script = [
+        (503, {"status": "UNAVAILABLE"}, 0.0),
+        (200, {"status": "OVER_QUERY_LIMIT"}, 0.0),
+        OK,
+    ]
+    delays = []
+    with ScriptedServer(script) as server:
+        transport = HttpTransport(backoff_factor=1.0, sleep=delays.append)
+        data = transport.get_json(server.url, {})
+
+    print(f"🔁 重试 {transport.metrics.retries} 次, 退避 {[round(d, 2) for d in delays]}")
+    assert data["status"] == "OK"
+    assert transport.metrics.retries == 2
+    assert 0.5 <= delays[0] <= 1.0 and 1.0 <= delays[1] <= 2.0
+
+    # 重试用尽后返回最后的状态，由调用方处理
+    with ScriptedServer([(200, {"status": "OVER_QUERY_LIMIT"}, 0.0)]) as server:
+        transport = HttpTransport(max_retries=2, sleep=lambda d: None)
+        assert transport.get_json(server.url, {})["status"] == "OVER_QUERY_LIMIT"
+        assert server.calls == 3
+
+
+def test_timeout_does_not_hang():
+    """测试挂起的服务器在超时后重试并最终抛出异常"""
+    with ScriptedServer([(200, {"status": "OK"}, 1.0)]) as server:
+        transport = HttpTransport(timeout=0.1, max_retries=1, sleep=lambda d: None)
+        start = time.perf_counter()
+        try:
+            transport.get_json(server.url, {})
+            raise AssertionError("expected a timeout")
+        except requests.Timeout:
+            pass
+        elapsed = time.perf_counter() - start
+
+    print(f"⏱️ 超时耗时 {elapsed:.2f}s, 失败 {transport.metrics.failures} 次")
+    assert elapsed < 1.0
+    assert transport.metrics.retries == 1
+    assert transport.metrics.failures == 1
+
+
+def test_client_uses_injected_transport():
+    """测试API客户端通过注入的传输层请求，失败时按原有方式返回空结果"""
+    with ScriptedServer([(500, {"status": "ERROR"}, 0.0)]) as server:
+        transport = HttpTransport(max_retries=1, sleep=lambda d: None)
+        api = GoogleMapsAPI(api_key="test-key", transport=transport)
+        api.base_url = server.url
+        matrix = api.get_travel_time_matrix(create_grid_places(3))
+
+    assert matrix.size == 0
+    assert server.calls == 2
+    assert transport.metrics.failures == 1
+
+
+if __name__ == "__main__":
+    test_connection_reuse_and_metrics()
+    test_retry_on_server_error_and_quota()
+    test_timeout_does_not_hang()
+    test_client_uses_injected_transport()
+    print("✅ HTTP传输层测试完成")
@@ -0,0 +1,99 @@
+"""
+测试脚本：验证旅行时间缓存 (TravelTimeCache)
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+from src.api.cache import TravelTimeCache
+from src.api.google_maps import GoogleMapsAPI
+from test_matrix_batching import StubDistanceMatrixServer, create_grid_places
+
+
+def test_repeated_fetch_uses_cache():
+    """测试重复请求同一批景点时不再访问网络，且矩阵一致"""
+    places = create_grid_places(30)
+
+    with tempfile.TemporaryDirectory() as tmp, StubDistanceMatrixServer() as stub:
+        cache_path = os.path.join(tmp, "travel.sqlite")
+        api = GoogleMapsAPI(api_key="test-key", cache=TravelTimeCache(cache_path))
+        api.base_url = stub.url
+
+        first = api.get_travel_time_matrix(places)
+        first_requests = len(stub.requests)
+
+        # 新的缓存实例读取同一个文件（模拟重新启动）
+        api = GoogleMapsAPI(api_key="test-key", cache=TravelTimeCache(cache_path))
+        api.base_url = stub.url
+        second = api.get_travel_time_matrix(places)
+
+        print(f"💾 首次 {first_requests} 个请求, 再次 {len(stub.requests) - first_requests} 个请求, "
+              f"命中 {api.cache.hits} 个单元格")
+        assert len(stub.requests) == first_requests
+        assert api.cache.hits == 30 * 30
+        assert np.array_equal(first.durations, second.durations)
+        assert np.array_equal(first.status, second.status)
+
+
+def test_only_missing_cells_are_fetched():
+    """测试新增景点时只请求缺失的单元格"""
+    places = create_grid_places(12)
+
+    with StubDistanceMatrixServer() as stub:
+        api = GoogleMapsAPI(api_key="test-key", cache=TravelTimeCache())
+        api.base_url = stub.url
+        api.get_travel_time_matrix(places[:10])
+        stub.requests.clear()
+
+        matrix = api.get_travel_time_matrix(places)
+
+    fetched = sum(o * d for o, d in stub.requests)
+    print(f"🧮 新增2个景点请求了 {fetched} 个元素")
+    assert fetched == 12 * 12 - 10 * 10
+    assert matrix.ok_mask.all()
+
+
+def test_ttl_bucket_and_lru():
+    """测试TTL过期、出发时间分段和LRU淘汰"""
+    now = [1000.0]
+    cache = TravelTimeCache(ttl_seconds=60, max_entries=5, clock=lambda: now[0])
+    places = create_grid_places(3)
+    ids = [p.place_id for p in places]
+
+    with StubDistanceMatrixServer() as stub:
+        api = GoogleMapsAPI(api_key="test-key", cache=cache)
+        api.base_url = stub.url
+
+        api.get_travel_time_matrix(places[:2])
+        assert len(cache) == 4
+
+        # 不同出发时间段不共享缓存
+        assert api._cache_key("driving", datetime(2024, 1, 1, 9), "best_guess") != \
+            api._cache_key("driving", datetime(2024, 1, 1, 11), "best_guess")
+        assert api._cache_key("walking", datetime(2024, 1, 1, 9), "best_guess") == ("walking", 0)
+
+    # 超出容量时淘汰最久未使用的条目
+    matrix = api.get_travel_time_matrix(places[:2])
+    now[0] += 10
+    cache.load_into(matrix, ids[:1], "walking", 0)
+    now[0] += 10
+    cache.store(matrix, ids[1:2] + ids[:1], np.ones((2, 2), dtype=bool), "other", 0)
+    assert len(cache) == 5
+    assert not cache.load_into(matrix, ids[:1], "walking", 0).any()
+
+    # 过期条目视为未命中
+    now[0] += 120
+    assert cache.load_into(matrix, ids[:2], "walking", 0).all()
+
+
+if __name__ == "__main__":
+    test_repeated_fetch_uses_cache()
+    test_only_missing_cells_are_fetched()
+    test_ttl_bucket_and_lru()
+    print("✅ 旅行时间缓存测试完成")
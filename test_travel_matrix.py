@@ -0,0 +1,76 @@
+"""
+测试脚本：验证稠密旅行时间矩阵 (TravelMatrix)
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import math
+
+from src.models.travel_matrix import TravelMatrix, CellStatus
+from src.algorithms.travel_penalty import TravelPenaltyCalculator
+from src.algorithms.enhanced_knapsack import EnhancedKnapsackSolver
+from src.models.user_preferences import UserPreferences
+from src.api.google_maps import GoogleMapsAPI
+from test_refactor import create_test_places, create_test_travel_matrix
+
+
+def create_api_response():
+    """创建模拟的Distance Matrix API响应"""
+    def ok(seconds, meters):
+        return {"status": "OK", "duration": {"value": seconds}, "distance": {"value": meters}}
+
+    return {
+        "status": "OK",
+        "rows": [
+            {"elements": [ok(0, 0), ok(1500, 2000), {"status": "ZERO_RESULTS"}]},
+            {"elements": [ok(1500, 2000), ok(0, 0),
+                          {**ok(1200, 1500), "duration_in_traffic": {"value": 1800}}]},
+            {"elements": [ok(900, 1200), ok(1200, 1500), ok(0, 0)]},
+        ]
+    }
+
+
+def test_parse_matrix_response():
+    """测试API响应解析为稠密数组"""
+    api = GoogleMapsAPI(api_key="test-key")
+    matrix = api._parse_matrix_response(create_api_response(), create_test_places())
+
+    print(f"🗺️ 解析结果: {matrix}, {matrix.nbytes} 字节")
+    assert matrix.shape == (3, 3)
+    assert matrix.durations.dtype.name == "float32"
+    assert matrix.duration(0, 1) == 25.0
+    assert matrix.distance(0, 1) == 2000.0
+    assert not matrix.is_ok(0, 2)
+    assert matrix.status[0, 2] == CellStatus.ZERO_RESULTS
+    assert math.isinf(matrix.duration(0, 2))
+    assert matrix.duration(0, 2, default=30.0) == 30.0
+    assert matrix.status[1, 2] == CellStatus.OK | CellStatus.HAS_TRAFFIC
+    assert matrix.traffic_durations[1, 2] == 30.0
+    assert math.isinf(matrix.duration(5, 0))
+
+
+def test_legacy_matrix_equivalence():
+    """测试旧的 List[List[Dict]] 格式与 TravelMatrix 的结果一致"""
+    legacy = create_test_travel_matrix()
+    matrix = TravelMatrix.coerce(legacy)
+
+    assert TravelMatrix.coerce(matrix) is matrix
+    assert matrix.duration(2, 1) == 20.0
+
+    penalty_calc = TravelPenaltyCalculator(n=2)
+    assert (penalty_calc.calculate_travel_penalties(create_test_places(), legacy) ==
+            penalty_calc.calculate_travel_penalties(create_test_places(), matrix))
+
+    solver = EnhancedKnapsackSolver()
+    legacy_result = solver.solve(create_test_places(), UserPreferences(), legacy, 180)
+    dense_result = solver.solve(create_test_places(), UserPreferences(), matrix, 180)
+    assert [p.name for p in legacy_result[0]] == [p.name for p in dense_result[0]]
+    assert legacy_result[1] == dense_result[1]
+
+
+if __name__ == "__main__":
+    test_parse_matrix_response()
+    test_legacy_matrix_equivalence()
+    print("✅ TravelMatrix 测试完成")
@@ -0,0 +1,181 @@
+"""
+测试脚本：验证向量化的 Top-N 旅行惩罚与逐个景点的计算结果一致
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import gc
+import pickle
+import statistics
+import time
+import weakref
+
+import numpy as np
+
+from src.algorithms.travel_penalty import TravelPenaltyCalculator
+from src.api.matrix_provider import HaversineEstimator
+from src.models.travel_matrix import TravelMatrix, CellStatus
+from test_matrix_provider import create_city_places
+
+
+def reference_penalties(places, matrix, n):
+    """逐个景点的参考实现：稳定排序取前N、逐单元格求平均、逐个归一化"""
+    if len(places) <= n:
+        return [0.0] * len(places)
+
+    ranked = sorted([(place.rating, i) for i, place in enumerate(places)], reverse=True, key=lambda x: x[0])
+    top = [i for _, i in ranked[:n]]
+
+    raw = []
+    for i in range(len(places)):
+        times = [matrix.duration(i, j) for j in top if i != j and matrix.duration(i, j) < float("inf")]
+        raw.append(statistics.mean(times) if i < len(matrix) and times else float("inf"))
+
+    finite = [p for p in raw if p != float("inf")]
+    if not finite:
+        return [0.0] * len(raw)
+    low, high = min(finite), max(finite)
+    if low == high:
+        return [5.0] * len(raw)
+    return [10.0 if p == float("inf") else (p - low) / (high - low) * 10 for p in raw]
+
+
+def create_rated_places(n, seed):
+    """评分取一位小数，制造大量并列评分"""
+    places = create_city_places(n, seed=seed)
+    rng = np.random.default_rng(seed)
+    for place in places:
+        place.rating = float(rng.choice([3.5, 4.0, 4.5, 4.7, 4.8]))
+    return places
+
+
+def test_matches_reference_with_ties_and_unreachable():
+    """测试与参考实现一致：并列评分、不可达单元格、完全孤立的景点、景点多于矩阵"""
+    places = create_rated_places(150, seed=31)
+    matrix = HaversineEstimator().get_travel_time_matrix(places)
+
+    rng = np.random.default_rng(1)
+    status = matrix.status.copy()
+    status[rng.random(status.shape) < 0.2] = CellStatus.NOT_FOUND
+    status[7, :] = CellStatus.ERROR                      # 完全孤立
+    partial = TravelMatrix(matrix.durations, matrix.distances, status)
+
+    for n in (1, 5, 12):
+        calculator = TravelPenaltyCalculator(n=n)
+        for travel_matrix in (matrix, partial):
+            expected = reference_penalties(places, travel_matrix, n)
+            assert calculator._get_top_n_rated_indices(places) == [
+                i for _, i in sorted([(p.rating, i) for i, p in enumerate(places)],
+                                     reverse=True, key=lambda x: x[0])[:n]
+            ]
+            assert np.allclose(calculator.calculate_travel_penalties(places, travel_matrix), expected,
+                               rtol=1e-9, atol=1e-9)
+
+    # 景点多于矩阵维度：超出部分为最大惩罚
+    extra = places + create_rated_places(3, seed=32)
+    penalties = TravelPenaltyCalculator().calculate_travel_penalties(extra, matrix)
+    assert penalties[-3:] == [10.0, 10.0, 10.0]
+    assert np.allclose(penalties, reference_penalties(extra, matrix, 5))
+
+
+def test_normalization_rules():
+    """测试归一化：inf→10，全部相同→5，没有有限值→0"""
+    calculator = TravelPenaltyCalculator()
+    assert calculator._normalize_penalties([2.0, float("inf"), 4.0]) == [0.0, 10.0, 10.0]
+    assert calculator._normalize_penalties([3.0, 3.0, float("inf")]) == [5.0, 5.0, 5.0]
+    assert calculator._normalize_penalties([float("inf")] * 3) == [0.0, 0.0, 0.0]
+    assert calculator._normalize_penalties([]) == []
+
+
+def test_ten_thousand_place_benchmark():
+    """基准：1万个景点的旅行惩罚"""
+    places = create_rated_places(10000, seed=33)
+    rng = np.random.default_rng(0)
+    durations = rng.uniform(1, 120, (10000, 10000)).astype(np.float32)
+    matrix = TravelMatrix(durations)
+
+    start = time.perf_counter()
+    penalties = TravelPenaltyCalculator().calculate_travel_penalties(places, matrix)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    print(f"🚶 1万个景点的旅行惩罚: {elapsed_ms:.1f} ms")
+    assert len(penalties) == 10000
+    assert min(penalties) == 0.0 and max(penalties) == 10.0
+    assert elapsed_ms < 1000
+
+
+class CountingCalculator(TravelPenaltyCalculator):
+    """记录实际计算惩罚的次数"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.computed = 0
+
+    def _masked_mean(self, *args):
+        self.computed += 1
+        return super()._masked_mean(*args)
+
+
+def test_connectivity_analysis_is_shared_and_pure():
+    """测试连通性分析只计算一次，惩罚/簇/统计共用，且不修改景点对象"""
+    places = create_rated_places(120, seed=34)
+    matrix = HaversineEstimator().get_travel_time_matrix(places)
+    for place in places:
+        place.travel_penalty = -1.0
+    calculator = CountingCalculator()
+
+    stats = calculator.analyze_connectivity(places, matrix)
+    clusters = calculator.get_well_connected_clusters(places, matrix)
+    analysis = calculator.analyze(places, matrix)
+
+    assert calculator.computed == 1
+    assert all(place.travel_penalty == -1.0 for place in places)
+    assert clusters == [cluster.members for cluster in analysis.clusters()]
+    assert analysis.clusters() is calculator.analyze(places, matrix).clusters()
+    assert not analysis.penalties.flags.writeable
+
+    expected = reference_penalties(places, matrix, 5)
+    assert np.isclose(stats["average_penalty"], statistics.mean(expected))
+    assert stats["well_connected_count"] == sum(1 for p in expected if p <= 5.0)
+    assert stats["poorly_connected_count"] == sum(1 for p in expected if p > 7.0)
+    assert stats["clusters_found"] == len(clusters)
+
+    # calculate_travel_penalties 仍然显式写入景点对象，复用同一份分析
+    penalties = calculator.calculate_travel_penalties(places, matrix)
+    assert calculator.computed == 1
+    assert [place.travel_penalty for place in places] == penalties
+
+    # 评分变化或矩阵其它部分变化时不会复用旧结果
+    places[3].rating = 1.0
+    calculator.analyze(places, matrix)
+    assert calculator.computed == 2
+
+    # 惩罚读取的子矩阵相同的另一个矩阵：共用惩罚，但簇在调用方的矩阵上重新计算
+    far = matrix.copy()
+    outside = [i for i in range(len(places)) if i not in calculator.analyze(places, matrix).top_n_indices]
+    far.durations[np.ix_(outside, outside)] = 500.0
+    isolated = calculator.analyze(places, far)
+    assert calculator.computed == 2
+    assert isolated.travel_matrix is far
+    assert isolated.penalties is calculator.analyze(places, matrix).penalties
+    assert isolated.clusters(10.0, 30.0) != calculator.analyze(places, matrix).clusters(10.0, 30.0)
+
+    # 缓存只保存矩阵的弱引用，不让矩阵常驻内存
+    far_ref = weakref.ref(far)
+    del far, isolated
+    gc.collect()
+    assert far_ref() is None
+
+    # 求解器会被传给进程池，计算器可以序列化（不带缓存）
+    restored = pickle.loads(pickle.dumps(calculator))
+    assert restored.calculate_travel_penalties(places, matrix) == calculator.calculate_travel_penalties(places, matrix)
+
+
+if __name__ == "__main__":
+    test_matches_reference_with_ties_and_unreachable()
+    test_normalization_rules()
+    test_ten_thousand_place_benchmark()
+    test_connectivity_analysis_is_shared_and_pure()
+    print("✅ 旅行惩罚测试完成")
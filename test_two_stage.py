@@ -0,0 +1,101 @@
+"""
+测试脚本：验证两阶段矩阵策略（离线估算筛选 + 近邻对精确时间）
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+
+from src.algorithms.spatial_index import SpatialIndex
+from src.api.google_maps import GoogleMapsAPI
+from src.core.tour_planner import IntelligentTourPlanner
+from src.models.user_preferences import UserPreferences
+from test_matrix_batching import StubDistanceMatrixServer, create_grid_places
+from test_matrix_provider import create_city_places
+from test_places_search import StubTextSearchServer
+
+
+def test_fetch_selected_cells_only():
+    """测试只请求掩码内的单元格"""
+    places = create_grid_places(30)
+    cells = np.zeros((30, 30), dtype=bool)
+    cells[np.arange(29), np.arange(1, 30)] = True
+    cells[0, :] = True
+
+    with StubDistanceMatrixServer() as stub:
+        api = GoogleMapsAPI(api_key="test-key")
+        api.base_url = stub.url
+        matrix, fetched = api.get_travel_time_cells(places, cells)
+
+    # 稀疏单元格打包成共享的块：请求数远少于逐行请求，块内顺带请求的单元格同样写入矩阵
+    assert len(stub.requests) < 30
+    assert sum(o * d for o, d in stub.requests) == fetched
+    assert int(cells.sum()) <= fetched <= int(cells.sum()) / GoogleMapsAPI.MIN_BLOCK_FILL
+    assert (matrix.ok_mask | ~cells).all()
+    assert (matrix.ok_mask == (matrix.status != 0)).all()
+
+
+def test_sparse_neighbor_cells_share_blocks():
+    """测试200个景点的近邻对打包为少量共享块，满足API限制并覆盖全部单元格"""
+    places = create_city_places(200, seed=5)
+    nearest = SpatialIndex.from_places(places).knn_all(5)
+    cells = np.zeros((200, 200), dtype=bool)
+    cells[np.arange(200)[:, None], nearest] = True
+    cells |= cells.T
+
+    api = GoogleMapsAPI(api_key="test-key")
+    blocks = api._plan_missing_blocks(cells)
+    covered = np.zeros_like(cells)
+    for origins, destinations in blocks:
+        assert len(origins) <= api.MAX_DIMENSION and len(destinations) <= api.MAX_DIMENSION
+        assert len(origins) * len(destinations) <= api.MAX_ELEMENTS
+        covered[np.ix_(origins, destinations)] = True
+    elements = sum(len(o) * len(d) for o, d in blocks)
+
+    print(f"📦 {int(cells.sum())} 个近邻单元格 → {len(blocks)} 个请求, {elements} 个元素")
+    assert (covered | ~cells).all()
+    assert len(blocks) <= 50
+    assert elements <= cells.sum() / api.MIN_BLOCK_FILL
+
+
+def test_two_stage_plan_saves_elements():
+    """测试两阶段规划请求的元素远少于 N²，且得分接近完整矩阵"""
+    preferences = UserPreferences()
+
+    with StubTextSearchServer(total_results=60) as places_stub, StubDistanceMatrixServer(delay=0.0) as matrix_stub:
+        planner = IntelligentTourPlanner(api_key="test-key")
+        planner.places_api.base_url = places_stub.place_url
+        planner.places_api.page_token_delay = 0.0
+        planner.maps_api.base_url = matrix_stub.url
+
+        full = planner.plan_tour("Vancouver", preferences, 300, max_places=60)
+        full_elements = sum(o * d for o, d in matrix_stub.requests)
+        matrix_stub.requests.clear()
+
+        staged = planner.plan_tour("Vancouver", preferences, 300, max_places=60,
+                                   matrix_strategy="two_stage")
+        staged_elements = sum(o * d for o, d in matrix_stub.requests)
+
+    report = staged["matrix_strategy"]
+    full_score = full["statistics"]["total_composite_score"]
+    print(f"🧮 完整矩阵 {full_elements} 个元素, 两阶段 {staged_elements} 个元素 "
+          f"(节省 {report['savings_percent']:.1f}%), 得分 {report['final_score']:.2f} / {full_score:.2f}, "
+          f"精确路段 {report['exact_leg_ratio']:.0%}, 校准 {report['calibration_factor']:.3f}")
+
+    assert staged["success"]
+    assert full_elements == 60 * 60
+    assert report["elements_fetched"] == staged_elements
+    assert report["elements_saved"] == 60 * 60 - staged_elements
+    assert staged_elements < 0.25 * full_elements
+    assert report["final_score"] >= 0.9 * full_score
+    assert 0.0 <= report["exact_leg_ratio"] <= 1.0
+    assert all("estimated" in item for item in staged["itinerary"] if item["type"] == "travel")
+
+
+if __name__ == "__main__":
+    test_fetch_selected_cells_only()
+    test_sparse_neighbor_cells_share_blocks()
+    test_two_stage_plan_saves_elements()
+    print("✅ 两阶段矩阵测试完成")